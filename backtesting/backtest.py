@@ -1,6 +1,7 @@
 import pandas as pd
 import logging
 import os
+from storage.parquet_lake import pa, read_parquet, write_parquet
 
 class Backtester:
     def __init__(self, data_file: str, initial_balance: float):
@@ -13,14 +14,17 @@ class Backtester:
         self.trades = []
         logging.basicConfig(level=logging.INFO)
 
-    def load_data(self):
-        """ 과거 데이터 로드 """
+    def load_data(self, columns=None):
+        """ 과거 데이터 로드 (Parquet 파일/디렉터리는 메모리 맵으로 필요한 컬럼만, CSV는 최초 1회 Parquet 캐시 생성) """
         if not os.path.exists(self.data_file):
             logging.error(f"🚨 데이터 파일을 찾을 수 없습니다: {self.data_file}")
             return None
 
         try:
-            df = pd.read_csv(self.data_file)
+            if self.data_file.endswith(".parquet") or os.path.isdir(self.data_file):
+                df = read_parquet(self.data_file, columns=columns)
+            else:
+                df = self.load_csv(columns)
             df["timestamp"] = pd.to_datetime(df["timestamp"])
             logging.info(f"✅ 데이터 로드 완료: {self.data_file}, 총 {len(df)} 개의 데이터")
             return df
@@ -28,6 +32,19 @@ class Backtester:
             logging.error(f"🚨 데이터 로딩 오류: {e}")
             return None
 
+    def load_csv(self, columns=None):
+        """ CSV 로드 (pyarrow 설치 시 CSV보다 최신인 Parquet 캐시 재사용) """
+        if pa is None:
+            return pd.read_csv(self.data_file, usecols=columns)
+
+        cache_file = os.path.splitext(self.data_file)[0] + ".parquet"
+        if not os.path.exists(cache_file) or os.path.getmtime(cache_file) < os.path.getmtime(self.data_file):
+            df = pd.read_csv(self.data_file)
+            df["timestamp"] = pd.to_datetime(df["timestamp"])
+            write_parquet(pa.Table.from_pandas(df, preserve_index=False), cache_file)
+            logging.info(f"✅ Parquet 캐시 생성: {cache_file}")
+        return read_parquet(cache_file, columns=columns)
+
     def run_backtest(self, strategy):
         """ 백테스트 실행 """
         df = self.load_data()
@@ -38,6 +38,9 @@ class Config:
     # ✅ 기본 매매 대상 코인
     DEFAULT_TRADING_PAIR = os.getenv("DEFAULT_TRADING_PAIR", "BTCUSDT")
 
+    # ✅ 자동 코인 선택 (전 종목 스트림 기반 실시간 순위 사용)
+    AUTO_SELECT_COIN = os.getenv("AUTO_SELECT_COIN", "False").strip().lower() == "true"
+
     @staticmethod
     def get_all():
         """ 환경 변수 설정 확인 (디버깅 용도) """
@@ -50,7 +53,8 @@ class Config:
             "TELEGRAM_BOT_TOKEN": "*****" if Config.TELEGRAM_BOT_TOKEN else None,
             "TELEGRAM_CHAT_ID": Config.TELEGRAM_CHAT_ID,
             "TRPC_API_URL": Config.TRPC_API_URL,
-            "DEFAULT_TRADING_PAIR": Config.DEFAULT_TRADING_PAIR
+            "DEFAULT_TRADING_PAIR": Config.DEFAULT_TRADING_PAIR,
+            "AUTO_SELECT_COIN": Config.AUTO_SELECT_COIN
         }
 
 if __name__ == "__main__":
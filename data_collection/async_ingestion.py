@@ -0,0 +1,237 @@
+import asyncio
+import os
+import json
+import logging
+import inspect
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from data_collection.message_decoder import loads
+from data_collection.stream_manager import BINANCE_STREAM_URL, MAX_STREAMS_PER_CONNECTION, build_combined_urls, normalize_stream
+from data_collection.stream_watchdog import STREAM_WATCHDOG, StreamWatchdog
+from monitoring.stream_metrics import shared_stream_metrics
+
+try:
+    import websockets  # asyncio WebSocket 클라이언트 (선택 의존성)
+except ImportError:
+    websockets = None
+
+# ✅ 환경 변수 로드
+load_dotenv()
+INGESTION_QUEUE_SIZE = int(os.getenv("INGESTION_QUEUE_SIZE", "10000"))  # 스트림별 최대 대기 메시지 수
+INGESTION_BATCH_SIZE = int(os.getenv("INGESTION_BATCH_SIZE", "500"))  # 블로킹 핸들러 1회 처리 최대 메시지 수
+
+
+class AsyncIngestionEngine:
+    def __init__(self, base_url=BINANCE_STREAM_URL, max_streams_per_connection=MAX_STREAMS_PER_CONNECTION,
+                 queue_size=INGESTION_QUEUE_SIZE, batch_size=INGESTION_BATCH_SIZE, reconnect_delay=5, ping_interval=30,
+                 metrics=shared_stream_metrics, watchdog=STREAM_WATCHDOG):
+        """ ✅ asyncio 기반 수집 엔진 (단일 이벤트 루프 + 스트림별 제한 큐 + 핸들러 코루틴) """
+        self.base_url = base_url
+        self.max_streams_per_connection = max_streams_per_connection
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.reconnect_delay = reconnect_delay
+        self.ping_interval = ping_interval
+        self.metrics = metrics  # 스트림별 지연 / 처리량 계측
+        self.consumers = defaultdict(list)  # 스트림 이름 → [(핸들러, 실행 방식)]
+        self.queues = {}
+        self.executors = {}
+        self.received = defaultdict(int)
+        self.dropped = defaultdict(int)
+        self.sockets = {}  # 스트림 이름 → 현재 연결 (스트림 단위 재구독)
+        self.request_id = 0
+        self.loop = None
+        self.running = False
+        self.watchdog = StreamWatchdog(self) if watchdog else None  # 시퀀스 누락 / 정지 감시 → 해당 스트림만 재구독
+
+    def subscribe(self, stream, handler, blocking=None):
+        """ ✅ 스트림 소비자 등록
+
+        - 코루틴 함수: 이벤트 루프에서 직접 await
+        - 일반 함수 (blocking=True, 기본값): 스트림 전용 스레드에서 배치 실행 (DB 저장, 차트, 알림 등)
+        - 일반 함수 (blocking=False): 이벤트 루프에서 즉시 호출 (가벼운 계산만)
+        """
+        if inspect.iscoroutinefunction(handler):
+            mode = "async"
+        else:
+            mode = "inline" if blocking is False else "blocking"
+        self.consumers[normalize_stream(stream)].append((handler, mode))
+
+    def register(self, *collectors):
+        """ ✅ 기존 분석 클래스(register_streams 지원)를 소비자로 연결 """
+        for collector in collectors:
+            collector.register_streams(self)
+
+    @property
+    def streams(self):
+        return list(self.consumers.keys())
+
+    def stats(self):
+        """ ✅ 스트림별 수신/드롭/대기 메시지 수 """
+        return {
+            stream: {
+                "received": self.received[stream],
+                "dropped": self.dropped[stream],
+                "queued": self.queues[stream].qsize() if stream in self.queues else 0,
+            }
+            for stream in self.streams
+        }
+
+    def _enqueue(self, stream, data, received_at):
+        """ ✅ 큐가 가득 차면 가장 오래된 메시지를 버리고 최신 메시지 유지 (수신 버퍼 적체 방지) """
+        queue = self.queues.get(stream)
+        if queue is None:
+            return
+        self.received[stream] += 1
+        if queue.full():
+            queue.get_nowait()
+            self.dropped[stream] += 1
+        queue.put_nowait((data, received_at))
+
+    async def _reader(self, url, streams):
+        """ ✅ 소켓 수신 루프 (JSON 디코딩 + 큐 적재만 수행) """
+        while self.running:
+            try:
+                async with websockets.connect(url, ping_interval=self.ping_interval, max_size=2 ** 22) as ws:
+                    for stream in streams:
+                        self.sockets[stream] = ws
+                    logging.info(f"🟢 [asyncio] Combined Stream 연결 ({len(streams)}개 스트림)")
+                    async for message in ws:
+                        received_at = time.time()
+                        started = time.perf_counter()
+                        payload = loads(message)
+                        stream = payload.get("stream")
+                        if stream is not None:
+                            stream = normalize_stream(stream)
+                            data = payload["data"]
+                            if self.metrics.enabled:
+                                self.metrics.received(stream, len(message), data, received_at)
+                                self.metrics.observe(stream, "parse", time.perf_counter() - started)
+                            if self.watchdog is not None:
+                                self.watchdog.observe(stream, data)
+                            self._enqueue(stream, data, received_at)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"🚨 [asyncio] WebSocket 오류 발생: {e}")
+            if self.running:
+                logging.warning(f"⚠️ WebSocket 연결 종료! {self.reconnect_delay}초 후 재연결...")
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _resubscribe(self, ws, streams):
+        try:
+            for method in ("UNSUBSCRIBE", "SUBSCRIBE"):
+                self.request_id += 1
+                await ws.send(json.dumps({"method": method, "params": streams, "id": self.request_id}))
+            logging.info(f"🔄 [asyncio] 스트림 재구독: {', '.join(streams)}")
+        except Exception as e:
+            logging.error(f"🚨 [asyncio] 스트림 재구독 실패 ({e}) → 해당 연결 재연결")
+            await ws.close()  # _reader 루프가 이 연결만 다시 연결
+
+    def resubscribe(self, streams):
+        """ ✅ 지정 스트림만 재구독 (감시기 스레드 → 이벤트 루프로 전송 예약) """
+        if self.loop is None:
+            return
+        by_socket = defaultdict(list)
+        for stream in streams:
+            ws = self.sockets.get(stream)
+            if ws is not None:
+                by_socket[ws].append(stream)
+        for ws, grouped in by_socket.items():
+            asyncio.run_coroutine_threadsafe(self._resubscribe(ws, grouped), self.loop)
+
+    def _run_batch(self, stream, handlers, batch):
+        """ ✅ 블로킹 핸들러 배치 실행 (스트림 전용 스레드, 메시지별 처리 시간 계측) """
+        for data in batch:
+            started = time.perf_counter()
+            for handler in handlers:
+                try:
+                    handler(data)
+                except Exception as e:
+                    logging.error(f"🚨 [{stream}] 핸들러 처리 실패: {e}")
+            if self.metrics.enabled:
+                self.metrics.handled(stream, data, time.perf_counter() - started)
+
+    async def _worker(self, stream):
+        """ ✅ 스트림별 소비 루프 (큐에 쌓인 메시지를 배치로 꺼내 처리) """
+        loop = asyncio.get_running_loop()
+        queue = self.queues[stream]
+        consumers = self.consumers[stream]
+        async_handlers = [handler for handler, mode in consumers if mode == "async"]
+        inline_handlers = [handler for handler, mode in consumers if mode == "inline"]
+        blocking_handlers = [handler for handler, mode in consumers if mode == "blocking"]
+
+        while True:
+            items = [await queue.get()]
+            while len(items) < self.batch_size and not queue.empty():
+                items.append(queue.get_nowait())
+            batch = [data for data, _ in items]
+            if self.metrics.enabled:
+                now = time.time()
+                for _, received_at in items:
+                    self.metrics.observe(stream, "queue", now - received_at)
+
+            if inline_handlers:
+                self._run_batch(stream, inline_handlers, batch)
+            for handler in async_handlers:
+                for data in batch:
+                    started = time.perf_counter()
+                    try:
+                        await handler(data)
+                    except Exception as e:
+                        logging.error(f"🚨 [{stream}] 핸들러 처리 실패: {e}")
+                    if self.metrics.enabled:
+                        self.metrics.handled(stream, data, time.perf_counter() - started)
+            if blocking_handlers:
+                await loop.run_in_executor(self.executors[stream], self._run_batch, stream, blocking_handlers, batch)
+
+    async def run(self):
+        """ ✅ 이벤트 루프에서 수신/소비 태스크 실행 """
+        if websockets is None:
+            raise ImportError("websockets 패키지가 필요합니다: pip install websockets")
+        if not self.consumers:
+            logging.warning("⚠️ 구독된 스트림이 없습니다!")
+            return
+
+        self.running = True
+        self.loop = asyncio.get_running_loop()
+        self.metrics.serve()  # METRICS_PORT 설정 시 HTTP 지표 엔드포인트 실행
+        tasks = []
+        for stream, consumers in self.consumers.items():
+            self.queues[stream] = asyncio.Queue(maxsize=self.queue_size)
+            self.metrics.gauge(f"ingestion_queue:{stream}", self.queues[stream].qsize)
+            if any(mode == "blocking" for _, mode in consumers):
+                self.executors[stream] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=stream)  # 스트림 내 순서 보장
+            tasks.append(asyncio.create_task(self._worker(stream)))
+
+        for streams, url in build_combined_urls(self.streams, self.base_url, self.max_streams_per_connection):
+            tasks.append(asyncio.create_task(self._reader(url, streams)))
+        if self.watchdog is not None:
+            self.watchdog.start()
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self.running = False
+            if self.watchdog is not None:
+                self.watchdog.stop()
+            for task in tasks:
+                task.cancel()
+            for executor in self.executors.values():
+                executor.shutdown(wait=False)
+
+    def start(self):
+        """ ✅ 엔진 실행 (블로킹) """
+        asyncio.run(self.run())
+
+# ✅ 사용 예시
+if __name__ == "__main__":
+    from data_collection.order_book_collector import OrderBookCollector
+    from data_collection.trade_data_collector import TradeDataCollector
+    from data_collection.websocket_listener import WebSocketListener
+
+    engine = AsyncIngestionEngine()
+    engine.register(OrderBookCollector(), TradeDataCollector(), WebSocketListener())
+    engine.start()
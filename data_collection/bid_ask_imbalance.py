@@ -1,100 +1,82 @@
-import websocket
-import json
 import pandas as pd
 import numpy as np
 import time
 import threading
-import matplotlib.pyplot as plt
 from collections import deque
 import requests
 import os
 from dotenv import load_dotenv
-from coin_selector import CoinSelector  # 📌 coin_selector.py에서 코인 선택 모듈 가져오기
+from data_collection.local_order_book import shared_order_books
+from data_collection.iceberg_engine import shared_iceberg_engine
+from data_collection.stream_manager import CombinedStreamManager
+from visualization.chart_renderer import shared_chart_renderer
+from select_coins import CoinSelector  # 📌 select_coins.py에서 코인 선택 모듈 가져오기
 
 # 환경 변수 로드 (.env 파일에서 API 키 및 설정값 가져오기)
 load_dotenv()
 
 BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://fstream.binance.com/ws/")
 
-# 📌 최적의 코인 선택
-selector = CoinSelector()
-SELECTED_COIN = selector.fetch_top_volatile_coins(top_n=1)[0]  # 변동성 높은 코인 1개 선택
-print(f"🎯 [선택된 코인]: {SELECTED_COIN}")
+def select_coin(selector=None):
+    """ 📌 최적의 코인 선택 (모듈 import 시점이 아닌 분석기 생성 시 1회 조회) """
+    selector = selector or CoinSelector()
+    top_coins = selector.fetch_top_volatile_coins(top_n=1)  # 변동성 높은 코인 1개 선택
+    if not top_coins:
+        raise RuntimeError("코인 선택 실패: 시세 데이터를 조회할 수 없습니다")
+    print(f"🎯 [선택된 코인]: {top_coins[0]}")
+    return top_coins[0]
 
 class BidAskImbalanceAnalyzer:
-    def __init__(self, depths=[100]):
-        self.symbol = SELECTED_COIN  # ✅ 선정된 코인을 사용
+    def __init__(self, depths=[100], symbol=None):
+        self.symbol = symbol or select_coin()  # ✅ 지정 코인 또는 선정된 코인을 사용
         self.depths = depths
-        self.order_book = {depth: {"bids": [], "asks": []} for depth in self.depths}
-
-        # ✅ 변동성이 높은 코인 적용 후 WebSocket URL 생성
-        self.ws_url = f"{BINANCE_WS_URL}{self.symbol.lower()}@depth@100ms"
+        self.book = None  # ✅ 공용 LocalOrderBook (Diff Depth 스트림으로 유지)
 
         # 데이터 저장용 (최근 100개 데이터 저장)
         self.imbalance_history = deque(maxlen=100)
         self.trade_volume = deque(maxlen=100)
         self.time_stamps = deque(maxlen=100)
 
-        # 차트 초기화
-        plt.ion()
-        self.fig, self.ax = plt.subplots(figsize=(10, 5))
+        # 차트 등록 (렌더링 스레드에서 고정 FPS로 출력)
+        self.chart = shared_chart_renderer.register(
+            f"bid_ask_imbalance_{self.symbol.lower()}", self.chart_snapshot,
+            title=f"Real-time Bid-Ask Imbalance ({self.symbol}, Depth 100)", xlabel="Time", ylabel="Imbalance")
 
     def calculate_imbalance(self, depth=100):
         """ Bid-Ask 불균형을 계산 """
-        bids = np.array(self.order_book[depth]["bids"])
-        asks = np.array(self.order_book[depth]["asks"])
-
-        if bids.size == 0 or asks.size == 0:
-            return None
-
-        total_bids = np.sum(bids[:, 1])  # 매수 총량
-        total_asks = np.sum(asks[:, 1])  # 매도 총량
-
-        imbalance = (total_bids - total_asks) / (total_bids + total_asks)
-        return imbalance
+        return self.book.imbalance(depth)
 
     def detect_spoofing(self, depth=100):
         """ Spoofing 감지: 비정상적인 대량 주문 후 빠른 취소 패턴 분석 """
-        bids = np.array(self.order_book[depth]["bids"])
-        asks = np.array(self.order_book[depth]["asks"])
+        bids = self.book.bids.top_qtys(depth)  # 매수 수량 (복사 없는 view)
+        asks = self.book.asks.top_qtys(depth)  # 매도 수량
 
         if bids.size == 0 or asks.size == 0:
             return False
 
-        top_bid_size = bids[0, 1]
-        top_ask_size = asks[0, 1]
+        top_bid_size = bids[0]
+        top_ask_size = asks[0]
 
-        if top_bid_size > np.median(bids[:, 1]) * 5 or top_ask_size > np.median(asks[:, 1]) * 5:
+        if top_bid_size > np.median(bids) * 5 or top_ask_size > np.median(asks) * 5:
             return True  # Spoofing 가능성 높음
         
         return False
 
     def detect_iceberg_order(self, depth=100):
-        """ Iceberg 주문 감지: 작은 수량으로 반복되는 주문 """
-        bids = np.array(self.order_book[depth]["bids"])
-        asks = np.array(self.order_book[depth]["asks"])
+        """ Iceberg 주문 감지: 상위 depth 레벨 안에서 체결 후 반복 재충전된 레벨 (체결 ↔ 호가 결합 엔진) """
+        bids = self.book.bids.top_prices(depth)
+        asks = self.book.asks.top_prices(depth)
 
         if bids.size == 0 or asks.size == 0:
             return False
 
-        small_orders = (bids[:, 1] < np.median(bids[:, 1]) * 0.5).sum() + \
-                       (asks[:, 1] < np.median(asks[:, 1]) * 0.5).sum()
-
-        if small_orders > len(bids) * 0.5:
-            return True  
-        
-        return False
-
-    def process_order_book(self, data):
-        """ 주문장 데이터 업데이트 후 불균형 분석 """
-        bids = np.array([[float(price), float(size)] for price, size in data["bids"][:100]])
-        asks = np.array([[float(price), float(size)] for price, size in data["asks"][:100]])
+        return bool(shared_iceberg_engine.icebergs(self.symbol, min_price=bids[-1], max_price=asks[-1]))
 
-        for depth in self.depths:
-            self.order_book[depth]["bids"] = bids[:depth]
-            self.order_book[depth]["asks"] = asks[:depth]
-
-        imbalances = {depth: self.calculate_imbalance(depth) for depth in self.depths}
+    def process_order_book(self, book):
+        """ 로컬 호가창 갱신 후 불균형 분석 """
+        self.book = book
+        values = book.depth_view().imbalances(self.depths)  # 공유 누적 곡선에서 모든 depth 동시 계산
+        imbalances = {depth: (None if np.isnan(value) else float(value)) for depth, value in zip(self.depths, values)}
 
         # 불균형 변화율 저장
         self.imbalance_history.append(imbalances[100])
@@ -115,27 +97,24 @@ class BidAskImbalanceAnalyzer:
         self.update_chart()
 
     def update_chart(self):
-        """ 실시간 차트 업데이트 (OBS 연동) """
-        self.ax.clear()
-        self.ax.plot(self.time_stamps, self.imbalance_history, label="Bid-Ask Imbalance (depth100)", color="blue")
-        self.ax.set_title(f"Real-time Bid-Ask Imbalance ({self.symbol}, Depth 100)")
-        self.ax.set_xlabel("Time")
-        self.ax.set_ylabel("Imbalance")
-        self.ax.legend()
-        plt.xticks(rotation=45)
-        plt.draw()
-        plt.pause(0.01)
-
-    def on_message(self, ws, message):
-        """ WebSocket 메시지 수신 후 처리 """
-        data = json.loads(message)
-        self.process_order_book(data)
+        """ 실시간 차트 업데이트 요청 (OBS 연동, 그리기는 렌더링 스레드에서 수행) """
+        self.chart.mark_dirty()
+
+    def chart_snapshot(self):
+        """ 차트 데이터 스냅샷 (렌더링 스레드에서 호출) """
+        return {"Bid-Ask Imbalance (depth100)": (None, list(self.imbalance_history))}
+
+    def register_streams(self, manager):
+        """ ✅ 공용 LocalOrderBook에 분석기로 등록 (Diff Depth 스트림은 코인당 1회만 구독) """
+        shared_order_books.subscribe(manager, self.symbol, self.process_order_book)
+        shared_iceberg_engine.register_streams(manager, self.symbol)  # Iceberg 판단용 체결 ↔ 호가 결합
 
     def run(self):
         """ WebSocket 실행 """
-        ws = websocket.WebSocketApp(self.ws_url, on_message=self.on_message)
+        manager = CombinedStreamManager()
+        self.register_streams(manager)
         print(f"🟢 {self.symbol} Bid-Ask Imbalance 데이터 수집 시작 (Depth 100 적용)")
-        ws.run_forever()
+        manager.start(block=True)
 
     def start_analysis(self):
         """ 백그라운드 스레드에서 분석 시작 """
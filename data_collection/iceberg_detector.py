@@ -1,14 +1,11 @@
-import websocket
-import json
-import numpy as np
-import requests
 import os
 import logging
-import time
-import matplotlib.pyplot as plt
-from collections import deque
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from storage.db_pool import shared_db_pool
+from data_collection.iceberg_engine import shared_iceberg_engine
+from data_collection.stream_manager import CombinedStreamManager
+from notification.alert_dispatcher import shared_alert_dispatcher
+from visualization.chart_renderer import shared_chart_renderer
 
 # ✅ 환경 변수 로드
 load_dotenv()
@@ -21,90 +18,65 @@ MONGO_COLLECTION = os.getenv("MONGO_COLLECTION", "iceberg_orders")
 SELECTED_COINS = os.getenv("SELECTED_COINS", "BTCUSDT,ETHUSDT,SOLUSDT").split(",")
 
 class IcebergDetector:
-    def __init__(self, depth=100, threshold=0.6, window_size=10):
-        """ ✅ 다중 코인 Iceberg 주문 탐지 클래스 """
+    def __init__(self, engine=shared_iceberg_engine):
+        """ ✅ 다중 코인 Iceberg 주문 탐지 클래스 (체결 ↔ 호가 Diff 결합 엔진 이벤트 기반) """
         self.symbols = [coin.strip().upper() for coin in SELECTED_COINS]
-        self.depth = depth
-        self.threshold = threshold  # Iceberg 주문 탐지 민감도 (0~1)
-        self.window_size = window_size  # 최근 몇 개의 주문을 비교할지
-        self.recent_orders = {symbol: deque(maxlen=self.window_size) for symbol in self.symbols}
-        self.mongo_client = MongoClient(MONGO_URL)
+        self.engine = engine
+        self.engine.add_listener(self.on_iceberg)
+        self.mongo_client = shared_db_pool.mongo(MONGO_URL)
         self.db = self.mongo_client[MONGO_DB]
         self.collection = self.db[MONGO_COLLECTION]
 
-        # ✅ WebSocket URL 설정
-        self.ws_urls = {symbol: f"{BINANCE_WS_URL}{symbol.lower()}@depth@100ms" for symbol in self.symbols}
+        # 차트 등록 (OBS 시각화 지원, 렌더링 스레드에서 고정 FPS로 출력)
+        self.last_icebergs = {}  # 코인 → 최근 감지 (가격 목록, 추정 숨은 수량 목록)
+        self.chart = shared_chart_renderer.register(
+            "iceberg_orders", self.chart_snapshot, title="Iceberg 주문 감지", xlabel="Price", ylabel="Hidden Size", kind="scatter")
 
-        # 차트 초기화 (OBS 시각화 지원)
-        plt.ion()
-        self.fig, self.ax = plt.subplots(figsize=(10, 5))
-
-    def send_telegram_alert(self, message):
+    def send_telegram_alert(self, message, key=None):
         """ ✅ Iceberg 주문 감지 시 Telegram 알림 전송 """
         if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-            payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-            requests.post(url, data=payload)
+            shared_alert_dispatcher.send(message, key=key, chat_id=TELEGRAM_CHAT_ID, bot_token=TELEGRAM_BOT_TOKEN)
         else:
             logging.warning("⚠️ Telegram 설정이 누락되었습니다! .env 파일을 확인하세요.")
 
-    def detect_iceberg_order(self, data, symbol):
-        """ ✅ Iceberg 주문 탐지 """
-        orders = np.array([[float(price), float(size)] for price, size in data["bids"] + data["asks"]])
-
-        if len(self.recent_orders[symbol]) < self.window_size:
-            self.recent_orders[symbol].append(orders)
-            return None  # 충분한 데이터가 쌓일 때까지 대기
-
-        prev_orders = self.recent_orders[symbol].popleft()
-        self.recent_orders[symbol].append(orders)
-
-        # ✅ 주문량 변화 감지 (Bid-Ask Imbalance + Iceberg 주문 패턴 분석)
-        price_diffs = np.abs(prev_orders[:, 0] - orders[:, 0])
-        size_diffs = np.abs(prev_orders[:, 1] - orders[:, 1])
-        large_orders = size_diffs > (np.mean(size_diffs) * self.threshold)
-
-        if np.any(large_orders):
-            iceberg_price = orders[large_orders, 0]
-            iceberg_size = orders[large_orders, 1]
-            result = {"timestamp": time.time(), "symbol": symbol, "price": iceberg_price.tolist(), "size": iceberg_size.tolist()}
-
-            # ✅ 데이터 저장 (MongoDB)
-            self.collection.insert_one(result)
-            logging.info(f"✅ [Iceberg 주문 감지] {result}")
-
-            # ✅ Telegram 알림 전송
-            self.send_telegram_alert(f"🚨 [Iceberg 주문 감지] {symbol} 가격: {iceberg_price.tolist()}, 수량: {iceberg_size.tolist()}")
-
-            # ✅ 차트 업데이트
-            self.ax.clear()
-            self.ax.scatter(iceberg_price, iceberg_size, color="red", label="Iceberg 주문")
-            self.ax.set_title(f"Iceberg 주문 감지 - {symbol}")
-            self.ax.legend()
-            plt.draw()
-            plt.pause(0.1)
-
-    def on_message(self, ws, message, symbol):
-        """ ✅ WebSocket 메시지 처리 (호가 데이터 수신) """
-        data = json.loads(message)
-        self.detect_iceberg_order(data, symbol)
-
-    def on_error(self, ws, error):
-        logging.error(f"🚨 WebSocket 오류 발생: {error}")
-
-    def on_close(self, ws, close_status_code, close_msg):
-        logging.warning("⚠️ WebSocket 연결 종료! 5초 후 재연결...")
-        time.sleep(5)
-        self.start_websocket()
-
-    def start_websocket(self):
-        """ ✅ 다중 WebSocket 실행 (각 코인별 depth100) """
-        for symbol, ws_url in self.ws_urls.items():
-            ws = websocket.WebSocketApp(ws_url,
-                                        on_message=lambda ws, msg: self.on_message(ws, msg, symbol),
-                                        on_error=self.on_error,
-                                        on_close=self.on_close)
-            ws.run_forever()
+    def on_iceberg(self, event):
+        """ ✅ Iceberg 주문 감지 이벤트 처리 (체결량이 표시 수량을 넘고 레벨이 반복 재충전됨) """
+        if event.symbol not in self.symbols:
+            return
+        result = {"timestamp": event.event_time / 1000, "symbol": event.symbol, "side": event.side, "price": event.price,
+                  "executed": event.executed, "visible": event.visible, "hidden": event.hidden, "refills": event.refills}
+
+        # ✅ 데이터 저장 (MongoDB)
+        self.collection.insert_one(result)
+        logging.info(f"✅ [Iceberg 주문 감지] {result}")
+
+        # ✅ Telegram 알림 전송
+        self.send_telegram_alert(f"🚨 [Iceberg 주문 감지] {event.symbol} {event.side} 가격: {event.price}, "
+                                 f"체결량: {event.executed:.4f}, 추정 숨은 수량: {event.hidden:.4f} (재충전 {event.refills}회)",
+                                 key=f"iceberg:{event.symbol}")
+
+        # ✅ 차트 업데이트 요청 (그리기는 렌더링 스레드에서 수행)
+        prices, sizes = self.last_icebergs.get(event.symbol, ([], []))
+        self.last_icebergs[event.symbol] = ((prices + [event.price])[-50:], (sizes + [event.hidden])[-50:])
+        self.chart.mark_dirty()
+
+    def chart_snapshot(self):
+        """ ✅ 차트 데이터 스냅샷 (코인별 최근 Iceberg 주문, 렌더링 스레드에서 호출) """
+        return {f"{symbol} Iceberg 주문": points for symbol, points in list(self.last_icebergs.items())}
+
+    def register_streams(self, manager):
+        """ ✅ 코인별 체결 + Diff Depth 스트림을 Iceberg 엔진에 연결 (스트림은 코인당 1회만 구독) """
+        for symbol in self.symbols:
+            self.engine.register_streams(manager, symbol)
+
+    def start_websocket(self, manager=None):
+        """ ✅ Combined Stream 실행 (각 코인별 체결 + Diff Depth) """
+        if manager is not None:
+            self.register_streams(manager)  # 공유 관리자에서 실행
+            return
+        manager = CombinedStreamManager()
+        self.register_streams(manager)
+        manager.start(block=True)
 
 # ✅ 사용 예시
 if __name__ == "__main__":
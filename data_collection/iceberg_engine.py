@@ -0,0 +1,181 @@
+import os
+import time
+import logging
+import numpy as np
+from collections import OrderedDict
+from typing import NamedTuple
+from dotenv import load_dotenv
+from data_collection.local_order_book import shared_order_books
+from data_collection.market_data_bus import shared_market_bus
+from data_collection.message_decoder import levels_to_array
+
+# ✅ 환경 변수 로드
+load_dotenv()
+ICEBERG_MAX_LEVELS = int(os.getenv("ICEBERG_MAX_LEVELS", "2000"))  # 코인별 추적 가격 레벨 수 (초과 시 가장 오래된 레벨 제거)
+ICEBERG_MIN_REFILLS = int(os.getenv("ICEBERG_MIN_REFILLS", "2"))  # Iceberg 판단 최소 재충전 횟수
+ICEBERG_MIN_RATIO = float(os.getenv("ICEBERG_MIN_RATIO", "1.5"))  # Iceberg 판단 기준 (체결량 / 최대 표시 수량)
+
+BID, ASK = 0, 1
+
+
+class IcebergEvent(NamedTuple):
+    """ ✅ Iceberg 주문 감지 이벤트 """
+    symbol: str
+    side: str  # "bid" / "ask"
+    price: float
+    executed: float  # 레벨 누적 체결량
+    visible: float  # 현재 표시 수량
+    hidden: float  # 추정 숨은 수량 (체결량 - 최대 표시 수량)
+    refills: int  # 체결 후 재충전 횟수
+    event_time: int
+
+
+class LevelState:
+    __slots__ = ("visible", "max_visible", "executed", "pending", "refills", "reported")
+
+    def __init__(self, visible):
+        """ ✅ 가격 레벨 체결 / 호가 결합 상태 """
+        self.visible = visible  # 마지막 호가 수량
+        self.max_visible = visible  # 동시에 표시된 최대 수량
+        self.executed = 0.0  # 추적 이후 누적 체결량
+        self.pending = 0.0  # 다음 호가 Diff 반영 전 체결량
+        self.refills = 0
+        self.reported = False
+
+    @property
+    def hidden(self):
+        return max(self.executed - self.max_visible, 0.0)
+
+
+class IcebergEngine:
+    def __init__(self, order_books=shared_order_books, bus=shared_market_bus, max_levels=ICEBERG_MAX_LEVELS,
+                 min_refills=ICEBERG_MIN_REFILLS, min_ratio=ICEBERG_MIN_RATIO):
+        """ ✅ 체결 ↔ 호가 Diff 가격 레벨 결합 엔진 (Iceberg / 재충전 주문 탐지)
+
+        체결은 해당 가격 레벨의 대기 체결량으로 누적하고, 다음 호가 Diff에서
+        (이전 수량 - 대기 체결량) 보다 수량이 많으면 재충전으로 기록합니다.
+        누적 체결량이 최대 표시 수량의 min_ratio 배를 넘고 min_refills 회 이상 재충전되면 Iceberg 로 판단합니다.
+        레벨당 갱신은 O(1), 코인별 레벨 수는 max_levels 로 제한됩니다.
+        """
+        self.order_books = order_books
+        self.bus = bus
+        self.max_levels = max_levels
+        self.min_refills = min_refills
+        self.min_ratio = min_ratio
+        self.levels = {}  # 코인 → OrderedDict((side, price) → LevelState), 최근 갱신 순
+        self.listeners = []
+        self.subscribed = set()
+        self.detected = 0
+
+    def add_listener(self, listener):
+        """ ✅ Iceberg 감지 이벤트 소비자 등록 (listener(IcebergEvent)) """
+        self.listeners.append(listener)
+
+    def _state(self, symbol, side, price, create_visible=None):
+        levels = self.levels.get(symbol)
+        if levels is None:
+            levels = self.levels[symbol] = OrderedDict()
+        state = levels.get((side, price))
+        if state is not None:
+            levels.move_to_end((side, price))
+            return state
+        if create_visible is None:
+            return None
+        state = levels[(side, price)] = LevelState(create_visible)
+        if len(levels) > self.max_levels:
+            levels.popitem(last=False)
+        return state
+
+    def on_trade(self, record):
+        """ ✅ 체결 → 체결된 maker 쪽 가격 레벨에 대기 체결량 누적
+
+        체결 반영 Diff 가 체결보다 먼저 도착한 경우 (trade_time <= 호가창 event_time) 호가 수량에 이미 빠져 있으므로
+        누적 체결량에만 더하고 대기 체결량에는 넣지 않습니다 (이중 차감 → 거짓 재충전 방지).
+        """
+        side = BID if record.is_buyer_maker else ASK  # 매수자가 maker 이면 매수 호가가 체결됨
+        book = self.order_books.books.get(record.symbol)
+        if book is None or not book.is_ready:
+            return
+        visible = (book.bids if side == BID else book.asks).qty_at(record.price)
+        state = self._state(record.symbol, side, record.price, create_visible=visible)
+        state.executed += record.quantity
+        if book.event_time is None or record.trade_time > book.event_time:
+            state.pending += record.quantity  # 다음 Diff 에서 차감될 체결량
+
+    def on_depth(self, book, data):
+        """ ✅ 호가 Diff → 추적 중인 레벨의 재충전 / 소진 판단 (변경 레벨 수에 비례) """
+        levels = self.levels.get(book.symbol)
+        if not levels:
+            return
+        for side, changes in ((BID, data["b"]), (ASK, data["a"])):
+            if not isinstance(changes, np.ndarray):
+                changes = levels_to_array(changes)
+            for price, qty in changes.tolist():
+                state = levels.get((side, price))
+                if state is not None:
+                    self._update(book, side, price, qty, state)
+
+    def _update(self, book, side, price, qty, state):
+        expected = max(state.visible - state.pending, 0.0)
+        if state.pending > 0 and qty > expected:
+            state.refills += 1  # 체결 후 다시 채워짐
+        state.visible = qty
+        state.max_visible = max(state.max_visible, qty)
+        state.pending = 0.0
+        if qty == 0:
+            del self.levels[book.symbol][(side, price)]  # 레벨 소멸 → 추적 종료
+            return
+        if (not state.reported and state.refills >= self.min_refills
+                and state.executed >= self.min_ratio * state.max_visible):
+            state.reported = True
+            self.detected += 1
+            event = IcebergEvent(book.symbol, "bid" if side == BID else "ask", price, state.executed, qty,
+                                 state.hidden, state.refills, book.event_time or int(time.time() * 1000))
+            for listener in self.listeners:
+                try:
+                    listener(event)
+                except Exception as e:
+                    logging.error(f"🚨 [Iceberg 엔진] {book.symbol} 소비자 처리 실패: {e}")
+
+    def on_resync(self, symbol, reason):
+        """ ✅ 호가창 재동기화 → 코인 레벨 상태 폐기 (누락 Diff 로 대기 체결량 / 재충전 판단이 어긋나지 않도록) """
+        self.levels.pop(symbol, None)
+
+    def icebergs(self, symbol, min_price=None, max_price=None):
+        """ ✅ 현재 Iceberg 로 판단된 레벨 [(side, price, LevelState)] (가격 구간 지정 가능) """
+        return [(side, price, state) for (side, price), state in list(self.levels.get(symbol.upper(), {}).items())
+                if state.reported and (min_price is None or price >= min_price) and (max_price is None or price <= max_price)]
+
+    def hidden_volume(self, symbol):
+        """ ✅ 추적 중인 레벨의 추정 숨은 수량 합계 (매수, 매도) """
+        totals = [0.0, 0.0]
+        for (side, _), state in list(self.levels.get(symbol.upper(), {}).items()):
+            totals[side] += state.hidden
+        return tuple(totals)
+
+    def register_streams(self, manager, symbol):
+        """ ✅ 코인별 체결(버스) + 호가 Diff(공용 호가창) 연결 (관리자 / 코인당 1회) """
+        symbol = symbol.upper()
+        key = (id(manager), symbol)
+        if key in self.subscribed:
+            return
+        self.subscribed.add(key)
+        self.order_books.subscribe(manager, symbol, diff_listener=self.on_depth, resync_listener=self.on_resync)
+        self.bus.subscribe(manager, "trade", symbol, self.on_trade)
+
+    def stats(self):
+        """ ✅ 코인별 추적 레벨 수 및 감지 건수 """
+        return {"levels": {symbol: len(levels) for symbol, levels in self.levels.items()}, "detected": self.detected}
+
+
+# ✅ 프로세스 공용 Iceberg 엔진 (IcebergDetector, BidAskImbalanceAnalyzer 공유)
+shared_iceberg_engine = IcebergEngine()
+
+# ✅ 사용 예시
+if __name__ == "__main__":
+    from data_collection.stream_manager import CombinedStreamManager
+
+    manager = CombinedStreamManager()
+    shared_iceberg_engine.register_streams(manager, "BTCUSDT")
+    shared_iceberg_engine.add_listener(lambda event: print(f"🐋 [Iceberg] {event}"))
+    manager.start(block=True)
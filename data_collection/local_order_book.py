@@ -0,0 +1,396 @@
+import os
+import time
+import logging
+import requests
+import numpy as np
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from dotenv import load_dotenv
+from data_collection.message_decoder import levels_to_array
+
+# ✅ 환경 변수 로드
+load_dotenv()
+BINANCE_FUTURES_URL = os.getenv("BINANCE_FUTURES_URL", "https://fapi.binance.com/fapi/v1")
+ORDER_BOOK_MAX_LEVELS = int(os.getenv("ORDER_BOOK_MAX_LEVELS", "1000"))  # 호가 단면별 유지 레벨 수
+SNAPSHOT_RETRY_INTERVAL = float(os.getenv("SNAPSHOT_RETRY_INTERVAL", "1.0"))  # 스냅샷 재요청 최소 간격 (초)
+SNAPSHOT_BUFFER_SIZE = int(os.getenv("SNAPSHOT_BUFFER_SIZE", "1000"))  # 스냅샷 조회 중 보관할 Diff 이벤트 수
+SNAPSHOT_WORKERS = int(os.getenv("SNAPSHOT_WORKERS", "4"))  # REST 스냅샷 조회 스레드 수 (수신 스레드 차단 방지)
+
+# ✅ REST 스냅샷 조회 전용 스레드 (소켓 수신 스레드는 조회를 기다리지 않음)
+snapshot_executor = ThreadPoolExecutor(max_workers=SNAPSHOT_WORKERS, thread_name_prefix="book-snapshot")
+
+
+class BookSide:
+    def __init__(self, descending, capacity=ORDER_BOOK_MAX_LEVELS):
+        """ ✅ 정렬된 배열 기반 호가 단면 (최우선 호가가 항상 index 0) """
+        self.descending = descending  # 매수(bids)는 가격 내림차순
+        self.capacity = capacity
+        self.keys = np.empty(capacity, dtype=np.float64)  # 오름차순 정렬 키 (매수는 -가격)
+        self.prices = np.empty(capacity, dtype=np.float64)
+        self.qtys = np.empty(capacity, dtype=np.float64)
+        self.count = 0
+
+    def clear(self):
+        self.count = 0
+
+    def load(self, levels):
+        """ ✅ 스냅샷 레벨 적재 (스냅샷 시점에만 1회 정렬) """
+        levels = np.asarray(levels, dtype=np.float64).reshape(-1, 2)
+        levels = levels[levels[:, 1] > 0]
+        keys = -levels[:, 0] if self.descending else levels[:, 0]
+        order = np.argsort(keys, kind="stable")[:self.capacity]
+        n = len(order)
+        self.keys[:n] = keys[order]
+        self.prices[:n] = levels[order, 0]
+        self.qtys[:n] = levels[order, 1]
+        self.count = n
+
+    def update(self, price, qty):
+        """ ✅ 단일 가격 레벨 갱신 (qty == 0 이면 삭제, 재정렬 없이 이진 탐색 + 구간 이동) """
+        key = -price if self.descending else price
+        n = self.count
+        i = int(np.searchsorted(self.keys[:n], key))
+
+        if i < n and self.keys[i] == key:
+            if qty > 0:
+                self.qtys[i] = qty
+            else:
+                self.keys[i:n - 1] = self.keys[i + 1:n]
+                self.prices[i:n - 1] = self.prices[i + 1:n]
+                self.qtys[i:n - 1] = self.qtys[i + 1:n]
+                self.count = n - 1
+            return
+
+        if qty <= 0 or i >= self.capacity:
+            return  # 없는 레벨 삭제 또는 유지 범위 밖 레벨
+
+        end = min(n, self.capacity - 1)  # 가득 찬 경우 가장 먼 레벨을 버림
+        self.keys[i + 1:end + 1] = self.keys[i:end]
+        self.prices[i + 1:end + 1] = self.prices[i:end]
+        self.qtys[i + 1:end + 1] = self.qtys[i:end]
+        self.keys[i] = key
+        self.prices[i] = price
+        self.qtys[i] = qty
+        self.count = end + 1
+
+    def apply(self, levels):
+        """ ✅ 변경 레벨 목록 일괄 적용 ([[price, qty], ...] 또는 (N, 2) 배열) """
+        if not isinstance(levels, np.ndarray):
+            levels = levels_to_array(levels)
+        for price, qty in levels.tolist():
+            self.update(price, qty)
+
+    @property
+    def best_price(self):
+        return self.prices[0] if self.count else None
+
+    def qty_at(self, price):
+        """ ✅ 가격 레벨 수량 (이진 탐색, 없으면 0) """
+        key = -price if self.descending else price
+        i = int(np.searchsorted(self.keys[:self.count], key))
+        return float(self.qtys[i]) if i < self.count and self.keys[i] == key else 0.0
+
+    def top_prices(self, n):
+        """ ✅ 상위 N개 가격 (복사 없는 view) """
+        return self.prices[:min(n, self.count)]
+
+    def top_qtys(self, n):
+        """ ✅ 상위 N개 수량 (복사 없는 view) """
+        return self.qtys[:min(n, self.count)]
+
+    def levels(self, n):
+        """ ✅ 상위 N개 레벨 [[price, qty], ...] """
+        n = min(n, self.count)
+        return np.column_stack((self.prices[:n], self.qtys[:n]))
+
+    def volume(self, n):
+        """ ✅ 상위 N개 레벨 수량 합계 """
+        return float(self.qtys[:min(n, self.count)].sum())
+
+    def cumulative(self, n):
+        """ ✅ 상위 N개 레벨 누적 수량 곡선 """
+        return np.cumsum(self.qtys[:min(n, self.count)])
+
+
+class DepthView:
+    __slots__ = ("bid_cum", "ask_cum")
+
+    def __init__(self, bid_qtys, ask_qtys):
+        """ ✅ 양쪽 누적 수량 곡선 (호가 갱신당 cumsum 1회, 모든 깊이 지표는 인덱싱으로 계산) """
+        self.bid_cum = np.cumsum(bid_qtys)
+        self.ask_cum = np.cumsum(ask_qtys)
+
+    @staticmethod
+    def _take(cum, depths):
+        if len(cum) == 0:
+            return np.zeros(len(depths))
+        return cum[np.minimum(depths, len(cum)) - 1]
+
+    def volumes(self, depths):
+        """ ✅ 상위 K 레벨 수량 합계 (K 목록 → (매수 배열, 매도 배열)) """
+        depths = np.asarray(depths, dtype=np.int64)
+        return self._take(self.bid_cum, depths), self._take(self.ask_cum, depths)
+
+    def ratios(self, depths):
+        """ ✅ 상위 K 레벨 Bid-Ask 비율 (0으로 나누기 방지) """
+        bids, asks = self.volumes(depths)
+        return bids / (asks + 1e-9)
+
+    def imbalances(self, depths):
+        """ ✅ 상위 K 레벨 Bid-Ask 불균형 (양쪽 모두 비어 있으면 nan) """
+        bids, asks = self.volumes(depths)
+        total = bids + asks
+        return np.divide(bids - asks, total, out=np.full(len(total), np.nan), where=total > 0)
+
+    def curves(self, depth):
+        """ ✅ 상위 depth 레벨 누적 수량 곡선 (복사 없는 view) """
+        return self.bid_cum[:depth], self.ask_cum[:depth]
+
+
+class LocalOrderBook:
+    def __init__(self, symbol, max_levels=ORDER_BOOK_MAX_LEVELS, snapshot_limit=1000, session=None):
+        """ ✅ Diff Depth 스트림 기반 로컬 L2 호가창 (REST 스냅샷 + U/u 시퀀스 검증 + 자동 재동기화) """
+        self.symbol = symbol.upper()
+        self.snapshot_limit = snapshot_limit
+        self.session = session or requests.Session()
+        self.bids = BookSide(descending=True, capacity=max_levels)
+        self.asks = BookSide(descending=False, capacity=max_levels)
+        self.last_update_id = None  # None 이면 스냅샷 필요
+        self.synced = False  # 스냅샷 이후 첫 이벤트 연결 여부
+        self.event_time = None
+        self.resync_count = 0
+        self.resync_reason = None  # 다른 스레드에서 요청한 재동기화 사유 (다음 Diff 수신 시 수신 스레드에서 처리)
+        self.next_snapshot_time = 0.0
+        self.snapshot_future = None  # 진행 중인 백그라운드 스냅샷 조회
+        self.buffer = deque(maxlen=SNAPSHOT_BUFFER_SIZE)  # 스냅샷 도착 전 Diff 이벤트
+        self.version = 0  # 호가 변경 횟수 (깊이 지표 캐시 무효화)
+        self._depth_view = None
+        self._depth_view_version = -1
+
+    def request_snapshot(self):
+        """ ✅ REST 호가 스냅샷 요청 (호가창은 변경하지 않음, 조회 스레드에서 실행) """
+        response = self.session.get(f"{BINANCE_FUTURES_URL}/depth",
+                                    params={"symbol": self.symbol, "limit": self.snapshot_limit}, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_snapshot(self):
+        """ ✅ REST 호가 스냅샷 조회 후 적재 (동기) """
+        self.load_snapshot(self.request_snapshot())
+
+    def _poll_snapshot(self):
+        """ ✅ 백그라운드 스냅샷 조회 상태 확인 (완료 시 스냅샷, 조회 중 / 실패 시 None, 필요하면 새 조회 시작) """
+        future = self.snapshot_future
+        if future is None:
+            if time.time() >= self.next_snapshot_time:
+                self.next_snapshot_time = time.time() + SNAPSHOT_RETRY_INTERVAL
+                self.snapshot_future = snapshot_executor.submit(self.request_snapshot)
+            return None
+        if not future.done():
+            return None
+        self.snapshot_future = None
+        try:
+            return future.result()
+        except requests.RequestException as e:
+            logging.error(f"🚨 [호가 스냅샷] {self.symbol} 요청 실패: {e}")
+            return None
+
+    def load_snapshot(self, snapshot):
+        """ ✅ 스냅샷 적재 후 다음 Diff 이벤트 연결 대기 """
+        self.bids.load(snapshot["bids"])
+        self.asks.load(snapshot["asks"])
+        self.last_update_id = snapshot["lastUpdateId"]
+        self.synced = False
+        self.version += 1
+        logging.info(f"✅ [호가 스냅샷] {self.symbol} lastUpdateId={self.last_update_id}")
+
+    def resync(self, reason):
+        """ ✅ 시퀀스 누락 시 호가 초기화 (다음 메시지에서 스냅샷 재요청) """
+        logging.warning(f"⚠️ [호가 재동기화] {self.symbol} - {reason}")
+        self.resync_count += 1
+        self.last_update_id = None
+        self.synced = False
+        self.snapshot_future = None  # 재동기화 이전에 시작한 조회 결과는 사용하지 않음
+        self.buffer.clear()
+        self.bids.clear()
+        self.asks.clear()
+        self.version += 1
+
+    def process_depth_update(self, data):
+        """ ✅ Diff Depth 이벤트 적용 (적용되면 True)
+
+        - 선물: 첫 이벤트 U <= lastUpdateId <= u, 이후 pu == 직전 u
+        - 현물: 첫 이벤트 U <= lastUpdateId+1 <= u, 이후 U == 직전 u + 1
+        - 스냅샷이 없으면 조회 스레드에 요청하고 이벤트를 보관, 도착하면 보관 이벤트부터 이어서 적용
+        """
+        if self.last_update_id is None:
+            snapshot = self._poll_snapshot()
+            if snapshot is None:
+                self.buffer.append(data)
+                return False
+            self.load_snapshot(snapshot)
+            buffered = list(self.buffer)
+            self.buffer.clear()
+            for event in buffered:
+                self._apply(event)
+                if self.last_update_id is None:
+                    self.buffer.append(data)  # 보관 이벤트 누락 → 재동기화 대기
+                    return False
+        return self._apply(data)
+
+    def _apply(self, data):
+        """ ✅ 스냅샷 이후 Diff 이벤트 시퀀스 검증 및 적용 """
+        first_id, final_id = data["U"], data["u"]
+        offset = 0 if "pu" in data else 1
+
+        if final_id < self.last_update_id + offset:
+            return False  # 스냅샷 이전 이벤트
+
+        if not self.synced:
+            if first_id > self.last_update_id + offset:
+                self.resync(f"스냅샷({self.last_update_id}) 이후 이벤트 누락 (U={first_id})")
+                return False
+            self.synced = True
+        elif "pu" in data:
+            if data["pu"] != self.last_update_id:
+                self.resync(f"시퀀스 누락 (pu={data['pu']}, 직전 u={self.last_update_id})")
+                return False
+        elif first_id != self.last_update_id + 1:
+            self.resync(f"시퀀스 누락 (U={first_id}, 직전 u={self.last_update_id})")
+            return False
+
+        self.bids.apply(data["b"])
+        self.asks.apply(data["a"])
+        self.last_update_id = final_id
+        self.event_time = data.get("E")
+        self.version += 1
+        return True
+
+    @property
+    def is_ready(self):
+        return self.synced and self.bids.count > 0 and self.asks.count > 0
+
+    @property
+    def mid_price(self):
+        if not self.is_ready:
+            return None
+        return (self.bids.prices[0] + self.asks.prices[0]) / 2
+
+    @property
+    def spread(self):
+        if not self.is_ready:
+            return None
+        return self.asks.prices[0] - self.bids.prices[0]
+
+    def depth_view(self):
+        """ ✅ 현재 호가의 누적 수량 곡선 (갱신 후 첫 호출 시에만 계산, 이후 모든 분석기가 공유) """
+        if self._depth_view_version != self.version:
+            self._depth_view = DepthView(self.bids.top_qtys(self.bids.count), self.asks.top_qtys(self.asks.count))
+            self._depth_view_version = self.version
+        return self._depth_view
+
+    def imbalance(self, depth):
+        """ ✅ 상위 depth 레벨 Bid-Ask 불균형 """
+        value = self.depth_view().imbalances([depth])[0]
+        return None if np.isnan(value) else float(value)
+
+
+class OrderBookManager:
+    def __init__(self, max_levels=ORDER_BOOK_MAX_LEVELS):
+        """ ✅ 코인별 LocalOrderBook 공유 관리자 (모든 호가 분석기가 동일한 호가창을 참조) """
+        self.max_levels = max_levels
+        self.session = requests.Session()
+        self.books = {}
+        self.listeners = defaultdict(list)  # 코인 → listener(book) 목록
+        self.diff_listeners = defaultdict(list)  # 코인 → listener(book, data) 목록 (적용된 Diff 이벤트 전달)
+        self.resync_listeners = defaultdict(list)  # 코인 → listener(symbol, reason) 목록 (호가 재동기화 시 상태 재구성)
+        self.subscribed = set()
+
+    def get(self, symbol):
+        symbol = symbol.upper()
+        if symbol not in self.books:
+            self.books[symbol] = LocalOrderBook(symbol, max_levels=self.max_levels, session=self.session)
+        return self.books[symbol]
+
+    def add_listener(self, symbol, listener):
+        self.listeners[symbol.upper()].append(listener)
+
+    def add_diff_listener(self, symbol, listener):
+        self.diff_listeners[symbol.upper()].append(listener)
+
+    def add_resync_listener(self, symbol, listener):
+        self.resync_listeners[symbol.upper()].append(listener)
+
+    def resync(self, symbol, reason):
+        """ ✅ 외부 요청 재동기화 (스트림 감시기: 시퀀스 누락 / 스트림 정지 후 재구독)
+
+        호가창은 수신 스레드만 변경하므로 여기서는 요청만 기록하고, 다음 Diff 이벤트 처리 전에 초기화 / 이벤트 전달합니다.
+        """
+        self.get(symbol).resync_reason = reason
+
+    def _apply_requested_resync(self, book):
+        reason = book.resync_reason
+        if reason is None:
+            return
+        book.resync_reason = None
+        if book.last_update_id is not None:
+            book.resync(reason)
+        self._notify_resync(book.symbol, reason)
+
+    def _notify_resync(self, symbol, reason):
+        """ ✅ 재동기화 이벤트 전달 (분석기는 해당 코인 상태를 초기화 후 새 스냅샷부터 재구성) """
+        for listener in self.resync_listeners[symbol]:
+            try:
+                listener(symbol, reason)
+            except Exception as e:
+                logging.error(f"🚨 [{symbol}] 재동기화 처리 실패: {e}")
+
+    def on_depth_update(self, data, symbol):
+        """ ✅ Diff 이벤트 적용 후 등록된 분석기에 호가창 전달 """
+        book = self.get(symbol)
+        self._apply_requested_resync(book)
+        resync_count = book.resync_count
+        applied = book.process_depth_update(data)
+        if book.resync_count != resync_count:
+            self._notify_resync(book.symbol, "시퀀스 누락")
+        if not applied or not book.is_ready:
+            return
+        for listener in self.listeners[book.symbol]:
+            try:
+                listener(book)
+            except Exception as e:
+                logging.error(f"🚨 [{book.symbol}] 호가 분석기 처리 실패: {e}")
+        for listener in self.diff_listeners[book.symbol]:
+            try:
+                listener(book, data)
+            except Exception as e:
+                logging.error(f"🚨 [{book.symbol}] 호가 Diff 분석기 처리 실패: {e}")
+
+    def subscribe(self, manager, symbol, listener=None, diff_listener=None, resync_listener=None):
+        """ ✅ 스트림 관리자에 Diff Depth 스트림을 코인당 1회만 등록하고 분석기 연결 """
+        symbol = symbol.upper()
+        key = (id(manager), symbol)
+        if key not in self.subscribed:
+            manager.subscribe(f"{symbol.lower()}@depth@100ms", partial(self.on_depth_update, symbol=symbol))
+            self.subscribed.add(key)
+        if listener is not None:
+            self.add_listener(symbol, listener)
+        if diff_listener is not None:
+            self.add_diff_listener(symbol, diff_listener)
+        if resync_listener is not None:
+            self.add_resync_listener(symbol, resync_listener)
+        return self.get(symbol)
+
+
+# ✅ 프로세스 공용 호가창 관리자
+shared_order_books = OrderBookManager()
+
+# ✅ 사용 예시
+if __name__ == "__main__":
+    from data_collection.stream_manager import CombinedStreamManager
+
+    manager = CombinedStreamManager()
+    shared_order_books.subscribe(manager, "BTCUSDT", lambda book: print(
+        f"📊 {book.symbol} mid={book.mid_price:.2f} spread={book.spread:.2f} imbalance(20)={book.imbalance(20):.3f}"))
+    manager.start(block=True)
@@ -0,0 +1,102 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+from data_collection.message_decoder import decode
+from monitoring.stream_metrics import shared_stream_metrics
+
+
+class ConsumerWorker:
+    def __init__(self, consumer, queue_size=10000, name=None):
+        """ ✅ 전용 스레드에서 실행되는 소비자 (느린 소비자가 버스를 막지 않도록 분리) """
+        self.consumer = consumer
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name=name)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __call__(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            try:
+                self.consumer(record)
+            except Exception as e:
+                logging.error(f"🚨 [버스 소비자] 처리 실패: {e}")
+
+
+class MarketDataBus:
+    def __init__(self, metrics=shared_stream_metrics):
+        """ ✅ 프로세스 내 시장 데이터 버스 (스트림 1개를 1회 디코딩 후 모든 소비자에게 분배) """
+        self.metrics = metrics  # 스트림별 디코딩 시간, 전용 스레드 대기열 길이 계측
+        self.consumers = defaultdict(list)  # (이벤트 종류, 코인) → 소비자 목록
+        self.workers = []
+        self.subscribed = set()
+        self.published = defaultdict(int)
+
+    def add_consumer(self, event_type, symbol, consumer, threaded=False, queue_size=10000):
+        """ ✅ 소비자 등록 (symbol=None 이면 전체 코인, threaded=True 이면 전용 스레드에서 실행) """
+        if threaded:
+            consumer = ConsumerWorker(consumer, queue_size, name=f"bus-{event_type}-{symbol}")
+            self.workers.append(consumer)
+            self.metrics.gauge(f"bus_queue:{consumer.thread.name}", consumer.queue.qsize)
+        self.consumers[(event_type, symbol.upper() if symbol else None)].append(consumer)
+        return consumer
+
+    def publish(self, event_type, record):
+        """ ✅ 레코드를 코인별 + 전체 소비자에게 분배 """
+        self.published[event_type] += 1
+        for key in ((event_type, record.symbol), (event_type, None)):
+            for consumer in self.consumers.get(key, ()):
+                try:
+                    consumer(record)
+                except Exception as e:
+                    logging.error(f"🚨 [{event_type}] {record.symbol} 소비자 처리 실패: {e}")
+
+    def on_message(self, data, event_type):
+        """ ✅ 스트림 메시지 디코딩 (이벤트당 1회) 후 분배 """
+        if not self.metrics.enabled:
+            self.publish(event_type, decode(data))
+            return
+        started = time.perf_counter()
+        record = decode(data)
+        self.metrics.observe(f"{record.symbol.lower()}@{event_type}", "decode", time.perf_counter() - started)
+        self.publish(event_type, record)
+
+    def subscribe(self, manager, event_type, symbol, consumer=None, threaded=False):
+        """ ✅ 스트림 관리자에 (코인, 이벤트) 스트림을 1회만 등록하고 소비자 연결 """
+        symbol = symbol.upper()
+        key = (id(manager), event_type, symbol)
+        if key not in self.subscribed:
+            manager.subscribe(f"{symbol.lower()}@{event_type}", partial(self.on_message, event_type=event_type))
+            self.subscribed.add(key)
+        if consumer is not None:
+            return self.add_consumer(event_type, symbol, consumer, threaded=threaded)
+
+    def stats(self):
+        """ ✅ 이벤트별 발행 수 및 전용 스레드 소비자 드롭 수 """
+        return {
+            "published": dict(self.published),
+            "dropped": {worker.thread.name: worker.dropped for worker in self.workers},
+        }
+
+
+# ✅ 프로세스 공용 시장 데이터 버스
+shared_market_bus = MarketDataBus()
+
+# ✅ 사용 예시
+if __name__ == "__main__":
+    from data_collection.stream_manager import CombinedStreamManager
+
+    manager = CombinedStreamManager()
+    shared_market_bus.subscribe(manager, "trade", "BTCUSDT", lambda trade: print(f"📊 {trade.symbol} {trade.price} x {trade.quantity}"))
+    shared_market_bus.subscribe(manager, "trade", "BTCUSDT", lambda trade: print(f"🐳 대량 체결 {trade}") if trade.quantity >= 50 else None, threaded=True)
+    manager.start(block=True)
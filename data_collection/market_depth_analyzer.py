@@ -1,14 +1,13 @@
-import websocket
-import json
 import pandas as pd
-import numpy as np
 import time
 import threading
-import requests
-import matplotlib.pyplot as plt
 import os
 from collections import deque
 from dotenv import load_dotenv
+from data_collection.local_order_book import shared_order_books
+from data_collection.stream_manager import CombinedStreamManager
+from notification.alert_dispatcher import shared_alert_dispatcher
+from visualization.chart_renderer import shared_chart_renderer
 from coin_selector import SELECTED_COIN  # 📌 `coin_selector.py`에서 코인 선택 변수 가져오기
 
 # 환경 변수 로드 (.env 파일에서 API 키 및 Telegram 설정 가져오기)
@@ -25,27 +24,15 @@ class MarketDepthAnalyzer:
         self.order_book_data = {tf: deque(maxlen=300) for tf in self.timeframes}  # ✅ 최근 5분(300초) 데이터 저장
         self.recent_depth = None  # ✅ 최신 Depth 데이터 저장
 
-        # ✅ `coin_selector.py`에서 가져온 코인으로 WebSocket URL 설정
-        self.ws_url = f"{BINANCE_WS_URL}{self.symbol.lower()}@depth@100ms"
+        # 차트 등록 (OBS 시각화 지원, 렌더링 스레드에서 고정 FPS로 출력)
+        self.chart = shared_chart_renderer.register(
+            f"market_depth_{self.symbol.lower()}", self.chart_snapshot,
+            title=f"Market Depth Analysis ({self.symbol.upper()})", xlabel="Time (s)", ylabel="Bid-Ask Ratio")
 
-        # 차트 초기화 (OBS 시각화 지원)
-        plt.ion()
-        self.fig, self.ax = plt.subplots(figsize=(10, 5))
-
-    def calculate_depth_metrics(self, data):
-        """ 시장 깊이 분석 및 유동성 평가 """
-        bids = np.array([[float(price), float(size)] for price, size in data["bids"]])
-        asks = np.array([[float(price), float(size)] for price, size in data["asks"]])
-
-        depth_summary = {}
-
-        for depth in self.depth_levels:
-            bid_total = np.sum(bids[:depth, 1])  # Depth 범위 내 매수 총량
-            ask_total = np.sum(asks[:depth, 1])  # Depth 범위 내 매도 총량
-            bid_ask_ratio = bid_total / (ask_total + 1e-9)  # Bid-Ask 비율 (0으로 나누기 방지)
-            depth_summary[f"Depth{depth}_Bid_Ask_Ratio"] = bid_ask_ratio
-
-        return depth_summary
+    def calculate_depth_metrics(self, book):
+        """ 시장 깊이 분석 및 유동성 평가 (공유 누적 곡선에서 모든 Depth 비율을 한 번에 계산) """
+        ratios = book.depth_view().ratios(self.depth_levels)  # Depth 범위별 매수 / 매도 총량 비율
+        return {f"Depth{depth}_Bid_Ask_Ratio": float(ratio) for depth, ratio in zip(self.depth_levels, ratios)}
 
     def update_order_book_history(self, depth_data):
         """ 다양한 시간 프레임에서 호가창 데이터를 저장 """
@@ -53,9 +40,9 @@ class MarketDepthAnalyzer:
         for timeframe in self.timeframes:
             self.order_book_data[timeframe].append((current_time, depth_data))
 
-    def process_order_book(self, data):
-        """ WebSocket을 통해 수신된 호가창 데이터 처리 """
-        depth_metrics = self.calculate_depth_metrics(data)
+    def process_order_book(self, book):
+        """ 로컬 호가창 갱신 시 시장 깊이 분석 """
+        depth_metrics = self.calculate_depth_metrics(book)
         self.recent_depth = depth_metrics  # 최신 데이터 업데이트
         self.update_order_book_history(depth_metrics)
 
@@ -64,44 +51,37 @@ class MarketDepthAnalyzer:
         # ✅ 차트 업데이트 (OBS 연동)
         self.update_chart()
 
-    def send_telegram_alert(self, message):
+    def send_telegram_alert(self, message, key=None):
         """ Telegram 알림 전송 """
         if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-            payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-            requests.post(url, data=payload)
+            shared_alert_dispatcher.send(message, key=key, chat_id=TELEGRAM_CHAT_ID, bot_token=TELEGRAM_BOT_TOKEN)
         else:
             print("⚠️ Telegram 설정이 누락되었습니다! .env 파일을 확인하세요.")
 
     def update_chart(self):
-        """ 시장 깊이 변화를 실시간 시각화 (OBS 연동) """
-        self.ax.clear()
-
-        # 최근 100개 데이터 기준으로 시각화
-        if len(self.order_book_data["1s"]) > 1:
-            times = [time.strftime('%H:%M:%S', time.localtime(t[0])) for t in self.order_book_data["1s"]]
-            depth_values = [t[1]["Depth100_Bid_Ask_Ratio"] for t in self.order_book_data["1s"]]
-
-            self.ax.plot(times, depth_values, label="Depth100 Bid-Ask Ratio", color="blue")
-
-        self.ax.set_title(f"Market Depth Analysis ({self.symbol.upper()})")
-        self.ax.set_xlabel("Time")
-        self.ax.set_ylabel("Bid-Ask Ratio")
-        self.ax.legend()
-        plt.xticks(rotation=45)
-        plt.draw()
-        plt.pause(0.01)
-
-    def on_message(self, ws, message):
-        """ WebSocket 메시지 수신 후 처리 """
-        data = json.loads(message)
-        self.process_order_book(data)
+        """ 시장 깊이 변화 시각화 요청 (OBS 연동, 그리기는 렌더링 스레드에서 수행) """
+        self.chart.mark_dirty()
+
+    def chart_snapshot(self):
+        """ 차트 데이터 스냅샷 (렌더링 스레드에서 호출) """
+        history = list(self.order_book_data["1s"])
+        if len(history) < 2:
+            return {}
+        start = history[0][0]
+        times = [t - start for t, _ in history]
+        depth_values = [depth["Depth100_Bid_Ask_Ratio"] for _, depth in history]
+        return {"Depth100 Bid-Ask Ratio": (times, depth_values)}
+
+    def register_streams(self, manager):
+        """ ✅ 공용 LocalOrderBook에 분석기로 등록 (Diff Depth 스트림은 코인당 1회만 구독) """
+        shared_order_books.subscribe(manager, self.symbol, self.process_order_book)
 
     def run(self):
         """ WebSocket 실행 """
-        ws = websocket.WebSocketApp(self.ws_url, on_message=self.on_message)
+        manager = CombinedStreamManager()
+        self.register_streams(manager)
         print(f"🟢 {self.symbol} 시장 깊이 분석 시작")
-        ws.run_forever()
+        manager.start(block=True)
 
     def start_analysis(self):
         """ 백그라운드 스레드에서 분석 시작 """
@@ -0,0 +1,203 @@
+import os
+import time
+import heapq
+import logging
+from collections import defaultdict
+from dotenv import load_dotenv
+from data_collection.local_order_book import LocalOrderBook, shared_order_books
+from data_collection.stream_manager import normalize_stream
+from storage.raw_capture import CaptureReader
+from monitoring.stream_metrics import shared_stream_metrics
+
+# ✅ 환경 변수 로드
+load_dotenv()
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "0"))  # 재생 배속 (1 = 실시간, N = N배속, 0 = 최대 속도)
+REPLAY_PARTIAL_DEPTH = int(os.getenv("REPLAY_PARTIAL_DEPTH", "1000"))  # 재생용 호가창 유지 레벨 수
+
+# ✅ 같은 시각 이벤트는 호가 → 체결 순으로 재생 (결정적 순서)
+KIND_ORDER = {"depth": 0, "trade": 1}
+
+
+def stream_symbol(stream):
+    """ ✅ "btcusdt@depth20@100ms" → "BTCUSDT" """
+    return stream.split("@", 1)[0].upper()
+
+
+def stream_depth(stream):
+    """ ✅ 부분 호가 스트림의 레벨 수 ("btcusdt@depth20@100ms" → 20, Diff 스트림 → None) """
+    name = stream.split("@")[1]
+    return int(name[5:]) if name.startswith("depth") and name[5:].isdigit() else None
+
+
+def trade_payload(record):
+    """ ✅ TradeRecord → @trade 메시지 (실시간 핸들러 입력 형식) """
+    return {"e": "trade", "E": record.event_time, "T": record.trade_time, "s": record.symbol, "t": record.trade_id,
+            "p": record.price, "q": record.quantity, "m": record.is_buyer_maker}
+
+
+def depth_payload(update):
+    """ ✅ DepthUpdate → @depth Diff 메시지 (b/a는 (N, 2) 배열 그대로 전달) """
+    payload = {"e": "depthUpdate", "E": update.event_time, "s": update.symbol,
+               "U": update.first_update_id, "u": update.final_update_id, "b": update.bids, "a": update.asks}
+    if update.prev_final_update_id >= 0:
+        payload["pu"] = update.prev_final_update_id  # 선물 전용
+    return payload
+
+
+def seed_book(book, update):
+    """ ✅ 스냅샷 없이 첫 Diff 이벤트에 맞춰 빈 호가창 연결 (REST 조회 없음) """
+    offset = 0 if update.prev_final_update_id >= 0 else 1
+    book.load_snapshot({"bids": [], "asks": [], "lastUpdateId": update.first_update_id - offset})
+
+
+class ReplayEngine:
+    def __init__(self, reader=None, speed=REPLAY_SPEED, order_books=shared_order_books, metrics=shared_stream_metrics):
+        """ ✅ 캡처 데이터 재생기 (CombinedStreamManager 호환 subscribe → 실시간과 동일한 핸들러로 전달)
+
+        코인별 체결 / 호가 Diff 파일을 힙으로 병합해 event_time 순서로 재생합니다.
+        speed: 1 = 실시간, N = N배속, 0 = 최대 속도
+        """
+        self.reader = reader or CaptureReader()
+        self.speed = speed
+        self.order_books = order_books
+        self.metrics = metrics  # 스트림별 처리량 / 핸들러 시간 계측 (거래소 지연은 재생이므로 제외)
+        self.handlers = defaultdict(list)  # 스트림 이름 → 핸들러 목록
+        self.books = {}  # 부분 호가 스트림용 재생 호가창
+        self.counts = defaultdict(int)
+        self.elapsed = 0.0
+        self.running = False
+
+    def subscribe(self, stream, handler):
+        """ ✅ 스트림 구독 등록 (CombinedStreamManager.subscribe 와 동일) """
+        self.handlers[normalize_stream(stream)].append(handler)
+
+    def unsubscribe(self, stream, handler=None):
+        stream = normalize_stream(stream)
+        if handler is None:
+            self.handlers.pop(stream, None)
+        elif handler in self.handlers.get(stream, []):
+            self.handlers[stream].remove(handler)
+
+    @property
+    def streams(self):
+        return list(self.handlers.keys())
+
+    def dispatch(self, stream, data):
+        started = time.perf_counter()
+        for handler in self.handlers.get(stream, ()):
+            try:
+                handler(data)
+            except Exception as e:
+                logging.error(f"🚨 [재생] [{stream}] 핸들러 처리 실패: {e}")
+        if self.metrics.enabled:
+            self.metrics.received(stream, 0)
+            self.metrics.observe(stream, "handler", time.perf_counter() - started)
+
+    def _routes(self):
+        """ ✅ 코인별 재생 대상 스트림 {(kind, symbol): [(stream, 부분 호가 레벨 수)]} """
+        routes = defaultdict(list)
+        for stream in self.handlers:
+            symbol = stream_symbol(stream)
+            event = stream.split("@")[1]
+            if event == "trade":
+                routes[("trade", symbol)].append((stream, None))
+            elif event.startswith("depth"):
+                routes[("depth", symbol)].append((stream, stream_depth(stream)))
+        return routes
+
+    def events(self, sources, start_ms=None, end_ms=None):
+        """ ✅ (kind, symbol) 목록의 캡처 레코드를 힙으로 병합 → (event_time, kind, symbol, record) """
+        def tagged(kind, symbol):
+            records = (self.reader.trades(symbol, start_ms, end_ms) if kind == "trade"
+                       else self.reader.depth_updates(symbol, start_ms, end_ms))
+            order = KIND_ORDER[kind]
+            for record in records:
+                yield record.event_time, order, symbol, kind, record
+
+        merged = heapq.merge(*(tagged(kind, symbol) for kind, symbol in sorted(sources)))
+        for event_time, _, symbol, kind, record in merged:
+            yield event_time, kind, symbol, record
+
+    def _book(self, symbol, update):
+        """ ✅ 부분 호가 스트림용 재생 호가창 갱신 """
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = LocalOrderBook(symbol, max_levels=REPLAY_PARTIAL_DEPTH)
+        if book.last_update_id is None:
+            seed_book(book, update)
+        book.process_depth_update(depth_payload(update))
+        return book
+
+    def _deliver(self, kind, symbol, record, routes):
+        if kind == "trade":
+            payload = trade_payload(record)
+            for stream, _ in routes:
+                self.dispatch(stream, payload)
+            return
+
+        payload = depth_payload(record)
+        book = None
+        for stream, depth in routes:
+            if depth is None:
+                # ✅ Diff 스트림: 공용 호가창이 스냅샷을 REST로 요청하지 않도록 먼저 연결
+                shared_book = self.order_books.books.get(symbol) if self.order_books is not None else None
+                if shared_book is not None and shared_book.last_update_id is None:
+                    seed_book(shared_book, record)
+                self.dispatch(stream, payload)
+                continue
+            book = book or self._book(symbol, record)
+            bids, asks = book.bids.levels(depth), book.asks.levels(depth)
+            # ✅ 부분 호가 메시지 (선물 b/a + 현물 bids/asks 형식 병행)
+            self.dispatch(stream, {**payload, "b": bids, "a": asks, "bids": bids, "asks": asks})
+
+    def run(self, start_ms=None, end_ms=None, symbols=None):
+        """ ✅ 구독된 스트림의 캡처 데이터 재생 → 재생 통계 반환 """
+        routes = self._routes()
+        if symbols is not None:
+            symbols = {symbol.upper() for symbol in symbols}
+            routes = {key: value for key, value in routes.items() if key[1] in symbols}
+        if not routes:
+            logging.warning("⚠️ [재생] 구독된 스트림이 없습니다!")
+            return self.stats()
+
+        self.running = True
+        started = time.perf_counter()
+        first_event = None
+        self.counts.clear()
+        for event_time, kind, symbol, record in self.events(routes, start_ms, end_ms):
+            if not self.running:
+                break
+            if self.speed > 0:
+                if first_event is None:
+                    first_event = event_time
+                delay = (event_time - first_event) / 1000 / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            self._deliver(kind, symbol, record, routes[(kind, symbol)])
+            self.counts[kind] += 1
+        self.elapsed = time.perf_counter() - started
+        self.running = False
+        return self.stats()
+
+    def start(self, block=True, start_ms=None, end_ms=None):
+        """ ✅ CombinedStreamManager.start 호환 (재생은 항상 호출 스레드에서 실행) """
+        return self.run(start_ms, end_ms)
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        """ ✅ 이벤트 종류별 재생 건수, 소요 시간, 초당 처리량 """
+        total = sum(self.counts.values())
+        return {**self.counts, "events": total, "elapsed": self.elapsed,
+                "events_per_sec": total / self.elapsed if self.elapsed else 0.0}
+
+
+# ✅ 사용 예시 (캡처된 하루치 데이터를 최대 속도로 재생하며 분석기 처리량 측정)
+if __name__ == "__main__":
+    from data_collection.spoofing_detector import SpoofingDetector
+
+    engine = ReplayEngine(speed=0)
+    SpoofingDetector().start_websocket(engine)
+    shared_order_books.subscribe(engine, "BTCUSDT", lambda book: None)
+    print(f"📊 [재생 완료] {engine.run()}")
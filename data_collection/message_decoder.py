@@ -0,0 +1,179 @@
+import json
+import time
+import numpy as np
+from itertools import chain
+from typing import NamedTuple
+
+# ✅ 빠른 JSON 백엔드 (설치되어 있으면 orjson → ujson → 표준 json 순으로 사용)
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    try:
+        import ujson
+        loads = ujson.loads
+        JSON_BACKEND = "ujson"
+    except ImportError:
+        loads = json.loads
+        JSON_BACKEND = "json"
+
+EMPTY_LEVELS = np.empty((0, 2), dtype=np.float64)
+EMPTY_LEVELS.flags.writeable = False
+
+
+class TradeRecord(NamedTuple):
+    """ ✅ 체결 레코드 (@trade) """
+    symbol: str
+    trade_id: int
+    price: float
+    quantity: float
+    is_buyer_maker: bool
+    trade_time: int  # 체결 시각 (ms)
+    event_time: int  # 이벤트 시각 (ms)
+
+
+class AggTradeRecord(NamedTuple):
+    """ ✅ 집계 체결 레코드 (@aggTrade) """
+    symbol: str
+    agg_trade_id: int
+    price: float
+    quantity: float
+    first_trade_id: int
+    last_trade_id: int
+    is_buyer_maker: bool
+    trade_time: int
+    event_time: int
+
+
+class DepthUpdate(NamedTuple):
+    """ ✅ 호가 Diff 레코드 (@depth) - bids/asks는 (N, 2) float64 배열 """
+    symbol: str
+    first_update_id: int
+    final_update_id: int
+    prev_final_update_id: int  # 선물 전용 (pu), 현물은 -1
+    bids: np.ndarray
+    asks: np.ndarray
+    event_time: int
+
+
+class KlineRecord(NamedTuple):
+    """ ✅ 캔들 레코드 (@kline_<interval>) """
+    symbol: str
+    interval: str
+    open_time: int
+    close_time: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    quote_volume: float
+    trades: int
+    is_closed: bool
+    event_time: int
+
+
+def normalize_stream(stream):
+    """ ✅ 스트림 이름 정규화 (코인 부분만 소문자, 이벤트 이름은 그대로: "BTCUSDT@aggTrade" → "btcusdt@aggTrade")
+
+    전체 시장 스트림("!miniTicker@arr", "!bookTicker")은 거래소 표기 그대로 유지합니다.
+    구독 등록 / URL 생성 / 수신 메시지 라우팅 / 스트림 감시 모두 이 함수로 같은 키를 사용합니다.
+    """
+    if stream.startswith("!"):
+        return stream
+    symbol, sep, rest = stream.partition("@")
+    return symbol.lower() + sep + rest
+
+
+def levels_to_array(levels):
+    """ ✅ [[price, qty], ...] 문자열 목록 → (N, 2) float64 배열 (1회 일괄 변환) """
+    n = len(levels)
+    if n == 0:
+        return EMPTY_LEVELS
+    return np.fromiter(map(float, chain.from_iterable(levels)), dtype=np.float64, count=2 * n).reshape(n, 2)
+
+
+def decode_trade(data):
+    """ ✅ @trade 메시지 → TradeRecord """
+    return TradeRecord(data["s"], data["t"], float(data["p"]), float(data["q"]), data["m"], data["T"], data["E"])
+
+
+def decode_agg_trade(data):
+    """ ✅ @aggTrade 메시지 → AggTradeRecord """
+    return AggTradeRecord(data["s"], data["a"], float(data["p"]), float(data["q"]),
+                          data["f"], data["l"], data["m"], data["T"], data["E"])
+
+
+def decode_depth(data):
+    """ ✅ @depth 메시지 → DepthUpdate """
+    return DepthUpdate(data["s"], data["U"], data["u"], data.get("pu", -1),
+                       levels_to_array(data["b"]), levels_to_array(data["a"]), data["E"])
+
+
+def decode_kline(data):
+    """ ✅ @kline 메시지 → KlineRecord """
+    k = data["k"]
+    return KlineRecord(k["s"], k["i"], k["t"], k["T"], float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]),
+                       float(k["v"]), float(k["q"]), k["n"], k["x"], data["E"])
+
+
+# ✅ 이벤트 종류(e)별 디코더
+DECODERS = {
+    "trade": decode_trade,
+    "aggTrade": decode_agg_trade,
+    "depthUpdate": decode_depth,
+    "kline": decode_kline,
+}
+
+
+def decode(data):
+    """ ✅ 이벤트 메시지(dict) → 타입 레코드 """
+    return DECODERS[data["e"]](data)
+
+
+def decode_message(message):
+    """ ✅ 원본 메시지(str/bytes) → (스트림 이름, 타입 레코드), 단일 스트림이면 스트림 이름은 None """
+    payload = loads(message)
+    if "stream" in payload:
+        return payload["stream"], decode(payload["data"])
+    return None, decode(payload)
+
+
+def benchmark(iterations=20000, levels=100):
+    """ ✅ 기존 디코딩 경로 대비 마이크로 벤치마크 (메시지당 µs) """
+    rng = np.random.default_rng(0)
+    book = [[f"{65000 + p:.2f}", f"{q:.3f}"] for p, q in zip(rng.random(levels) * 100, rng.random(levels) * 10)]
+    depth_message = json.dumps({"stream": "btcusdt@depth@100ms", "data": {
+        "e": "depthUpdate", "E": 1, "T": 1, "s": "BTCUSDT", "U": 1, "u": 2, "pu": 0, "b": book, "a": book}})
+    trade_message = json.dumps({"stream": "btcusdt@trade", "data": {
+        "e": "trade", "E": 1, "T": 1, "s": "BTCUSDT", "t": 1, "p": "65000.10", "q": "0.015", "m": True}})
+
+    def legacy_depth():
+        data = json.loads(depth_message)["data"]
+        np.array([[float(p), float(q)] for p, q in data["b"]])
+        np.array([[float(p), float(q)] for p, q in data["a"]])
+
+    def legacy_trade():
+        data = json.loads(trade_message)["data"]
+        {"price": float(data["p"]), "quantity": float(data["q"]), "is_buyer_maker": data["m"]}
+
+    cases = [
+        (f"depth{levels} 기존 (json + list→np.array)", legacy_depth),
+        (f"depth{levels} 신규 ({JSON_BACKEND} + 일괄 변환)", lambda: decode_message(depth_message)),
+        ("trade 기존 (json + dict)", legacy_trade),
+        (f"trade 신규 ({JSON_BACKEND} + NamedTuple)", lambda: decode_message(trade_message)),
+    ]
+    results = {}
+    for name, func in cases:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed / iterations * 1e6
+        print(f"📊 {name}: {results[name]:.2f} µs/msg ({iterations / elapsed:,.0f} msgs/s)")
+    return results
+
+# ✅ 사용 예시 (마이크로 벤치마크)
+if __name__ == "__main__":
+    benchmark()
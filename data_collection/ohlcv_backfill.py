@@ -0,0 +1,261 @@
+import os
+import time
+import logging
+import threading
+import requests
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from storage.bulk_loader import mysql_ident, pg_ident
+from storage.db_pool import shared_db_pool
+
+# ✅ 환경 변수 로드
+load_dotenv()
+OHLCV_BACKFILL_DAYS = float(os.getenv("OHLCV_BACKFILL_DAYS", "30"))  # 저장된 캔들이 없을 때 수집 시작 기간 (일)
+OHLCV_BACKFILL_WORKERS = int(os.getenv("OHLCV_BACKFILL_WORKERS", "8"))  # 동시 요청 스레드 수
+BINANCE_WEIGHT_BUDGET = int(os.getenv("BINANCE_WEIGHT_BUDGET", "1200"))  # 분당 사용 요청 가중치 상한 (IP 한도의 일부만 사용)
+
+OHLCV_TABLE = "ohlcv_data"
+OHLCV_COLUMNS = ["timestamp", "symbol", "interval", "open", "high", "low", "close", "volume"]
+OHLCV_KEY = ["symbol", "interval", "timestamp"]
+
+# ✅ 캔들 간격 (ms, 월봉은 길이가 일정하지 않아 제외)
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000, "8h": 28_800_000,
+    "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000, "1w": 604_800_000,
+}
+
+
+def kline_weight(limit, use_futures):
+    """ ✅ /klines 요청 가중치 (선물은 limit 구간별, 현물은 고정 2) """
+    if not use_futures:
+        return 2
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def klines_to_frame(rows, symbol, interval):
+    """ ✅ /klines 응답 → OHLCV DataFrame (벡터화 변환) """
+    values = np.array([row[:6] for row in rows], dtype=np.float64)
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(values[:, 0].astype(np.int64), unit="ms"),
+        "symbol": symbol,
+        "interval": interval,
+        "open": values[:, 1],
+        "high": values[:, 2],
+        "low": values[:, 3],
+        "close": values[:, 4],
+        "volume": values[:, 5],
+    })
+
+
+def to_epoch_ms(timestamps):
+    """ ✅ datetime 목록 → epoch ms 배열 """
+    if len(timestamps) == 0:
+        return np.empty(0, dtype=np.int64)
+    return pd.to_datetime(pd.Series(timestamps)).values.astype("datetime64[ms]").astype(np.int64)
+
+
+def find_gaps(stored_ms, interval_ms, start_ms, end_ms):
+    """ ✅ 수집 필요 구간 [(시작 ms, 종료 ms)] 계산
+
+    - 저장된 첫 캔들 이전 구간
+    - 연속 캔들 간격이 interval 보다 큰 누락 구간
+    - 마지막 저장 캔들부터 현재까지 (마지막 캔들은 미완성일 수 있어 다시 수집)
+    """
+    stored = np.unique(np.asarray(stored_ms, dtype=np.int64))
+    stored = stored[(stored >= start_ms) & (stored <= end_ms)]
+    if len(stored) == 0:
+        return [(start_ms, end_ms)]
+
+    gaps = []
+    if stored[0] - start_ms >= interval_ms:
+        gaps.append((start_ms, int(stored[0]) - interval_ms))
+    for i in np.flatnonzero(np.diff(stored) > interval_ms):
+        gaps.append((int(stored[i]) + interval_ms, int(stored[i + 1]) - interval_ms))
+    gaps.append((int(stored[-1]), end_ms))
+    return gaps
+
+
+class WeightLimiter:
+    def __init__(self, budget=BINANCE_WEIGHT_BUDGET, window=60.0):
+        """ ✅ 요청 가중치 제한기 (1분 슬라이딩 윈도우 + 응답 헤더 X-MBX-USED-WEIGHT-1M 동기화 + 429/418 대기) """
+        self.budget = budget
+        self.window = window
+        self.spent = deque()  # [(요청 시각, 가중치)]
+        self.used = 0
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, weight):
+        """ ✅ 가중치 여유가 생길 때까지 대기 후 차감 """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.spent and now - self.spent[0][0] >= self.window:
+                    self.used -= self.spent.popleft()[1]
+                if now >= self.paused_until and self.used + weight <= self.budget:
+                    self.spent.append((now, weight))
+                    self.used += weight
+                    return
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.spent:
+                    wait = self.window - (now - self.spent[0][0])
+                else:
+                    wait = 0.1
+            time.sleep(max(wait, 0.01))
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def observe(self, response):
+        """ ✅ 서버 집계 사용량이 상한에 근접하면 다음 분까지 대기 """
+        used = response.headers.get("X-MBX-USED-WEIGHT-1M") or response.headers.get("x-mbx-used-weight-1m")
+        if used is not None and int(used) >= self.budget:
+            self.pause(self.window - time.time() % self.window)
+        if response.status_code in (418, 429):
+            retry_after = float(response.headers.get("Retry-After", self.window))
+            logging.warning(f"⚠️ [요청 제한] HTTP {response.status_code} - {retry_after:.0f}초 대기")
+            self.pause(retry_after)
+
+
+class OHLCVBackfill:
+    def __init__(self, loader, base_url, use_futures=False, session=None, limiter=None,
+                 max_workers=OHLCV_BACKFILL_WORKERS, lookback_days=OHLCV_BACKFILL_DAYS, max_retries=5, lake=None):
+        """ ✅ OHLCV 증분 수집 엔진 (저장된 마지막 캔들부터 재개, 누락 구간 탐지, 코인/간격별 동시 페이지 수집) """
+        self.loader = loader
+        self.lake = lake  # ✅ Parquet 저장소 (지정 시 캔들을 코인 / 날짜 파티션에도 기록)
+        self.base_url = base_url
+        self.use_futures = use_futures
+        self.page_limit = 1500 if use_futures else 1000  # /klines 최대 limit
+        self.weight = kline_weight(self.page_limit, use_futures)
+        self.max_workers = max_workers
+        self.lookback_days = lookback_days
+        self.max_retries = max_retries
+        self.limiter = limiter or WeightLimiter()
+
+        # ✅ Keep-alive 공유 세션 (스레드 수만큼 연결 유지)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def stored_timestamps(self, symbol, interval, start):
+        """ ✅ 저장된 캔들 시각 조회 (Parquet → PostgreSQL → MySQL → MongoDB 순) """
+        if self.lake is not None:
+            return self.lake.kline_timestamps(symbol, interval, start=start)
+
+        if self.loader.use_postgres:
+            with shared_db_pool.postgres() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT {pg_ident('timestamp')} FROM {OHLCV_TABLE} WHERE {pg_ident('symbol')} = %s "
+                        f"AND {pg_ident('interval')} = %s AND {pg_ident('timestamp')} >= %s", (symbol, interval, start))
+                    rows = cursor.fetchall()
+                conn.commit()
+            return to_epoch_ms([row[0] for row in rows])
+
+        if self.loader.use_mysql:
+            with shared_db_pool.mysql() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"SELECT {mysql_ident('timestamp')} FROM {OHLCV_TABLE} WHERE {mysql_ident('symbol')} = %s "
+                    f"AND {mysql_ident('interval')} = %s AND {mysql_ident('timestamp')} >= %s", (symbol, interval, start))
+                rows = cursor.fetchall()
+                cursor.close()
+            return to_epoch_ms([row[0] for row in rows])
+
+        if self.loader.mongo_collection is not None:
+            cursor = self.loader.mongo_collection.find(
+                {"symbol": symbol, "interval": interval, "timestamp": {"$gte": start}}, {"timestamp": 1, "_id": 0})
+            return to_epoch_ms([document["timestamp"] for document in cursor])
+
+        return np.empty(0, dtype=np.int64)
+
+    def request_klines(self, symbol, interval, start_ms, end_ms):
+        """ ✅ /klines 1페이지 요청 (가중치 제한 + 429/418/5xx 재시도) """
+        params = {"symbol": symbol, "interval": interval, "startTime": start_ms, "endTime": end_ms, "limit": self.page_limit}
+        for attempt in range(self.max_retries):
+            self.limiter.acquire(self.weight)
+            try:
+                response = self.session.get(f"{self.base_url}/klines", params=params, timeout=10)
+            except requests.RequestException as e:
+                logging.warning(f"⚠️ [OHLCV] {symbol} {interval} 요청 실패 ({attempt + 1}/{self.max_retries}): {e}")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            self.limiter.observe(response)
+            if response.status_code in (418, 429) or response.status_code >= 500:
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            response.raise_for_status()
+            return response.json()
+        raise requests.RequestException(f"{symbol} {interval} /klines 재시도 {self.max_retries}회 초과")
+
+    def fetch_range(self, symbol, interval, start_ms, end_ms):
+        """ ✅ startTime/endTime 페이지 수집 후 페이지마다 업서트 (수집 캔들 수 반환) """
+        interval_ms = INTERVAL_MS[interval]
+        cursor = start_ms
+        total = 0
+        while cursor <= end_ms:
+            rows = self.request_klines(symbol, interval, cursor, end_ms)
+            if not rows:
+                break
+            frame = klines_to_frame(rows, symbol, interval)
+            self.loader.load(OHLCV_TABLE, frame, key_columns=OHLCV_KEY, columns=OHLCV_COLUMNS)
+            if self.lake is not None:
+                self.lake.write_klines(frame)
+            total += len(rows)
+            if len(rows) < self.page_limit:
+                break
+            cursor = int(rows[-1][0]) + interval_ms
+        return total
+
+    def backfill(self, symbol, interval, end_ms=None, start_ms=None):
+        """ ✅ 코인/간격 1개 증분 수집 (누락 구간 + 마지막 저장 캔들 이후, start_ms 미지정 시 lookback_days 전부터) """
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"지원하지 않는 캔들 간격: {interval}")
+        interval_ms = INTERVAL_MS[interval]
+        end_ms = end_ms or int(time.time() * 1000)
+        if start_ms is None:
+            start_ms = end_ms - int(self.lookback_days * 86_400_000)
+        start_ms = start_ms // interval_ms * interval_ms
+
+        stored = self.stored_timestamps(symbol, interval, pd.Timestamp(start_ms, unit="ms").to_pydatetime())
+        gaps = find_gaps(stored, interval_ms, start_ms, end_ms)
+        if len(gaps) > 1:
+            logging.info(f"🔍 [OHLCV] {symbol} {interval} 누락 구간 {len(gaps) - 1}개 발견")
+        return sum(self.fetch_range(symbol, interval, gap_start, gap_end) for gap_start, gap_end in gaps)
+
+    def run(self, symbols, intervals):
+        """ ✅ 전체 코인/간격 동시 증분 수집 ({(symbol, interval): 수집 캔들 수}) """
+        end_ms = int(time.time() * 1000)
+        results = {}
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ohlcv-backfill") as executor:
+            futures = {
+                executor.submit(self.backfill, symbol, interval, end_ms): (symbol, interval)
+                for symbol in symbols for interval in intervals
+            }
+            for future in as_completed(futures):
+                symbol, interval = futures[future]
+                try:
+                    results[(symbol, interval)] = future.result()
+                except Exception as e:
+                    logging.error(f"🚨 [OHLCV] {symbol} {interval} 증분 수집 실패: {e}")
+                    results[(symbol, interval)] = None
+        collected = sum(count for count in results.values() if count)
+        logging.info(f"✅ [OHLCV] 증분 수집 완료 - {len(results)}개 작업, {collected}개 캔들, {time.time() - started:.1f}초")
+        return results
@@ -1,12 +1,13 @@
 import requests
 import time
 import pandas as pd
-import mysql.connector
-import psycopg2
-from pymongo import MongoClient
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from data_collection.ohlcv_backfill import OHLCVBackfill, kline_weight, INTERVAL_MS, OHLCV_TABLE, OHLCV_COLUMNS, OHLCV_KEY
+from storage.bulk_loader import BulkLoader
+from storage.db_pool import shared_db_pool
+from storage.parquet_lake import shared_parquet_lake
 
 # ✅ 환경 변수 로드
 load_dotenv()
@@ -21,7 +22,7 @@ USE_POSTGRES = os.getenv("USE_POSTGRES") == "True"
 USE_MONGO = os.getenv("USE_MONGO") == "True"
 
 class OHLCVCollector:
-    def __init__(self, intervals=["1m", "5m", "15m", "1h", "4h", "1d"], limit=500, use_futures=False):
+    def __init__(self, intervals=["1m", "5m", "15m", "1h", "4h", "1d"], limit=500, use_futures=False, lake=shared_parquet_lake):
         """ ✅ 다중 코인 OHLCV 데이터 수집 클래스 """
         self.symbols = [coin.strip().upper() for coin in SELECTED_COINS]
         self.intervals = intervals
@@ -29,37 +30,30 @@ class OHLCVCollector:
         self.use_futures = use_futures
         self.base_url = BINANCE_FUTURES_URL if self.use_futures else BINANCE_BASE_URL
 
-        # ✅ 데이터베이스 설정
+        # ✅ 데이터베이스 설정 (COPY / 다중 행 VALUES 대량 적재)
+        self.collection = None
         if USE_MONGO:
-            self.mongo_client = MongoClient(MONGO_URL)
+            self.mongo_client = shared_db_pool.mongo(MONGO_URL)
             self.db = self.mongo_client[MONGO_DB]
             self.collection = self.db[MONGO_COLLECTION]
 
-        if USE_MYSQL:
-            self.mysql_conn = mysql.connector.connect(
-                host=os.getenv("MYSQL_HOST"),
-                user=os.getenv("MYSQL_USER"),
-                password=os.getenv("MYSQL_PASSWORD"),
-                database=os.getenv("MYSQL_DATABASE")
-            )
-            self.mysql_cursor = self.mysql_conn.cursor()
+        self.loader = BulkLoader(use_mysql=USE_MYSQL, use_postgres=USE_POSTGRES, mongo_collection=self.collection)
+        self.lake = lake  # ✅ Parquet 저장소 (연구 / 백테스트 조회용, pyarrow 미설치 시 None)
 
-        if USE_POSTGRES:
-            self.postgres_conn = psycopg2.connect(
-                host=os.getenv("POSTGRES_HOST"),
-                user=os.getenv("POSTGRES_USER"),
-                password=os.getenv("POSTGRES_PASSWORD"),
-                database=os.getenv("POSTGRES_DATABASE")
-            )
-            self.postgres_cursor = self.postgres_conn.cursor()
+        # ✅ 증분 수집 엔진 (Keep-alive 공유 세션 + 요청 가중치 제한)
+        self.backfill = OHLCVBackfill(self.loader, self.base_url, use_futures=self.use_futures, lake=self.lake)
+        self.session = self.backfill.session
 
-    def fetch_ohlcv(self, symbol, interval):
+    def fetch_ohlcv(self, symbol, interval, limit=None):
         """ ✅ Binance에서 OHLCV 데이터 수집 """
         url = f"{self.base_url}/klines"
-        params = {"symbol": symbol, "interval": interval, "limit": self.limit}
+        limit = limit or self.limit
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
 
         try:
-            response = requests.get(url, params=params)
+            self.backfill.limiter.acquire(kline_weight(limit, self.use_futures))
+            response = self.session.get(url, params=params, timeout=10)
+            self.backfill.limiter.observe(response)
             response.raise_for_status()
             data = response.json()
             ohlcv = [{
@@ -80,39 +74,27 @@ class OHLCVCollector:
             return None
 
     def store_data(self, data):
-        """ ✅ 데이터 저장 (MongoDB, MySQL, PostgreSQL) """
-        if USE_MONGO:
-            self.collection.insert_many(data)
+        """ ✅ 데이터 저장 (MongoDB, MySQL, PostgreSQL - (symbol, interval, timestamp) 기준 업서트 + Parquet) """
+        df = pd.DataFrame(data)
+        self.loader.load(OHLCV_TABLE, df, key_columns=OHLCV_KEY, columns=OHLCV_COLUMNS)
+        if self.lake is not None and not df.empty:
+            self.lake.write_klines(df)
 
-        if USE_MYSQL:
-            sql = """
-            INSERT INTO ohlcv_data (timestamp, symbol, interval, open, high, low, close, volume) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            for row in data:
-                self.mysql_cursor.execute(sql, (
-                    row["timestamp"], row["symbol"], row["interval"], row["open"],
-                    row["high"], row["low"], row["close"], row["volume"]
-                ))
-            self.mysql_conn.commit()
+    def get_ohlcv(self, symbol, interval, lookback=500, refresh=True):
+        """ ✅ 최근 lookback개 캔들 조회 (Parquet 저장소에서 누락분만 증분 수집 후 필요한 구간만 읽음) """
+        if self.lake is None:
+            return pd.DataFrame(self.fetch_ohlcv(symbol, interval, limit=lookback) or [])  # pyarrow 미설치 시 REST 조회
 
-        if USE_POSTGRES:
-            sql = """
-            INSERT INTO ohlcv_data (timestamp, symbol, interval, open, high, low, close, volume) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            for row in data:
-                self.postgres_cursor.execute(sql, (
-                    row["timestamp"], row["symbol"], row["interval"], row["open"],
-                    row["high"], row["low"], row["close"], row["volume"]
-                ))
-            self.postgres_conn.commit()
+        end_ms = int(time.time() * 1000)
+        start_ms = end_ms - lookback * INTERVAL_MS[interval]
+        if refresh:
+            self.backfill.backfill(symbol, interval, end_ms=end_ms, start_ms=start_ms)
+        df = self.lake.klines(symbol, interval, start=start_ms)
+        return df.tail(lookback).reset_index(drop=True)
 
     def run(self):
-        """ ✅ 다중 코인 OHLCV 데이터 수집 실행 """
-        for symbol in self.symbols:
-            for interval in self.intervals:
-                self.fetch_ohlcv(symbol, interval)
+        """ ✅ 다중 코인 OHLCV 데이터 수집 실행 (저장된 마지막 캔들부터 증분 수집, 누락 구간 보충, 코인별 동시 요청) """
+        return self.backfill.run(self.symbols, self.intervals)
 
 # ✅ 사용 예시
 if __name__ == "__main__":
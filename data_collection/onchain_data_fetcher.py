@@ -5,7 +5,7 @@ import logging
 import os
 from dotenv import load_dotenv
 from datetime import datetime
-from pymongo import MongoClient
+from storage.db_pool import shared_db_pool
 
 # ✅ 환경 변수 로드
 load_dotenv()
@@ -24,7 +24,7 @@ class OnchainDataFetcher:
         self.symbols = [coin.strip().upper() for coin in SELECTED_COINS]
         self.session = requests.Session()
         self.session.headers.update({"Authorization": f"Bearer {CRYPTOQUANT_API_KEY}"})
-        self.mongo_client = MongoClient(MONGO_URL)
+        self.mongo_client = shared_db_pool.mongo(MONGO_URL)
         self.db = self.mongo_client[MONGO_DB]
         self.collection = self.db[MONGO_COLLECTION]
 
@@ -1,12 +1,14 @@
 import requests
 import time
-import json
+import logging
+import threading
 import pandas as pd
-import websocket
-import mysql.connector
-import psycopg2
-from pymongo import MongoClient
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from storage.batch_sink import BatchSink
+from storage.db_pool import shared_db_pool
+from data_collection.ohlcv_backfill import WeightLimiter
 import os
 from dotenv import load_dotenv
 from coin_selector import SELECTED_COIN  # 📌 `coin_selector.py`에서 선택된 코인 가져오기
@@ -15,130 +17,188 @@ from coin_selector import SELECTED_COIN  # 📌 `coin_selector.py`에서 선택
 load_dotenv()
 
 BINANCE_FUTURES_BASE_URL = os.getenv("BINANCE_FUTURES_BASE_URL", "https://fapi.binance.com/fapi/v1")
+BINANCE_FUTURES_DATA_URL = os.getenv("BINANCE_FUTURES_DATA_URL", "https://fapi.binance.com/futures/data")  # openInterestHist 경로
+OI_HISTORY_SIZE = int(os.getenv("OI_HISTORY_SIZE", "5000"))  # 코인별 메모리 보관 OI 건수
+OI_POLL_INTERVAL = float(os.getenv("OI_POLL_INTERVAL", "5"))  # 실시간 OI 조회 주기 (초)
+OI_WORKERS = int(os.getenv("OI_WORKERS", "4"))  # 동시 요청 스레드 수 (공유 세션 1개)
+
+OI_COLUMNS = ["timestamp", "symbol", "open_interest", "open_interest_value"]
+OI_PAGE_LIMIT = 500  # openInterestHist 최대 limit
+
+def oi_records(df, symbol):
+    """ ✅ OI DataFrame → 저장 레코드 목록 (컬럼 단위 일괄 변환) """
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(df["timestamp"]).dt.to_pydatetime(),
+        "symbol": symbol,
+        "open_interest": df["openInterest"].astype(float).values,
+        "open_interest_value": df["openInterestValue"].astype(float).values,
+    }, columns=OI_COLUMNS).to_dict("records")
 
 class OpenInterestTracker:
-    def __init__(self, interval="5m", limit=500, save_db=True):
-        self.symbol = SELECTED_COIN.upper()  # ✅ `coin_selector.py`에서 선택된 코인 적용
+    def __init__(self, interval="5m", limit=500, save_db=True, symbols=None, history_size=OI_HISTORY_SIZE,
+                 poll_interval=OI_POLL_INTERVAL, max_workers=OI_WORKERS, session=None, limiter=None):
+        """ 다중 코인 미결제약정(Open Interest) 수집 (과거 데이터 페이지 수집 + 실시간 조회, 배치 저장) """
+        self.symbols = [symbol.upper() for symbol in (symbols or [SELECTED_COIN])]  # ✅ 기본값: `coin_selector.py`에서 선택된 코인
+        self.symbol = self.symbols[0]
         self.interval = interval
-        self.limit = limit
+        self.limit = limit  # 코인별 과거 데이터 수집 건수 (500건 초과 시 페이지 수집)
         self.save_db = save_db
-        self.oi_data = []
+        self.poll_interval = poll_interval
+        self.max_workers = max_workers
+        self.limiter = limiter or WeightLimiter()
+        self.oi_data = {symbol: deque(maxlen=history_size) for symbol in self.symbols}  # 코인별 최근 OI (메모리 상한)
+        self.running = False
+
+        # ✅ Keep-alive 공유 세션 (모든 코인 요청이 같은 연결 풀 사용)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
 
         # ✅ DB 설정 (MySQL, PostgreSQL, MongoDB 지원)
         self.use_mysql = os.getenv("USE_MYSQL") == "True"
         self.use_postgres = os.getenv("USE_POSTGRES") == "True"
         self.use_mongo = os.getenv("USE_MONGO") == "True"
 
-        if self.use_mysql:
-            self.mysql_conn = mysql.connector.connect(
-                host=os.getenv("MYSQL_HOST"),
-                user=os.getenv("MYSQL_USER"),
-                password=os.getenv("MYSQL_PASSWORD"),
-                database=os.getenv("MYSQL_DATABASE")
-            )
-            self.mysql_cursor = self.mysql_conn.cursor()
-
-        if self.use_postgres:
-            self.postgres_conn = psycopg2.connect(
-                host=os.getenv("POSTGRES_HOST"),
-                user=os.getenv("POSTGRES_USER"),
-                password=os.getenv("POSTGRES_PASSWORD"),
-                database=os.getenv("POSTGRES_DATABASE")
-            )
-            self.postgres_cursor = self.postgres_conn.cursor()
-
+        self.mongo_collection = None
         if self.use_mongo:
-            self.mongo_client = MongoClient(os.getenv("MONGO_URI"))
+            self.mongo_client = shared_db_pool.mongo(os.getenv("MONGO_URI"))
             self.mongo_db = self.mongo_client[os.getenv("MONGO_DATABASE")]
             self.mongo_collection = self.mongo_db["open_interest"]
 
-    def fetch_historical_open_interest(self):
-        """ 바이낸스에서 과거 미결제약정(Open Interest) 데이터 수집 """
-        url = f"{BINANCE_FUTURES_BASE_URL}/openInterestHist"
-        params = {
-            "symbol": self.symbol,
-            "period": self.interval,
-            "limit": self.limit,
-        }
-        response = requests.get(url, params=params)
-
-        if response.status_code == 200:
-            data = response.json()
-            df = pd.DataFrame(data)
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-            df["openInterest"] = df["sumOpenInterest"]
-            df["openInterestValue"] = df["sumOpenInterestValue"]
-            df = df[["timestamp", "openInterest", "openInterestValue"]]
-            print(f"✅ {self.symbol} - {self.interval} 미결제약정 데이터 수집 완료 ({len(df)}개)")
-            return df
-        else:
-            print(f"🚨 {self.symbol} 미결제약정 데이터 요청 실패!")
+        # ✅ Write-behind 배치 저장
+        self.sink = BatchSink("open_interest", OI_COLUMNS, mongo_collection=self.mongo_collection,
+                              use_mysql=self.use_mysql, use_postgres=self.use_postgres, use_mongo=self.use_mongo)
+
+    def request(self, url, params, max_retries=5):
+        """ 공유 세션 GET (가중치 제한 + 429/418/5xx 재시도) """
+        for attempt in range(max_retries):
+            self.limiter.acquire(1)
+            try:
+                response = self.session.get(url, params=params, timeout=10)
+            except requests.RequestException as e:
+                logging.warning(f"⚠️ [OI] {params.get('symbol')} 요청 실패 ({attempt + 1}/{max_retries}): {e}")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            self.limiter.observe(response)
+            if response.status_code in (418, 429) or response.status_code >= 500:
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            response.raise_for_status()
+            return response.json()
+        raise requests.RequestException(f"{params.get('symbol')} OI 요청 재시도 {max_retries}회 초과")
+
+    def fetch_historical_open_interest(self, symbol=None, start_ms=None, end_ms=None):
+        """ 바이낸스에서 과거 미결제약정(Open Interest) 데이터 수집 (endTime 을 과거로 옮기며 500건씩 페이지 수집) """
+        symbol = (symbol or self.symbol).upper()
+        url = f"{BINANCE_FUTURES_DATA_URL}/openInterestHist"
+        pages = []
+        total = 0
+        while total < self.limit:
+            params = {"symbol": symbol, "period": self.interval, "limit": min(OI_PAGE_LIMIT, self.limit - total)}
+            if end_ms is not None:
+                params["endTime"] = end_ms
+            try:
+                rows = self.request(url, params)
+            except requests.RequestException as e:
+                print(f"🚨 {symbol} 미결제약정 데이터 요청 실패! {e}")
+                break
+            if not rows:
+                break
+            pages.append(pd.DataFrame(rows))
+            total += len(rows)
+            oldest = int(min(row["timestamp"] for row in rows))
+            if len(rows) < params["limit"] or (start_ms is not None and oldest <= start_ms):
+                break
+            end_ms = oldest - 1  # 다음 페이지: 가장 오래된 데이터 이전
+
+        if not pages:
             return None
+        df = pd.concat(pages, ignore_index=True).drop_duplicates("timestamp").sort_values("timestamp")
+        if start_ms is not None:
+            df = df[df["timestamp"].astype("int64") >= start_ms]
+        df["timestamp"] = pd.to_datetime(df["timestamp"].astype("int64"), unit="ms")
+        df["openInterest"] = df["sumOpenInterest"].astype(float)
+        df["openInterestValue"] = df["sumOpenInterestValue"].astype(float)
+        df = df[["timestamp", "openInterest", "openInterestValue"]].reset_index(drop=True)
+        print(f"✅ {symbol} - {self.interval} 미결제약정 데이터 수집 완료 ({len(df)}개)")
+        return df
+
+    def fetch_open_interest(self, symbol):
+        """ 현재 미결제약정 조회 → {"timestamp", "openInterest", "openInterestValue"} (가격은 markPrice 로 환산) """
+        data = self.request(f"{BINANCE_FUTURES_BASE_URL}/openInterest", {"symbol": symbol})
+        mark = self.request(f"{BINANCE_FUTURES_BASE_URL}/premiumIndex", {"symbol": symbol})
+        open_interest = float(data["openInterest"])
+        return {
+            "timestamp": pd.Timestamp(int(data["time"]), unit="ms").to_pydatetime(),
+            "openInterest": open_interest,
+            "openInterestValue": open_interest * float(mark["markPrice"]),
+        }
 
-    def save_to_db(self, df):
-        """ 미결제약정 데이터를 MySQL, PostgreSQL, MongoDB에 저장 """
+    def save_to_db(self, df, symbol=None):
+        """ 미결제약정 데이터를 MySQL, PostgreSQL, MongoDB에 저장 (백그라운드 배치 저장) """
         if df is None or not self.save_db:
-            return
-
-        for _, row in df.iterrows():
-            record = (row["timestamp"], row["openInterest"], row["openInterestValue"])
-
-            if self.use_mysql:
-                query = "INSERT INTO open_interest (timestamp, open_interest, open_interest_value) VALUES (%s, %s, %s)"
-                self.mysql_cursor.execute(query, record)
-                self.mysql_conn.commit()
-
-            if self.use_postgres:
-                query = "INSERT INTO open_interest (timestamp, open_interest, open_interest_value) VALUES (%s, %s, %s)"
-                self.postgres_cursor.execute(query, record)
-                self.postgres_conn.commit()
+            return 0
 
-            if self.use_mongo:
-                self.mongo_collection.insert_one({
-                    "timestamp": row["timestamp"],
-                    "open_interest": row["openInterest"],
-                    "open_interest_value": row["openInterestValue"]
-                })
-
-        print(f"✅ {self.symbol} 미결제약정 데이터 DB 저장 완료!")
+        return self.sink.put_many(oi_records(df, (symbol or self.symbol).upper()))
 
     def save_to_csv(self, filename="open_interest_data.csv"):
         """ 미결제약정 데이터를 CSV 파일로 저장 """
-        if self.oi_data:
-            df = pd.DataFrame(self.oi_data)
-            df.to_csv(filename, index=False)
-            print(f"✅ {self.symbol} 미결제약정 데이터 저장 완료: {filename}")
+        frames = [pd.DataFrame(list(entries)).assign(symbol=symbol) for symbol, entries in self.oi_data.items() if entries]
+        if frames:
+            pd.concat(frames, ignore_index=True).to_csv(filename, index=False)
+            print(f"✅ {', '.join(self.symbols)} 미결제약정 데이터 저장 완료: {filename}")
+
+    def backfill(self, symbol):
+        """ 코인 1개 과거 데이터 수집 → 메모리 보관 + DB 저장 """
+        df = self.fetch_historical_open_interest(symbol)
+        if df is not None:
+            self.oi_data[symbol].extend(df.to_dict("records"))
+            self.save_to_db(df, symbol)
+        return 0 if df is None else len(df)
+
+    def poll(self, symbol):
+        """ 코인 1개 실시간 OI 조회 → 메모리 보관 + DB 저장 """
+        oi_entry = self.fetch_open_interest(symbol)
+        self.oi_data[symbol].append(oi_entry)
+        if self.save_db:
+            self.sink.put({"timestamp": oi_entry["timestamp"], "symbol": symbol,
+                           "open_interest": oi_entry["openInterest"], "open_interest_value": oi_entry["openInterestValue"]})
+        return oi_entry
 
     def run_realtime_stream(self):
-        """ WebSocket을 이용한 실시간 미결제약정 데이터 스트리밍 """
-        ws_url = f"wss://fstream.binance.com/ws/{self.symbol.lower()}@openInterest"
-
-        def on_message(ws, message):
-            data = json.loads(message)
-            oi_entry = {
-                "timestamp": datetime.utcnow(),
-                "openInterest": float(data["openInterest"]),
-                "openInterestValue": float(data["openInterestValue"]),
-            }
-            self.oi_data.append(oi_entry)
-            print(f"📊 [{self.symbol}] 실시간 OI: {oi_entry}")
-
-            # 실시간 데이터도 DB에 저장
-            self.save_to_db(pd.DataFrame([oi_entry]))
-
-        ws = websocket.WebSocketApp(ws_url, on_message=on_message)
-        print(f"🟢 {self.symbol} 미결제약정 실시간 데이터 스트리밍 시작")
-        ws.run_forever()
+        """ 전체 코인 미결제약정 주기 조회 (공유 세션으로 동시 요청) """
+        self.running = True
+        print(f"🟢 {', '.join(self.symbols)} 미결제약정 실시간 조회 시작 ({self.poll_interval}초 주기)")
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="oi-poll") as executor:
+            while self.running:
+                started = time.monotonic()
+                for symbol, future in [(symbol, executor.submit(self.poll, symbol)) for symbol in self.symbols]:
+                    try:
+                        print(f"📊 [{symbol}] 실시간 OI: {future.result()}")
+                    except Exception as e:
+                        logging.error(f"🚨 [OI] {symbol} 실시간 조회 실패: {e}")
+                time.sleep(max(self.poll_interval - (time.monotonic() - started), 0))
 
     def run(self):
-        """ 미결제약정 데이터 수집 실행 (과거 데이터 + 실시간) """
-        df = self.fetch_historical_open_interest()
-        if df is not None:
-            self.oi_data.extend(df.to_dict("records"))
-            self.save_to_db(df)
+        """ 미결제약정 데이터 수집 실행 (전체 코인 과거 데이터 + 실시간) """
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="oi-backfill") as executor:
+            list(executor.map(self.backfill, self.symbols))
 
         self.run_realtime_stream()
 
+    def start(self):
+        """ 백그라운드 스레드에서 수집 시작 """
+        thread = threading.Thread(target=self.run, name="oi-tracker")
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.running = False
+
 if __name__ == "__main__":
     tracker = OpenInterestTracker(interval="5m", limit=1000, save_db=True)
     tracker.run()
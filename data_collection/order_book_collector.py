@@ -1,14 +1,13 @@
-import websocket
-import json
 import os
 import logging
-import pandas as pd
-import mysql.connector
-import psycopg2
 import time
-from pymongo import MongoClient
 from dotenv import load_dotenv
 from datetime import datetime
+from data_collection.local_order_book import shared_order_books
+from data_collection.stream_manager import CombinedStreamManager
+from storage.batch_sink import BatchSink
+from storage.db_pool import shared_db_pool
+from storage.book_delta import BookDeltaStore, BookDeltaReader, fetch_symbol_filters, BOOK_KEYFRAME_INTERVAL_MS
 
 # ✅ 환경 변수 로드
 load_dotenv()
@@ -20,95 +19,74 @@ SELECTED_COINS = os.getenv("SELECTED_COINS", "BTCUSDT,ETHUSDT,SOLUSDT").split(",
 USE_MYSQL = os.getenv("USE_MYSQL") == "True"
 USE_POSTGRES = os.getenv("USE_POSTGRES") == "True"
 USE_MONGO = os.getenv("USE_MONGO") == "True"
+BINANCE_FUTURES_REST_URL = os.getenv("BINANCE_FUTURES_REST_URL", "https://fapi.binance.com/fapi/v1")
+ORDER_BOOK_DB_INTERVAL_MS = int(os.getenv("ORDER_BOOK_DB_INTERVAL_MS", str(BOOK_KEYFRAME_INTERVAL_MS)))  # DB 전체 호가 저장 간격 (전체 이력은 Delta 파일)
 
 class OrderBookCollector:
-    def __init__(self):
-        """ ✅ 다중 코인 & 다중 호가 깊이 분석 (depth5, depth20, depth50, depth100) """
+    def __init__(self, order_books=shared_order_books):
+        """ ✅ 다중 코인 & 다중 호가 깊이 분석 (공용 Diff 호가창 1개에서 depth5, depth20, depth50, depth100 도출) """
         self.symbols = [coin.strip().lower() for coin in SELECTED_COINS]
         self.depth_levels = [5, 20, 50, 100]
-        self.ws_urls = {
-            (symbol, depth): f"{BINANCE_WS_URL}{symbol}@depth{depth}@100ms"
-            for symbol in self.symbols
-            for depth in self.depth_levels
-        }
-        self.data = {
-            (symbol, depth): pd.DataFrame(columns=["timestamp", "bids", "asks"])
-            for symbol in self.symbols
-            for depth in self.depth_levels
-        }
+        self.order_books = order_books
+        self.depth_volumes = {}  # 코인 → {depth: (매수 총량, 매도 총량)}
 
-        # ✅ 데이터베이스 설정
+        # ✅ 호가 이력: 가장 깊은 레벨만 키프레임 + Delta로 저장 (얕은 깊이는 읽을 때 복원)
+        self.store_depth = max(self.depth_levels)
+        self.store = BookDeltaStore(filters=fetch_symbol_filters(BINANCE_FUTURES_REST_URL, self.symbols))
+        self.reader = BookDeltaReader(self.store.root)
+        self.last_db_write = {}
+
+        # ✅ 데이터베이스 설정 (Write-behind 배치 저장)
+        self.collection = None
         if USE_MONGO:
-            self.mongo_client = MongoClient(MONGO_URL)
+            self.mongo_client = shared_db_pool.mongo(MONGO_URL)
             self.db = self.mongo_client[MONGO_DB]
             self.collection = self.db[MONGO_COLLECTION]
 
-        if USE_MYSQL:
-            self.mysql_conn = mysql.connector.connect(
-                host=os.getenv("MYSQL_HOST"),
-                user=os.getenv("MYSQL_USER"),
-                password=os.getenv("MYSQL_PASSWORD"),
-                database=os.getenv("MYSQL_DATABASE")
-            )
-            self.mysql_cursor = self.mysql_conn.cursor()
-
-        if USE_POSTGRES:
-            self.postgres_conn = psycopg2.connect(
-                host=os.getenv("POSTGRES_HOST"),
-                user=os.getenv("POSTGRES_USER"),
-                password=os.getenv("POSTGRES_PASSWORD"),
-                database=os.getenv("POSTGRES_DATABASE")
-            )
-            self.postgres_cursor = self.postgres_conn.cursor()
+        self.sink = BatchSink("order_book", ["timestamp", "symbol", "depth", "bids", "asks"],
+                              mongo_collection=self.collection,
+                              sql_row=lambda row: (row["timestamp"], row["symbol"], row["depth"], str(row["bids"]), str(row["asks"])))
 
-    def process_order_book(self, data, symbol, depth):
-        """ ✅ 호가창 데이터 처리 및 저장 """
+    def process_order_book(self, book):
+        """ ✅ 로컬 호가창 갱신 시 깊이별 지표 계산 및 저장 """
         timestamp = datetime.utcnow()
-        bids = [(float(bid[0]), float(bid[1])) for bid in data["bids"]]
-        asks = [(float(ask[0]), float(ask[1])) for ask in data["asks"]]
-
-        row = {"timestamp": timestamp, "symbol": symbol.upper(), "depth": depth, "bids": bids, "asks": asks}
-        self.data[(symbol, depth)] = self.data[(symbol, depth)].append(row, ignore_index=True)
-
-        # ✅ MongoDB 저장
-        if USE_MONGO:
-            self.collection.insert_one(row)
-
-        # ✅ MySQL 저장
-        if USE_MYSQL:
-            sql = "INSERT INTO order_book (timestamp, symbol, depth, bids, asks) VALUES (%s, %s, %s, %s, %s)"
-            self.mysql_cursor.execute(sql, (timestamp, symbol.upper(), depth, str(bids), str(asks)))
-            self.mysql_conn.commit()
-
-        # ✅ PostgreSQL 저장
-        if USE_POSTGRES:
-            sql = "INSERT INTO order_book (timestamp, symbol, depth, bids, asks) VALUES (%s, %s, %s, %s, %s)"
-            self.postgres_cursor.execute(sql, (timestamp, symbol.upper(), depth, str(bids), str(asks)))
-            self.postgres_conn.commit()
-
-        logging.info(f"✅ [호가창 저장] {timestamp} {symbol.upper()} depth{depth} - Bids: {bids[:3]}... Asks: {asks[:3]}...")
-
-    def on_message(self, ws, message, symbol, depth):
-        """ ✅ WebSocket 메시지 처리 """
-        data = json.loads(message)
-        self.process_order_book(data, symbol, depth)
-
-    def on_error(self, ws, error):
-        logging.error(f"🚨 WebSocket 오류 발생: {error}")
-
-    def on_close(self, ws, close_status_code, close_msg):
-        logging.warning("⚠️ WebSocket 연결 종료! 5초 후 재연결...")
-        time.sleep(5)
-        self.start_websocket()
-
-    def start_websocket(self):
-        """ ✅ 다중 WebSocket 실행 (각 코인별 depth5, depth20, depth50, depth100) """
-        for (symbol, depth), ws_url in self.ws_urls.items():
-            ws = websocket.WebSocketApp(ws_url,
-                                        on_message=lambda ws, msg: self.on_message(ws, msg, symbol, depth),
-                                        on_error=self.on_error,
-                                        on_close=self.on_close)
-            ws.run_forever()
+        bid_volumes, ask_volumes = book.depth_view().volumes(self.depth_levels)  # 누적 곡선 1회로 모든 depth 계산
+        self.depth_volumes[book.symbol] = {depth: (float(bid), float(ask))
+                                           for depth, bid, ask in zip(self.depth_levels, bid_volumes, ask_volumes)}
+
+        bids, asks = book.bids.levels(self.store_depth), book.asks.levels(self.store_depth)
+        event_time = int(book.event_time or time.time() * 1000)
+        written = self.store.write(book.symbol, event_time, book.last_update_id, bids, asks)
+
+        # ✅ MongoDB, MySQL, PostgreSQL 저장 (전체 호가는 ORDER_BOOK_DB_INTERVAL_MS 간격으로만, 백그라운드 배치 저장)
+        if event_time - self.last_db_write.get(book.symbol, 0) >= ORDER_BOOK_DB_INTERVAL_MS:
+            self.last_db_write[book.symbol] = event_time
+            self.sink.put({"timestamp": timestamp, "symbol": book.symbol, "depth": self.store_depth,
+                           "bids": bids.tolist(), "asks": asks.tolist()})
+
+        logging.debug(f"✅ [호가창 저장] {timestamp} {book.symbol} depth{self.store_depth} - {written} bytes")
+
+    def snapshot(self, symbol, depth, at_ms=None):
+        """ ✅ 호가 스냅샷 (bids, asks) 조회 (at_ms 지정 시 Delta 파일에서 해당 시점 / 깊이 복원) """
+        if at_ms is None:
+            book = self.order_books.books.get(symbol.upper())
+            return None if book is None or not book.is_ready else (book.bids.levels(depth), book.asks.levels(depth))
+        self.store.flush()
+        return self.reader.snapshot(symbol, at_ms, depth)
+
+    def register_streams(self, manager):
+        """ ✅ 공용 LocalOrderBook에 수집기로 등록 (코인당 Diff Depth 스트림 1개, 깊이별 스트림 구독 없음) """
+        for symbol in self.symbols:
+            self.order_books.subscribe(manager, symbol, self.process_order_book)
+
+    def start_websocket(self, manager=None):
+        """ ✅ Combined Stream 실행 (각 코인별 Diff Depth 스트림) """
+        if manager is not None:
+            self.register_streams(manager)  # 공유 관리자에서 실행
+            return
+        manager = CombinedStreamManager()
+        self.register_streams(manager)
+        manager.start(block=True)
 
 # ✅ 사용 예시
 if __name__ == "__main__":
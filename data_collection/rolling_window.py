@@ -0,0 +1,214 @@
+import os
+from collections import deque
+from dotenv import load_dotenv
+
+# ✅ 환경 변수 로드
+load_dotenv()
+ROLLING_EWMA_ALPHA = float(os.getenv("ROLLING_EWMA_ALPHA", "0.2"))  # 구간 기준선 EWMA 가중치
+ROLLING_HISTORY = int(os.getenv("ROLLING_HISTORY", "10"))  # 구간별 보관 종료 구간 수
+
+INTERVAL_UNITS = {"s": 1_000, "m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+
+def parse_interval(interval):
+    """ ✅ "1s", "5m", "4h", "1d" → ms (생성 시 1회만 계산) """
+    unit = interval[-1]
+    if unit not in INTERVAL_UNITS or not interval[:-1].isdigit():
+        raise ValueError(f"지원하지 않는 구간: {interval}")
+    return int(interval[:-1]) * INTERVAL_UNITS[unit]
+
+
+class WindowStats:
+    __slots__ = ("start", "end", "count", "volume", "volume_sq", "value", "buy_volume")
+
+    def __init__(self, start=0, end=0):
+        """ ✅ 구간 누적 통계 (건수, 거래량 합/제곱합, 거래대금, 매수 거래량) """
+        self.reset(start, end)
+
+    def reset(self, start, end):
+        self.start = start
+        self.end = end
+        self.count = 0
+        self.volume = 0.0
+        self.volume_sq = 0.0
+        self.value = 0.0
+        self.buy_volume = 0.0
+
+    def add(self, qty, value, buy):
+        self.count += 1
+        self.volume += qty
+        self.volume_sq += qty * qty
+        self.value += value
+        if buy:
+            self.buy_volume += qty
+
+    def subtract(self, other):
+        self.count -= other.count
+        self.volume -= other.volume
+        self.volume_sq -= other.volume_sq
+        self.value -= other.value
+        self.buy_volume -= other.buy_volume
+
+    def merge(self, other):
+        self.count += other.count
+        self.volume += other.volume
+        self.volume_sq += other.volume_sq
+        self.value += other.value
+        self.buy_volume += other.buy_volume
+
+    def copy(self):
+        stats = WindowStats(self.start, self.end)
+        stats.merge(self)
+        return stats
+
+    @property
+    def mean(self):
+        """ ✅ 체결당 평균 거래량 """
+        return self.volume / self.count if self.count else 0.0
+
+    @property
+    def variance(self):
+        """ ✅ 체결 거래량 분산 (sum, sum of squares 기반) """
+        if self.count < 2:
+            return 0.0
+        return max(self.volume_sq / self.count - self.mean ** 2, 0.0)
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    @property
+    def vwap(self):
+        return self.value / self.volume if self.volume else None
+
+    @property
+    def sell_volume(self):
+        return self.volume - self.buy_volume
+
+
+class EWMA:
+    def __init__(self, alpha=ROLLING_EWMA_ALPHA):
+        """ ✅ 지수 가중 이동 평균 (O(1) 갱신) """
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+    def decay(self, steps):
+        """ ✅ 값 0인 구간 steps개 반영 (반복 없이 한 번에 감쇠) """
+        if self.value is not None and steps > 0:
+            self.value *= (1 - self.alpha) ** steps
+
+
+class TumblingWindow:
+    def __init__(self, interval, history=ROLLING_HISTORY, ewma_alpha=ROLLING_EWMA_ALPHA):
+        """ ✅ 고정 구간 (거래소 시각 기준 정렬: start = ts - ts % interval) + 종료 구간 EWMA 기준선 """
+        self.interval = interval
+        self.interval_ms = parse_interval(interval)
+        self.current = WindowStats()
+        self.history = deque(maxlen=history)  # 종료된 구간 통계
+        self.volume_baseline = EWMA(ewma_alpha)
+        self.value_baseline = EWMA(ewma_alpha)
+
+    def update(self, timestamp, qty, value, buy):
+        """ ✅ 체결 1건 반영 (구간이 바뀌면 종료된 구간 통계 반환) """
+        closed = None
+        if timestamp >= self.current.end:
+            start = timestamp - timestamp % self.interval_ms
+            if self.current.count:
+                closed = self.current.copy()
+                self.history.append(closed)
+                self.volume_baseline.update(closed.volume)
+                self.value_baseline.update(closed.value)
+                skipped = (start - self.current.end) // self.interval_ms  # 체결 없이 지나간 구간
+                self.volume_baseline.decay(skipped)
+                self.value_baseline.decay(skipped)
+            self.current.reset(start, start + self.interval_ms)
+        self.current.add(qty, value, buy)
+        return closed
+
+
+class SlidingWindow:
+    def __init__(self, span, resolution="1s"):
+        """ ✅ 슬라이딩 구간 (resolution 단위 버킷 링 + 누적 합계, 체결당 O(1) 상각) """
+        self.span = span
+        self.resolution_ms = parse_interval(resolution)
+        self.size = max(parse_interval(span) // self.resolution_ms, 1)
+        self.buckets = [WindowStats() for _ in range(self.size)]
+        self.totals = WindowStats()
+        self.head = None  # 최신 버킷 번호 (timestamp // resolution)
+
+    def _advance(self, bucket_id):
+        if self.head is None or bucket_id - self.head >= self.size:
+            for bucket in self.buckets:
+                bucket.reset(0, 0)
+            self.totals.reset(0, 0)
+        else:
+            for expired in range(self.head + 1, bucket_id + 1):
+                bucket = self.buckets[expired % self.size]
+                self.totals.subtract(bucket)
+                bucket.reset(0, 0)
+        self.head = bucket_id
+
+    def update(self, timestamp, qty, value, buy):
+        bucket_id = timestamp // self.resolution_ms
+        if self.head is None or bucket_id > self.head:
+            self._advance(bucket_id)
+        elif bucket_id <= self.head - self.size:
+            return  # 구간 밖 지연 체결
+        self.buckets[bucket_id % self.size].add(qty, value, buy)
+        self.totals.add(qty, value, buy)
+
+    def stats(self, now_ms=None):
+        """ ✅ 최근 span 구간 합계 (now_ms 지정 시 만료 버킷 먼저 제거) """
+        if now_ms is not None:
+            bucket_id = now_ms // self.resolution_ms
+            if self.head is not None and bucket_id > self.head:
+                self._advance(bucket_id)
+        return self.totals
+
+
+class RollingWindowEngine:
+    def __init__(self, intervals=("1m", "5m", "15m"), sliding=(), resolution="1s",
+                 history=ROLLING_HISTORY, ewma_alpha=ROLLING_EWMA_ALPHA):
+        """ ✅ 다중 구간 집계 엔진 (1s ~ 1d 고정/슬라이딩 구간 동시 유지, 체결당 O(1) 갱신) """
+        self.tumbling = {interval: TumblingWindow(interval, history, ewma_alpha) for interval in intervals}
+        self.sliding = {span: SlidingWindow(span, resolution) for span in sliding}
+        self.last_timestamp = None
+
+    def update(self, timestamp, price, qty, is_buyer_maker=False):
+        """ ✅ 체결 1건 반영 → 이번 체결로 종료된 구간 {interval: WindowStats} """
+        value = price * qty
+        buy = not is_buyer_maker
+        self.last_timestamp = timestamp
+        closed = {}
+        for interval, window in self.tumbling.items():
+            stats = window.update(timestamp, qty, value, buy)
+            if stats is not None:
+                closed[interval] = stats
+        for window in self.sliding.values():
+            window.update(timestamp, qty, value, buy)
+        return closed
+
+    def on_trade(self, record):
+        """ ✅ TradeRecord 반영 """
+        return self.update(record.trade_time, record.price, record.quantity, record.is_buyer_maker)
+
+    def window(self, interval):
+        """ ✅ 진행 중인 고정 구간 통계 """
+        return self.tumbling[interval].current
+
+    def history(self, interval):
+        """ ✅ 종료된 고정 구간 통계 (오래된 순) """
+        return self.tumbling[interval].history
+
+    def baseline(self, interval):
+        """ ✅ 종료 구간 거래량 / 거래대금 EWMA 기준선 """
+        window = self.tumbling[interval]
+        return window.volume_baseline.value, window.value_baseline.value
+
+    def rolling(self, span, now_ms=None):
+        """ ✅ 슬라이딩 구간 통계 """
+        return self.sliding[span].stats(now_ms)
@@ -1,20 +1,21 @@
-import websocket
-import json
 import os
 import logging
-import pandas as pd
-import mysql.connector
-import psycopg2
+import numpy as np
 import time
-from pymongo import MongoClient
 from dotenv import load_dotenv
 from datetime import datetime
-from collections import defaultdict
-import requests
+from data_collection.local_order_book import shared_order_books
+from data_collection.message_decoder import levels_to_array
+from data_collection.stream_manager import CombinedStreamManager
+from storage.batch_sink import BatchSink
+from storage.book_delta import fetch_symbol_filters
+from storage.db_pool import shared_db_pool
+from notification.alert_dispatcher import shared_alert_dispatcher
 
 # ✅ 환경 변수 로드
 load_dotenv()
 BINANCE_WS_URL = os.getenv("BINANCE_FUTURES_WS_URL", "wss://fstream.binance.com/ws/")
+BINANCE_FUTURES_REST_URL = os.getenv("BINANCE_FUTURES_REST_URL", "https://fapi.binance.com/fapi/v1")
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
 MONGO_DB = os.getenv("MONGO_DB", "trading_data")
 MONGO_COLLECTION = os.getenv("MONGO_COLLECTION", "spoofing_orders")
@@ -24,123 +25,194 @@ USE_POSTGRES = os.getenv("USE_POSTGRES") == "True"
 USE_MONGO = os.getenv("USE_MONGO") == "True"
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+SPOOF_BAND_TICKS = int(os.getenv("SPOOF_BAND_TICKS", "500"))  # 추적 범위 (중간가 기준 ±tick 수)
+SPOOF_SIZE_MULTIPLE = float(os.getenv("SPOOF_SIZE_MULTIPLE", "5"))  # 대량 주문 기준 (평균 레벨 수량 대비 배수)
+SPOOF_DEPTH_HALFLIFE = float(os.getenv("SPOOF_DEPTH_HALFLIFE", "50"))  # 평균 레벨 수량 EWMA 반감기 (갱신 횟수)
+
+
+class LevelBand:
+    def __init__(self, band_ticks, tick):
+        """ ✅ 중간가 주변 ±band_ticks 가격 레벨 상태 배열 (매수 / 매도 공용, 범위 밖 레벨은 추적하지 않음)
+
+        index = 가격 tick - anchor, 레벨별 현재 수량 / 최초 등장 시각 / 최대 수량 보관
+        """
+        self.band_ticks = band_ticks
+        self.tick = tick
+        self.anchor = None  # 배열 index 0 의 가격 tick
+        self.size = np.zeros(2 * band_ticks + 1)
+        self.first_seen = np.zeros(2 * band_ticks + 1)
+        self.peak = np.zeros(2 * band_ticks + 1)
+
+    def recenter(self, mid, side):
+        """ ✅ 중간가가 범위 절반 이상 이동하면 기준 이동 (범위를 벗어난 레벨 상태는 버리고 새 구간은 호가창에서 채움) """
+        center = int(round(mid / self.tick))
+        if self.anchor is None:
+            self.anchor = center - self.band_ticks
+            self.seed(side.levels(side.count))
+            return
+        shift = center - self.band_ticks - self.anchor
+        if abs(shift) < self.band_ticks // 2:
+            return
+        for array in (self.size, self.first_seen, self.peak):
+            if abs(shift) >= len(array):
+                array[:] = 0
+            elif shift > 0:
+                array[:-shift] = array[shift:]
+                array[-shift:] = 0
+            else:
+                array[-shift:] = array[:shift]
+                array[:-shift] = 0
+        self.anchor += shift
+        self.seed(side.levels(side.count))
+
+    def seed(self, levels):
+        """ ✅ 비어 있는 레벨을 현재 호가로 채움 (등장 시각을 모르므로 first_seen = 0 → 스푸핑 판단 제외) """
+        index = np.rint(levels[:, 0] / self.tick).astype(np.int64) - self.anchor
+        inside = (index >= 0) & (index < len(self.size))
+        index, qty = index[inside], levels[inside, 1]
+        empty = self.size[index] == 0
+        self.size[index[empty]] = qty[empty]
+        self.peak[index[empty]] = qty[empty]
+        self.first_seen[index[empty]] = 0
+
+    def apply(self, levels, now):
+        """ ✅ 변경 레벨 적용 → 삭제된 레벨 (가격, 최대 수량, 유지 시간) 배열 (삭제 없으면 None)
+
+        비용은 변경된 레벨 수에 비례 (추가: 등장 시각 기록, 증가: 최대 수량 갱신, 삭제: 수명 계산 후 초기화)
+        """
+        index = np.rint(levels[:, 0] / self.tick).astype(np.int64) - self.anchor
+        inside = (index >= 0) & (index < len(self.size))
+        index, levels = index[inside], levels[inside]
+        qty = levels[:, 1]
+        prev = self.size[index]
+
+        added = (prev == 0) & (qty > 0)
+        self.first_seen[index[added]] = now
+        self.peak[index] = np.where(added, qty, np.maximum(self.peak[index], qty))
+
+        removed = (prev > 0) & (qty == 0)
+        self.size[index] = qty
+        if not removed.any():
+            return None
+        removed_index = index[removed]
+        result = np.column_stack((levels[removed, 0], self.peak[removed_index], now - self.first_seen[removed_index]))
+        self.first_seen[removed_index] = 0
+        self.peak[removed_index] = 0
+        return result
+
 
 class SpoofingDetector:
-    def __init__(self, depth=20, threshold_ratio=0.02, cancel_time_threshold=0.5):
-        """ ✅ 다중 코인 스푸핑 주문 탐지 클래스 """
+    def __init__(self, depth=20, size_multiple=SPOOF_SIZE_MULTIPLE, cancel_time_threshold=0.5,
+                 band_ticks=SPOOF_BAND_TICKS, order_books=shared_order_books):
+        """ ✅ 다중 코인 스푸핑 주문 탐지 클래스 (호가 Diff 기반 레벨 수명 추적)
+
+        depth 레벨 평균 수량(EWMA)의 size_multiple 배 이상 쌓였던 레벨이 cancel_time_threshold 초 안에
+        최우선 호가 뒤에서 사라지면(체결이 아닌 취소) 스푸핑으로 판단합니다.
+        """
         self.symbols = [coin.strip().lower() for coin in SELECTED_COINS]
         self.depth = depth
-        self.threshold_ratio = threshold_ratio  # 주문 비율 기준 (예: 2% 이상 비정상 주문)
+        self.size_multiple = size_multiple  # 대량 주문 기준 (평균 레벨 수량 대비 배수)
         self.cancel_time_threshold = cancel_time_threshold  # 주문 취소까지 걸리는 최대 허용 시간 (초)
-        self.ws_urls = {symbol: f"{BINANCE_WS_URL}{symbol}@depth{depth}@100ms" for symbol in self.symbols}
-        self.recent_orders = {symbol: defaultdict(dict) for symbol in self.symbols}  # 주문 ID별 생성 & 취소 시간 기록
-
-        # ✅ 데이터베이스 설정
+        self.band_ticks = band_ticks
+        self.order_books = order_books
+        self.alpha = 1 - 0.5 ** (1 / SPOOF_DEPTH_HALFLIFE)
+        self.filters = fetch_symbol_filters(BINANCE_FUTURES_REST_URL, self.symbols)
+        self.bands = {}  # 코인 → (매수 LevelBand, 매도 LevelBand)
+        self.mean_level_size = {}  # 코인 → 상위 depth 레벨 평균 수량 (EWMA)
+
+        # ✅ 데이터베이스 설정 (Write-behind 배치 저장)
+        self.collection = None
         if USE_MONGO:
-            self.mongo_client = MongoClient(MONGO_URL)
+            self.mongo_client = shared_db_pool.mongo(MONGO_URL)
             self.db = self.mongo_client[MONGO_DB]
             self.collection = self.db[MONGO_COLLECTION]
 
-        if USE_MYSQL:
-            self.mysql_conn = mysql.connector.connect(
-                host=os.getenv("MYSQL_HOST"),
-                user=os.getenv("MYSQL_USER"),
-                password=os.getenv("MYSQL_PASSWORD"),
-                database=os.getenv("MYSQL_DATABASE")
-            )
-            self.mysql_cursor = self.mysql_conn.cursor()
-
-        if USE_POSTGRES:
-            self.postgres_conn = psycopg2.connect(
-                host=os.getenv("POSTGRES_HOST"),
-                user=os.getenv("POSTGRES_USER"),
-                password=os.getenv("POSTGRES_PASSWORD"),
-                database=os.getenv("POSTGRES_DATABASE")
-            )
-            self.postgres_cursor = self.postgres_conn.cursor()
-
-    def detect_spoofing(self, data, symbol):
-        """ ✅ 스푸핑 주문 탐지 """
-        timestamp = datetime.utcnow()
-        bids = {float(bid[0]): float(bid[1]) for bid in data["bids"]}
-        asks = {float(ask[0]): float(ask[1]) for ask in data["asks"]}
-
-        # ✅ 기존 주문과 비교하여 비정상적인 주문 취소 여부 감지
-        for price, size in list(self.recent_orders[symbol].items()):
-            if price not in bids and price not in asks:
-                cancel_time = (timestamp - size["timestamp"]).total_seconds()
-                if cancel_time < self.cancel_time_threshold:
-                    spoofing_order = {
-                        "timestamp": timestamp,
-                        "symbol": symbol.upper(),
-                        "price": price,
-                        "size": size["size"],
-                        "cancel_time": cancel_time
-                    }
-
-                    # ✅ Telegram 알림 전송
-                    self.send_telegram_alert(f"🚨 [스푸핑 감지] {symbol} {price} {size['size']}개 주문 취소됨 (취소 속도: {cancel_time:.2f}s)")
-
-                    # ✅ MongoDB 저장
-                    if USE_MONGO:
-                        self.collection.insert_one(spoofing_order)
-
-                    # ✅ MySQL 저장
-                    if USE_MYSQL:
-                        sql = "INSERT INTO spoofing_orders (timestamp, symbol, price, size, cancel_time) VALUES (%s, %s, %s, %s, %s)"
-                        self.mysql_cursor.execute(sql, (
-                            spoofing_order["timestamp"], spoofing_order["symbol"],
-                            spoofing_order["price"], spoofing_order["size"], spoofing_order["cancel_time"]
-                        ))
-                        self.mysql_conn.commit()
-
-                    # ✅ PostgreSQL 저장
-                    if USE_POSTGRES:
-                        sql = "INSERT INTO spoofing_orders (timestamp, symbol, price, size, cancel_time) VALUES (%s, %s, %s, %s, %s)"
-                        self.postgres_cursor.execute(sql, (
-                            spoofing_order["timestamp"], spoofing_order["symbol"],
-                            spoofing_order["price"], spoofing_order["size"], spoofing_order["cancel_time"]
-                        ))
-                        self.postgres_conn.commit()
-
-                    logging.info(f"✅ [스푸핑 감지] {spoofing_order}")
-
-                del self.recent_orders[symbol][price]
-
-        # ✅ 새로운 주문 저장
-        for price, size in bids.items():
-            self.recent_orders[symbol][price] = {"timestamp": timestamp, "size": size}
-        for price, size in asks.items():
-            self.recent_orders[symbol][price] = {"timestamp": timestamp, "size": size}
-
-    def send_telegram_alert(self, message):
+        self.sink = BatchSink("spoofing_orders", ["timestamp", "symbol", "price", "size", "cancel_time"],
+                              mongo_collection=self.collection)
+
+    def tick_size(self, book):
+        """ ✅ 가격 단위 (거래소 필터, 조회 실패 시 호가 가격 간격으로 추정) """
+        if book.symbol in self.filters:
+            return self.filters[book.symbol][0]
+        gaps = np.diff(book.asks.top_prices(50))
+        gaps = gaps[gaps > 0]
+        return float(gaps.min()) if len(gaps) else 0.01
+
+    def detect_spoofing(self, book, data):
+        """ ✅ 스푸핑 주문 탐지 (공용 호가창에 적용된 Diff 이벤트 입력) """
+        symbol = book.symbol
+        bands = self.bands.get(symbol)
+        if bands is None:
+            tick = self.tick_size(book)
+            bands = self.bands[symbol] = (LevelBand(self.band_ticks, tick), LevelBand(self.band_ticks, tick))
+        now = book.event_time / 1000 if book.event_time else time.time()
+
+        # ✅ 평균 레벨 수량 (공유 누적 곡선에서 O(1), EWMA로 누적)
+        bid_total, ask_total = book.depth_view().volumes([self.depth])
+        level_size = (bid_total[0] + ask_total[0]) / (2 * self.depth)
+        mean = self.mean_level_size.get(symbol)
+        mean = level_size if mean is None else mean + self.alpha * (level_size - mean)
+        self.mean_level_size[symbol] = mean
+
+        mid = book.mid_price
+        for band, levels, side, is_bid in ((bands[0], data["b"], book.bids, True),
+                                          (bands[1], data["a"], book.asks, False)):
+            band.recenter(mid, side)
+            if not isinstance(levels, np.ndarray):
+                levels = levels_to_array(levels)
+            if len(levels) == 0:
+                continue
+            removed = band.apply(levels, now)
+            if removed is None:
+                continue
+            # 최우선 호가 뒤쪽 레벨 삭제만 취소로 간주 (최우선 호가 이상 삭제는 체결 가능성)
+            behind = removed[:, 0] < side.best_price if is_bid else removed[:, 0] > side.best_price
+            suspects = removed[behind & (removed[:, 1] >= self.size_multiple * mean)
+                               & (removed[:, 2] < self.cancel_time_threshold)]
+            for price, size, cancel_time in suspects.tolist():
+                self.report(symbol, "bid" if is_bid else "ask", price, size, cancel_time)
+
+    def on_resync(self, symbol, reason):
+        """ ✅ 호가창 재동기화 → 레벨 수명 상태 폐기 (누락 구간의 삭제를 취소로 오판하지 않도록 새 호가로 다시 채움) """
+        self.bands.pop(symbol, None)
+
+    def report(self, symbol, side, price, size, cancel_time):
+        """ ✅ 스푸핑 주문 알림 및 저장 """
+        spoofing_order = {
+            "timestamp": datetime.utcnow(),
+            "symbol": symbol,
+            "price": price,
+            "size": size,
+            "cancel_time": cancel_time
+        }
+
+        # ✅ Telegram 알림 전송
+        self.send_telegram_alert(f"🚨 [스푸핑 감지] {symbol} {side} {price} {size}개 주문 취소됨 (취소 속도: {cancel_time:.2f}s)",
+                                 key=f"spoofing:{symbol}")
+
+        # ✅ MongoDB, MySQL, PostgreSQL 저장 (백그라운드 배치 저장)
+        self.sink.put(spoofing_order)
+
+        logging.info(f"✅ [스푸핑 감지] {spoofing_order}")
+
+    def send_telegram_alert(self, message, key=None):
         """ ✅ Telegram 알림 전송 """
         if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-            payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-            requests.post(url, data=payload)
-
-    def on_message(self, ws, message, symbol):
-        """ ✅ WebSocket 메시지 처리 """
-        data = json.loads(message)
-        self.detect_spoofing(data, symbol)
-
-    def on_error(self, ws, error):
-        logging.error(f"🚨 WebSocket 오류 발생: {error}")
-
-    def on_close(self, ws, close_status_code, close_msg):
-        logging.warning("⚠️ WebSocket 연결 종료! 5초 후 재연결...")
-        time.sleep(5)
-        self.start_websocket()
-
-    def start_websocket(self):
-        """ ✅ 다중 WebSocket 실행 (각 코인별 스푸핑 탐지) """
-        for symbol, ws_url in self.ws_urls.items():
-            ws = websocket.WebSocketApp(ws_url,
-                                        on_message=lambda ws, msg: self.on_message(ws, msg, symbol),
-                                        on_error=self.on_error,
-                                        on_close=self.on_close)
-            ws.run_forever()
+            shared_alert_dispatcher.send(message, key=key, chat_id=TELEGRAM_CHAT_ID, bot_token=TELEGRAM_BOT_TOKEN)
+
+    def register_streams(self, manager):
+        """ ✅ 공용 LocalOrderBook에 Diff 분석기로 등록 (Diff Depth 스트림은 코인당 1회만 구독) """
+        for symbol in self.symbols:
+            self.order_books.subscribe(manager, symbol, diff_listener=self.detect_spoofing, resync_listener=self.on_resync)
+
+    def start_websocket(self, manager=None):
+        """ ✅ Combined Stream 실행 (각 코인별 스푸핑 탐지) """
+        if manager is not None:
+            self.register_streams(manager)  # 공유 관리자에서 실행
+            return
+        manager = CombinedStreamManager()
+        self.register_streams(manager)
+        manager.start(block=True)
 
 # ✅ 사용 예시
 if __name__ == "__main__":
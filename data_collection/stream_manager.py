@@ -0,0 +1,169 @@
+import websocket
+import os
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from dotenv import load_dotenv
+from data_collection.message_decoder import loads, normalize_stream
+from data_collection.stream_watchdog import STREAM_WATCHDOG, StreamWatchdog
+from monitoring.stream_metrics import shared_stream_metrics
+
+# ✅ 환경 변수 로드
+load_dotenv()
+BINANCE_STREAM_URL = os.getenv("BINANCE_FUTURES_STREAM_URL", "wss://fstream.binance.com/stream")
+MAX_STREAMS_PER_CONNECTION = int(os.getenv("MAX_STREAMS_PER_CONNECTION", "200"))  # Binance 선물 연결당 최대 스트림 수
+
+
+def build_combined_urls(streams, base_url=BINANCE_STREAM_URL, max_streams=MAX_STREAMS_PER_CONNECTION):
+    """ ✅ 스트림 목록을 연결당 최대 개수로 나누어 Combined Stream URL 생성 """
+    streams = list(dict.fromkeys(normalize_stream(stream) for stream in streams))
+    return [
+        (streams[i:i + max_streams], f"{base_url}?streams={'/'.join(streams[i:i + max_streams])}")
+        for i in range(0, len(streams), max_streams)
+    ]
+
+
+class CombinedStreamManager:
+    def __init__(self, base_url=BINANCE_STREAM_URL, max_streams_per_connection=MAX_STREAMS_PER_CONNECTION,
+                 reconnect_delay=5, ping_interval=30, metrics=shared_stream_metrics, watchdog=STREAM_WATCHDOG):
+        """ ✅ Binance Combined Stream 다중화 관리자 (소수의 소켓으로 수백 개 스트림 처리) """
+        self.base_url = base_url
+        self.max_streams_per_connection = max_streams_per_connection
+        self.reconnect_delay = reconnect_delay
+        self.ping_interval = ping_interval
+        self.metrics = metrics  # 스트림별 지연 / 처리량 계측
+        self.handlers = defaultdict(list)  # 스트림 이름 → 핸들러 목록
+        self.connections = []
+        self.sockets = {}  # 스트림 이름 → 현재 연결 (스트림 단위 재구독)
+        self.request_id = 0
+        self.threads = []
+        self.running = False
+        self.watchdog = StreamWatchdog(self) if watchdog else None  # 시퀀스 누락 / 정지 감시 → 해당 스트림만 재구독
+
+    def subscribe(self, stream, handler):
+        """ ✅ 스트림 구독 등록 (handler(data)는 스트림 이름으로 라우팅됨) """
+        self.handlers[normalize_stream(stream)].append(handler)
+
+    def unsubscribe(self, stream, handler=None):
+        """ ✅ 스트림 구독 해제 """
+        stream = normalize_stream(stream)
+        if handler is None:
+            self.handlers.pop(stream, None)
+        elif handler in self.handlers.get(stream, []):
+            self.handlers[stream].remove(handler)
+            if not self.handlers[stream]:
+                del self.handlers[stream]
+
+    @property
+    def streams(self):
+        return list(self.handlers.keys())
+
+    def dispatch(self, stream, data):
+        """ ✅ 스트림 이름 기준으로 메시지를 핸들러에 전달 """
+        for handler in self.handlers.get(stream, ()):
+            try:
+                handler(data)
+            except Exception as e:
+                logging.error(f"🚨 [{stream}] 핸들러 처리 실패: {e}")
+
+    def on_message(self, ws, message):
+        """ ✅ Combined Stream 메시지 처리 ({"stream": ..., "data": ...}) """
+        received_at = time.time()
+        started = time.perf_counter()
+        payload = loads(message)
+        stream = payload.get("stream")
+        if stream is None:
+            return  # 구독 응답 등 스트림 데이터가 아닌 메시지
+        stream = normalize_stream(stream)
+        data = payload["data"]
+        parsed = time.perf_counter()
+        if self.watchdog is not None:
+            self.watchdog.observe(stream, data)
+        self.dispatch(stream, data)
+        if self.metrics.enabled:
+            handled = time.perf_counter()
+            self.metrics.received(stream, len(message), data, received_at)
+            self.metrics.observe(stream, "parse", parsed - started)
+            self.metrics.handled(stream, data, handled - parsed, received_at + handled - started)
+
+    def on_error(self, ws, error):
+        logging.error(f"🚨 WebSocket 오류 발생: {error}")
+
+    def on_close(self, ws, close_status_code, close_msg):
+        logging.warning(f"⚠️ WebSocket 연결 종료! ({close_status_code}) {self.reconnect_delay}초 후 재연결...")
+
+    def _run_connection(self, url, streams):
+        """ ✅ 단일 연결 실행 (재귀 없이 루프에서 재연결) """
+        while self.running:
+            ws = websocket.WebSocketApp(url,
+                                        on_message=self.on_message,
+                                        on_error=self.on_error,
+                                        on_close=self.on_close)
+            self.connections.append(ws)
+            for stream in streams:
+                self.sockets[stream] = ws
+            logging.info(f"🟢 Combined Stream 연결 ({len(streams)}개 스트림)")
+            ws.run_forever(ping_interval=self.ping_interval)
+            self.connections.remove(ws)
+            if self.running:
+                time.sleep(self.reconnect_delay)
+
+    def resubscribe(self, streams):
+        """ ✅ 지정 스트림만 재구독 (같은 연결에 UNSUBSCRIBE → SUBSCRIBE, 전송 실패 시 해당 연결만 재연결) """
+        by_socket = defaultdict(list)
+        for stream in streams:
+            ws = self.sockets.get(stream)
+            if ws is not None:
+                by_socket[ws].append(stream)
+
+        for ws, grouped in by_socket.items():
+            try:
+                for method in ("UNSUBSCRIBE", "SUBSCRIBE"):
+                    self.request_id += 1
+                    ws.send(json.dumps({"method": method, "params": grouped, "id": self.request_id}))
+                logging.info(f"🔄 스트림 재구독: {', '.join(grouped)}")
+            except Exception as e:
+                logging.error(f"🚨 스트림 재구독 실패 ({e}) → 해당 연결 재연결")
+                ws.close()  # _run_connection 루프가 이 연결만 다시 연결
+
+    def start(self, block=False):
+        """ ✅ 등록된 모든 스트림을 Combined Stream 연결로 실행 """
+        if not self.handlers:
+            logging.warning("⚠️ 구독된 스트림이 없습니다!")
+            return
+
+        self.running = True
+        self.metrics.serve()  # METRICS_PORT 설정 시 HTTP 지표 엔드포인트 실행
+        for streams, url in build_combined_urls(self.streams, self.base_url, self.max_streams_per_connection):
+            thread = threading.Thread(target=self._run_connection, args=(url, streams))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+        if self.watchdog is not None:
+            self.watchdog.start()
+
+        if block:
+            for thread in self.threads:
+                thread.join()
+
+    def stop(self):
+        """ ✅ 모든 연결 종료 """
+        self.running = False
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        for ws in list(self.connections):
+            ws.close()
+
+# ✅ 사용 예시 (단일 프로세스에서 전체 SELECTED_COINS 수집)
+if __name__ == "__main__":
+    from data_collection.order_book_collector import OrderBookCollector
+    from data_collection.trade_data_collector import TradeDataCollector
+    from data_collection.spoofing_detector import SpoofingDetector
+    from data_collection.websocket_listener import WebSocketListener
+
+    manager = CombinedStreamManager()
+    for collector in (OrderBookCollector(), TradeDataCollector(), SpoofingDetector(), WebSocketListener()):
+        collector.start_websocket(manager)
+    manager.start(block=True)
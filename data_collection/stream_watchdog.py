@@ -0,0 +1,194 @@
+import os
+import time
+import random
+import logging
+import threading
+from typing import NamedTuple
+from dotenv import load_dotenv
+from data_collection.local_order_book import shared_order_books
+from data_collection.message_decoder import normalize_stream
+
+# ✅ 환경 변수 로드
+load_dotenv()
+STREAM_WATCHDOG = os.getenv("STREAM_WATCHDOG", "True") == "True"  # 스트림 감시기 사용 여부
+STREAM_STALE_SECONDS = float(os.getenv("STREAM_STALE_SECONDS", "60"))  # 메시지 없음 → 정지 판단 시간 (체결 등)
+DEPTH_STALE_SECONDS = float(os.getenv("DEPTH_STALE_SECONDS", "10"))  # 호가 스트림 정지 판단 시간
+WATCHDOG_CHECK_INTERVAL = float(os.getenv("WATCHDOG_CHECK_INTERVAL", "1"))  # 정지 검사 주기 (초)
+WATCHDOG_BACKOFF_BASE = float(os.getenv("WATCHDOG_BACKOFF_BASE", "1"))  # 재구독 대기 시작 값 (초, 실패마다 2배)
+WATCHDOG_BACKOFF_MAX = float(os.getenv("WATCHDOG_BACKOFF_MAX", "60"))  # 재구독 대기 최대 값 (초)
+
+
+class WatchdogEvent(NamedTuple):
+    """ ✅ 스트림 감시 이벤트 (kind: gap / stale / resubscribe) """
+    stream: str
+    kind: str
+    detail: str
+    time: float
+
+
+class StreamState:
+    __slots__ = ("last_message", "last_id", "gaps", "stale", "attempts", "next_retry")
+
+    def __init__(self, now):
+        self.last_message = now  # 구독 시점부터 경과 시간 측정
+        self.last_id = None  # 직전 시퀀스 (Diff: u, aggTrade: a)
+        self.gaps = 0
+        self.stale = 0
+        self.attempts = 0  # 연속 재구독 횟수 (메시지 재개 시 초기화)
+        self.next_retry = 0.0
+
+
+def sequence_kind(stream):
+    """ ✅ 시퀀스 검증 방식 ("btcusdt@depth@100ms" → "depth", "@aggTrade" → "aggTrade", 그 외 None) """
+    event = stream.split("@")[1].lower() if "@" in stream else ""  # 이벤트 이름은 거래소 표기 그대로 (aggTrade) → 소문자로 비교
+    if event == "depth":
+        return "depth"  # Diff Depth (부분 호가 @depthN 은 스냅샷이므로 제외)
+    if event == "aggtrade":
+        return "aggTrade"
+    return None
+
+
+class StreamWatchdog:
+    def __init__(self, manager, order_books=shared_order_books, check_interval=WATCHDOG_CHECK_INTERVAL,
+                 stale_seconds=STREAM_STALE_SECONDS, depth_stale_seconds=DEPTH_STALE_SECONDS,
+                 backoff_base=WATCHDOG_BACKOFF_BASE, backoff_max=WATCHDOG_BACKOFF_MAX):
+        """ ✅ 스트림별 시퀀스 누락 / 정지 감시기
+
+        - 시퀀스 누락: Diff Depth (선물 pu == 직전 u, 현물 U == 직전 u + 1), aggTrade (a == 직전 a + 1)
+        - 정지: 마지막 메시지 이후 stale 시간 경과
+        - 정지 스트림만 재구독 (지수 백오프 + jitter), 호가 스트림은 재동기화 이벤트 발행 → 호가창 / 분석기 상태 재구성
+        """
+        self.manager = manager
+        self.order_books = order_books
+        self.check_interval = check_interval
+        self.stale_seconds = stale_seconds
+        self.depth_stale_seconds = depth_stale_seconds
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.states = {}
+        self.listeners = []
+        self.events = 0
+        self.running = False
+        self.thread = None
+
+    def add_listener(self, listener):
+        """ ✅ 감시 이벤트 소비자 등록 (listener(WatchdogEvent)) """
+        self.listeners.append(listener)
+
+    def _state(self, stream, now):
+        state = self.states.get(stream)
+        if state is None:
+            state = self.states[stream] = StreamState(now)
+        return state
+
+    def observe(self, stream, data):
+        """ ✅ 메시지 수신 기록 (스트림 관리자 수신 스레드에서 핸들러보다 먼저 호출) """
+        stream = normalize_stream(stream)  # check() 의 구독 목록과 같은 키 사용
+        now = time.monotonic()
+        state = self._state(stream, now)
+        state.last_message = now
+        state.attempts = 0
+        kind = sequence_kind(stream)
+        if kind is None or not isinstance(data, dict):
+            return
+
+        if kind == "depth":
+            last = state.last_id
+            if last is not None:
+                if "pu" in data:
+                    gap = data["pu"] != last
+                else:
+                    gap = data["U"] != last + 1
+                if gap:
+                    self._gap(stream, f"Diff 시퀀스 누락 (직전 u={last}, U={data['U']})")
+            state.last_id = data["u"]
+        else:
+            trade_id = data["a"]
+            if state.last_id is not None and trade_id != state.last_id + 1:
+                self._gap(stream, f"aggTrade 시퀀스 누락 (직전 a={state.last_id}, a={trade_id})")
+            state.last_id = trade_id
+
+    def _gap(self, stream, detail):
+        self.states[stream].gaps += 1
+        self._emit(stream, "gap", detail)
+        self._resync(stream, detail)
+
+    def _resync(self, stream, reason):
+        """ ✅ Diff Depth 스트림이면 해당 코인 호가창 재동기화 (분석기에 재동기화 이벤트 전달) """
+        if sequence_kind(stream) == "depth" and self.order_books is not None:
+            self.order_books.resync(stream.split("@", 1)[0], reason)
+
+    def _emit(self, stream, kind, detail):
+        self.events += 1
+        logging.warning(f"⚠️ [스트림 감시] {stream} {kind} - {detail}")
+        event = WatchdogEvent(stream, kind, detail, time.time())
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logging.error(f"🚨 [스트림 감시] 이벤트 처리 실패: {e}")
+
+    def stale_after(self, stream):
+        return self.depth_stale_seconds if "@depth" in stream else self.stale_seconds
+
+    def check(self, now=None):
+        """ ✅ 정지 스트림 탐지 → 백오프 시간이 지난 스트림만 모아 재구독 (재구독 스트림 목록 반환) """
+        now = now or time.monotonic()
+        stale = []
+        for stream in map(normalize_stream, list(self.manager.streams)):
+            state = self._state(stream, now)
+            age = now - state.last_message
+            if age < self.stale_after(stream) or now < state.next_retry:
+                continue
+            state.stale += 1
+            delay = min(self.backoff_base * 2 ** state.attempts, self.backoff_max)
+            state.next_retry = now + delay * random.uniform(1.0, 1.5)  # jitter: 동시 재구독 분산
+            state.attempts += 1
+            state.last_id = None  # 재구독 후 첫 메시지부터 다시 연결
+            self._emit(stream, "stale", f"{age:.1f}초 동안 메시지 없음 (재구독 {state.attempts}회차)")
+            stale.append(stream)
+
+        if stale:
+            self.manager.resubscribe(stale)
+            for stream in stale:
+                self._emit(stream, "resubscribe", "재구독 요청")
+                self._resync(stream, "스트림 정지 후 재구독")
+        return stale
+
+    def _run(self):
+        while self.running:
+            try:
+                self.check()
+            except Exception as e:
+                logging.error(f"🚨 [스트림 감시] 검사 실패: {e}")
+            time.sleep(self.check_interval)
+
+    def start(self):
+        """ ✅ 백그라운드 정지 검사 시작 """
+        if self.running:
+            return
+        self.running = True
+        now = time.monotonic()
+        for state in self.states.values():
+            state.last_message = now  # 연결 전 대기 시간은 정지로 보지 않음
+        self.thread = threading.Thread(target=self._run, name="stream-watchdog")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        """ ✅ 스트림별 누락 / 정지 횟수, 마지막 메시지 경과 시간 """
+        now = time.monotonic()
+        return {stream: {"gaps": state.gaps, "stale": state.stale, "age": now - state.last_message}
+                for stream, state in list(self.states.items())}
+
+# ✅ 사용 예시 (정지 / 누락 이벤트 출력, 호가 스트림은 자동 재동기화)
+if __name__ == "__main__":
+    from data_collection.stream_manager import CombinedStreamManager
+
+    manager = CombinedStreamManager()
+    shared_order_books.subscribe(manager, "BTCUSDT", resync_listener=lambda symbol, reason: print(f"🔄 {symbol} 재동기화: {reason}"))
+    manager.watchdog.add_listener(print)
+    manager.start(block=True)
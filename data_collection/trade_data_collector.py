@@ -1,16 +1,14 @@
-import websocket
-import json
 import os
-import logging
 import pandas as pd
-import mysql.connector
-import psycopg2
-import time
-from pymongo import MongoClient
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from collections import deque
-import requests
+from data_collection.market_data_bus import shared_market_bus
+from data_collection.message_decoder import decode_trade
+from data_collection.trade_ring_buffer import shared_trade_history
+from storage.batch_sink import BatchSink
+from storage.db_pool import shared_db_pool
+from data_collection.stream_manager import CombinedStreamManager
+from notification.alert_dispatcher import shared_alert_dispatcher
 
 # ✅ 환경 변수 로드
 load_dotenv()
@@ -26,66 +24,55 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
 class TradeDataCollector:
-    def __init__(self, large_order_threshold=50, tick_rate_threshold=100):
+    def __init__(self, large_order_threshold=50, tick_rate_threshold=100, trade_history=None):
         """ ✅ 다중 코인 실시간 체결 데이터 수집 클래스 """
         self.symbols = [coin.strip().lower() for coin in SELECTED_COINS]
-        self.ws_urls = {symbol: f"{BINANCE_WS_URL}{symbol}@trade" for symbol in self.symbols}
         self.large_order_threshold = large_order_threshold  # 대량 체결 감지 기준 (50 BTC 이상)
         self.tick_rate_threshold = tick_rate_threshold  # 체결 속도 감지 기준 (100건/초 이상)
-        self.trade_data = {symbol: deque(maxlen=100) for symbol in self.symbols}
+        self.trade_data = trade_history or shared_trade_history  # 코인별 체결 링 버퍼 (전략 모듈과 공유)
         self.tick_count = {symbol: 0 for symbol in self.symbols}
         self.start_times = {symbol: datetime.utcnow() for symbol in self.symbols}
 
-        # ✅ 데이터베이스 설정
+        # ✅ 데이터베이스 설정 (Write-behind 배치 저장)
+        self.collection = None
         if USE_MONGO:
-            self.mongo_client = MongoClient(MONGO_URL)
+            self.mongo_client = shared_db_pool.mongo(MONGO_URL)
             self.db = self.mongo_client[MONGO_DB]
             self.collection = self.db[MONGO_COLLECTION]
 
-        if USE_MYSQL:
-            self.mysql_conn = mysql.connector.connect(
-                host=os.getenv("MYSQL_HOST"),
-                user=os.getenv("MYSQL_USER"),
-                password=os.getenv("MYSQL_PASSWORD"),
-                database=os.getenv("MYSQL_DATABASE")
-            )
-            self.mysql_cursor = self.mysql_conn.cursor()
-
-        if USE_POSTGRES:
-            self.postgres_conn = psycopg2.connect(
-                host=os.getenv("POSTGRES_HOST"),
-                user=os.getenv("POSTGRES_USER"),
-                password=os.getenv("POSTGRES_PASSWORD"),
-                database=os.getenv("POSTGRES_DATABASE")
-            )
-            self.postgres_cursor = self.postgres_conn.cursor()
-
-    def process_trade(self, data, symbol):
-        """ ✅ 실시간 체결 데이터 처리 및 저장 """
-        timestamp = datetime.utcfromtimestamp(data["T"] / 1000)
-        price = float(data["p"])
-        quantity = float(data["q"])
-        is_buyer_maker = data["m"]
+        self.sink = BatchSink("trade_data", ["timestamp", "symbol", "price", "quantity", "is_buyer_maker"],
+                              mongo_collection=self.collection)
+
+    def process_trade(self, data, symbol=None):
+        """ ✅ 실시간 체결 메시지 처리 (원본 메시지 직접 입력 시) """
+        self.on_trade(decode_trade(data))
+
+    def on_trade(self, record):
+        """ ✅ 시장 데이터 버스 체결 레코드 처리 및 저장 """
+        symbol = record.symbol.lower()
+        timestamp = datetime.utcfromtimestamp(record.trade_time / 1000)
+        price = record.price
+        quantity = record.quantity
 
         trade = {
             "timestamp": timestamp,
-            "symbol": symbol.upper(),
+            "symbol": record.symbol,
             "price": price,
             "quantity": quantity,
-            "is_buyer_maker": is_buyer_maker
+            "is_buyer_maker": record.is_buyer_maker
         }
 
-        self.trade_data[symbol].append(trade)
+        self.trade_data.on_trade(record)
 
         # ✅ 대량 체결 감지
         if quantity >= self.large_order_threshold:
-            self.send_telegram_alert(f"🚨 [대량 체결] {symbol} {quantity}개 체결 (가격: {price})")
+            self.send_telegram_alert(f"🚨 [대량 체결] {symbol} {quantity}개 체결 (가격: {price})", key=f"large_trade:{symbol}")
 
         # ✅ 체결 속도 감지
         self.tick_count[symbol] += 1
         if (datetime.utcnow() - self.start_times[symbol]).total_seconds() >= 1:
             if self.tick_count[symbol] > self.tick_rate_threshold:
-                self.send_telegram_alert(f"⚡ [체결 속도 급증] {symbol} {self.tick_count[symbol]}건/초")
+                self.send_telegram_alert(f"⚡ [체결 속도 급증] {symbol} {self.tick_count[symbol]}건/초", key=f"tick_rate:{symbol}")
             self.tick_count[symbol] = 0
             self.start_times[symbol] = datetime.utcnow()
 
@@ -93,54 +80,27 @@ class TradeDataCollector:
         self.store_data(trade)
 
     def store_data(self, trade):
-        """ ✅ 데이터 저장 (MongoDB, MySQL, PostgreSQL) """
-        if USE_MONGO:
-            self.collection.insert_one(trade)
-
-        if USE_MYSQL:
-            sql = "INSERT INTO trade_data (timestamp, symbol, price, quantity, is_buyer_maker) VALUES (%s, %s, %s, %s, %s)"
-            self.mysql_cursor.execute(sql, (
-                trade["timestamp"], trade["symbol"], trade["price"],
-                trade["quantity"], trade["is_buyer_maker"]
-            ))
-            self.mysql_conn.commit()
-
-        if USE_POSTGRES:
-            sql = "INSERT INTO trade_data (timestamp, symbol, price, quantity, is_buyer_maker) VALUES (%s, %s, %s, %s, %s)"
-            self.postgres_cursor.execute(sql, (
-                trade["timestamp"], trade["symbol"], trade["price"],
-                trade["quantity"], trade["is_buyer_maker"]
-            ))
-            self.postgres_conn.commit()
-
-    def send_telegram_alert(self, message):
+        """ ✅ 데이터 저장 (MongoDB, MySQL, PostgreSQL - 백그라운드 배치 저장) """
+        self.sink.put(trade)
+
+    def send_telegram_alert(self, message, key=None):
         """ ✅ Telegram 알림 전송 """
         if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-            payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-            requests.post(url, data=payload)
-
-    def on_message(self, ws, message, symbol):
-        """ ✅ WebSocket 메시지 처리 """
-        data = json.loads(message)
-        self.process_trade(data, symbol)
-
-    def on_error(self, ws, error):
-        logging.error(f"🚨 WebSocket 오류 발생: {error}")
-
-    def on_close(self, ws, close_status_code, close_msg):
-        logging.warning("⚠️ WebSocket 연결 종료! 5초 후 재연결...")
-        time.sleep(5)
-        self.start_websocket()
-
-    def start_websocket(self):
-        """ ✅ 다중 WebSocket 실행 (각 코인별 실시간 체결 데이터 수집) """
-        for symbol, ws_url in self.ws_urls.items():
-            ws = websocket.WebSocketApp(ws_url,
-                                        on_message=lambda ws, msg: self.on_message(ws, msg, symbol),
-                                        on_error=self.on_error,
-                                        on_close=self.on_close)
-            ws.run_forever()
+            shared_alert_dispatcher.send(message, key=key, chat_id=TELEGRAM_CHAT_ID, bot_token=TELEGRAM_BOT_TOKEN)
+
+    def register_streams(self, manager):
+        """ ✅ 공용 시장 데이터 버스에 코인별 체결 소비자로 등록 (체결 스트림은 코인당 1회만 구독) """
+        for symbol in self.symbols:
+            shared_market_bus.subscribe(manager, "trade", symbol, self.on_trade)
+
+    def start_websocket(self, manager=None):
+        """ ✅ Combined Stream 실행 (각 코인별 실시간 체결 데이터 수집) """
+        if manager is not None:
+            self.register_streams(manager)  # 공유 관리자에서 실행
+            return
+        manager = CombinedStreamManager()
+        self.register_streams(manager)
+        manager.start(block=True)
 
 # ✅ 사용 예시
 if __name__ == "__main__":
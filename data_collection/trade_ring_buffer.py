@@ -0,0 +1,135 @@
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# ✅ 환경 변수 로드
+load_dotenv()
+TRADE_BUFFER_CAPACITY = int(os.getenv("TRADE_BUFFER_CAPACITY", "100000"))  # 코인별 기본 보관 체결 수
+TRADE_BUFFER_CAPACITIES = os.getenv("TRADE_BUFFER_CAPACITIES", "")  # 코인별 개별 설정 (예: "BTCUSDT:500000,ETHUSDT:200000")
+
+# ✅ 체결 레코드 구조 (timestamp: ms, side: 1 = 시장가 매수, -1 = 시장가 매도)
+TRADE_DTYPE = np.dtype([
+    ("timestamp", np.int64),
+    ("price", np.float64),
+    ("qty", np.float64),
+    ("side", np.int8),
+    ("trade_id", np.int64),
+])
+
+
+class TradeRingBuffer:
+    def __init__(self, capacity=TRADE_BUFFER_CAPACITY):
+        """ ✅ 고정 용량 NumPy 구조화 배열 링 버퍼 (O(1) 추가, 복사 없는 최근 구간 view)
+
+        각 레코드를 i, i + capacity 두 위치에 기록(미러링)하므로 최근 N개는 항상 연속된 slice 입니다.
+        """
+        self.capacity = capacity
+        self.data = np.zeros(2 * capacity, dtype=TRADE_DTYPE)
+        self.total = 0  # 누적 추가 건수
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, timestamp, price, qty, side, trade_id=0):
+        """ ✅ 체결 1건 추가 (O(1)) """
+        i = self.total % self.capacity
+        row = (timestamp, price, qty, side, trade_id)
+        self.data[i] = row
+        self.data[i + self.capacity] = row
+        self.total += 1
+
+    def append_record(self, record):
+        """ ✅ TradeRecord 추가 (is_buyer_maker=True 이면 시장가 매도) """
+        self.append(record.trade_time, record.price, record.quantity, -1 if record.is_buyer_maker else 1, record.trade_id)
+
+    def last(self, n=None):
+        """ ✅ 최근 N개 체결 (복사 없는 view, 오래된 순) """
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = self.total % self.capacity + self.capacity
+        return self.data[end - n:end]
+
+    def since(self, start_ms):
+        """ ✅ start_ms 이후 체결 (복사 없는 view, 체결 시각 오름차순 가정) """
+        view = self.last()
+        return view[np.searchsorted(view["timestamp"], start_ms, side="left"):]
+
+    def window(self, seconds, now_ms=None):
+        """ ✅ 최근 N초 체결 (복사 없는 view) """
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        return self.since(now_ms - int(seconds * 1000))
+
+    def to_dataframe(self, n=None):
+        """ ✅ 최근 N개 체결 DataFrame 변환 (필요할 때만 복사) """
+        df = pd.DataFrame(self.last(n))
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+        return df
+
+
+def trade_stats(view):
+    """ ✅ 체결 구간 벡터화 집계 (건수, 거래량, 매수/매도 거래량, VWAP, 고가/저가) """
+    if len(view) == 0:
+        return {"count": 0, "volume": 0.0, "buy_volume": 0.0, "sell_volume": 0.0, "vwap": None, "high": None, "low": None}
+    price = view["price"]
+    qty = view["qty"]
+    buy = view["side"] > 0
+    volume = float(qty.sum())
+    buy_volume = float(qty[buy].sum())
+    return {
+        "count": len(view),
+        "volume": volume,
+        "buy_volume": buy_volume,
+        "sell_volume": volume - buy_volume,
+        "vwap": float(np.dot(price, qty) / volume) if volume else None,
+        "high": float(price.max()),
+        "low": float(price.min()),
+    }
+
+
+def parse_capacities(spec):
+    """ ✅ "BTCUSDT:500000,ETHUSDT:200000" → {"BTCUSDT": 500000, ...} """
+    capacities = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        symbol, capacity = item.split(":")
+        capacities[symbol.strip().upper()] = int(capacity)
+    return capacities
+
+
+class TradeHistoryStore:
+    def __init__(self, default_capacity=TRADE_BUFFER_CAPACITY, capacities=None):
+        """ ✅ 코인별 체결 링 버퍼 저장소 (코인별 메모리 상한 설정 가능) """
+        self.default_capacity = default_capacity
+        self.capacities = capacities if capacities is not None else parse_capacities(TRADE_BUFFER_CAPACITIES)
+        self.buffers = {}
+        self.lock = threading.Lock()
+
+    def get(self, symbol):
+        symbol = symbol.upper()
+        buffer = self.buffers.get(symbol)
+        if buffer is None:
+            with self.lock:
+                buffer = self.buffers.setdefault(
+                    symbol, TradeRingBuffer(self.capacities.get(symbol, self.default_capacity)))
+        return buffer
+
+    __getitem__ = get
+
+    def on_trade(self, record):
+        """ ✅ 시장 데이터 버스 소비자 (TradeRecord 추가) """
+        self.get(record.symbol).append_record(record)
+
+    def window(self, symbol, seconds, now_ms=None):
+        """ ✅ 코인별 최근 N초 체결 view """
+        return self.get(symbol).window(seconds, now_ms)
+
+    def stats(self, symbol, seconds, now_ms=None):
+        """ ✅ 코인별 최근 N초 체결 집계 """
+        return trade_stats(self.window(symbol, seconds, now_ms))
+
+
+# ✅ 프로세스 공용 체결 이력 저장소
+shared_trade_history = TradeHistoryStore()
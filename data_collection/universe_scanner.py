@@ -0,0 +1,180 @@
+import os
+import heapq
+import logging
+import threading
+from dotenv import load_dotenv
+from data_collection.stream_manager import CombinedStreamManager
+from select_coins import coin_score
+
+# ✅ 환경 변수 로드
+load_dotenv()
+UNIVERSE_TOP_N = int(os.getenv("UNIVERSE_TOP_N", "5"))  # 순위 변경 이벤트 기준 상위 코인 수
+UNIVERSE_QUOTE_ASSET = os.getenv("UNIVERSE_QUOTE_ASSET", "USDT")
+UNIVERSE_MIN_QUOTE_VOLUME = float(os.getenv("UNIVERSE_MIN_QUOTE_VOLUME", "0"))  # 순위 대상 최소 24시간 거래대금
+
+# ✅ 전 종목 스트림
+MINI_TICKER_STREAM = "!miniTicker@arr"  # 24시간 롤링 시세 (1초 주기, 변경 종목만)
+BOOK_TICKER_STREAM = "!bookTicker"  # 최우선 호가 (실시간)
+MARK_PRICE_STREAM = "!markPrice@arr"  # 마크 가격 + 펀딩비 (3초 주기)
+
+
+class UniverseScanner:
+    def __init__(self, top_n=UNIVERSE_TOP_N, quote_asset=UNIVERSE_QUOTE_ASSET, min_quote_volume=UNIVERSE_MIN_QUOTE_VOLUME):
+        """ ✅ 전 종목 스트림 기반 코인 점수 실시간 갱신 (힙 기반 상위 N 순위 + 순위 변경 이벤트) """
+        self.top_n = top_n
+        self.quote_asset = quote_asset
+        self.min_quote_volume = min_quote_volume
+        self.stats = {}  # 코인 → {"price_change", "volume", "spread", "funding_rate"}
+        self.scores = {}  # 코인 → 최신 점수
+        self.versions = {}  # 코인 → 점수 갱신 횟수 (힙의 오래된 항목 식별)
+        self.heap = []  # [(-점수, 코인, 버전)] - 갱신 시 새 항목 추가, 오래된 항목은 조회 시 제거
+        self.dirty = set()  # 점수 재계산 대상 코인
+        self.top = []  # 직전 상위 N 코인
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def _stats(self, symbol):
+        stats = self.stats.get(symbol)
+        if stats is None:
+            stats = self.stats[symbol] = {"price_change": 0.0, "volume": 0.0, "spread": 0.01, "funding_rate": 0.0}
+        return stats
+
+    def on_mini_tickers(self, data):
+        """ ✅ !miniTicker@arr - 24시간 변동률, 거래대금 갱신 후 순위 재계산 """
+        with self.lock:
+            for ticker in data:
+                symbol = ticker["s"]
+                if not symbol.endswith(self.quote_asset):
+                    continue
+                open_price = float(ticker["o"])
+                stats = self._stats(symbol)
+                stats["price_change"] = abs(float(ticker["c"]) - open_price) / open_price * 100 if open_price else 0.0
+                stats["volume"] = float(ticker["q"])
+                self.dirty.add(symbol)
+            changed = self._refresh()
+        if changed is not None:
+            self._notify(*changed)
+
+    def on_book_ticker(self, data):
+        """ ✅ !bookTicker - 스프레드만 갱신 (점수는 다음 순위 재계산 시 반영) """
+        symbol = data["s"]
+        if not symbol.endswith(self.quote_asset):
+            return
+        bid = float(data["b"])
+        if bid <= 0:
+            return
+        with self.lock:
+            self._stats(symbol)["spread"] = (float(data["a"]) - bid) / bid
+            self.dirty.add(symbol)
+
+    def on_mark_prices(self, data):
+        """ ✅ !markPrice@arr - 펀딩비 갱신 """
+        with self.lock:
+            for mark in data:
+                symbol = mark["s"]
+                if not symbol.endswith(self.quote_asset) or not mark.get("r"):
+                    continue
+                self._stats(symbol)["funding_rate"] = float(mark["r"])
+                self.dirty.add(symbol)
+
+    def _refresh(self):
+        """ ✅ 변경된 코인만 점수 재계산 후 힙에 추가 (상위 N 변경 시 (새 순위, 이전 순위) 반환) """
+        for symbol in self.dirty:
+            stats = self.stats[symbol]
+            if stats["volume"] < self.min_quote_volume:
+                self.scores.pop(symbol, None)
+                self.versions[symbol] = self.versions.get(symbol, 0) + 1
+                continue
+            score = coin_score(stats["price_change"], stats["volume"], stats["spread"], funding_rate=stats["funding_rate"])
+            self.scores[symbol] = score
+            self.versions[symbol] = version = self.versions.get(symbol, 0) + 1
+            heapq.heappush(self.heap, (-score, symbol, version))
+        self.dirty.clear()
+
+        if len(self.heap) > 4 * max(len(self.scores), 64):
+            self._compact()
+
+        top = self._top(self.top_n)
+        if top == self.top:
+            return None
+        previous, self.top = self.top, top
+        return top, previous
+
+    def _compact(self):
+        """ ✅ 오래된 힙 항목 제거 (코인당 최신 항목 1개만 유지) """
+        self.heap = [(-score, symbol, self.versions[symbol]) for symbol, score in self.scores.items()]
+        heapq.heapify(self.heap)
+
+    def _top(self, n):
+        """ ✅ 상위 n개 코인 (유효 항목만 꺼낸 뒤 다시 넣음, O(n log H)) """
+        taken = []
+        while self.heap and len(taken) < n:
+            entry = heapq.heappop(self.heap)
+            if self.versions.get(entry[1]) == entry[2] and entry[1] in self.scores:
+                taken.append(entry)
+        for entry in taken:
+            heapq.heappush(self.heap, entry)
+        return [symbol for _, symbol, _ in taken]
+
+    def _notify(self, top, previous):
+        event = {
+            "top": top,
+            "previous": previous,
+            "added": [symbol for symbol in top if symbol not in previous],
+            "removed": [symbol for symbol in previous if symbol not in top],
+        }
+        logging.info(f"🔄 [코인 순위 변경] {previous} → {top}")
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logging.error(f"🚨 코인 순위 변경 이벤트 처리 실패: {e}")
+
+    def add_listener(self, listener):
+        """ ✅ 상위 N 변경 이벤트 소비자 등록 (listener({"top", "previous", "added", "removed"})) """
+        self.listeners.append(listener)
+
+    def ranking(self, n=None):
+        """ ✅ 현재 순위 [(코인, 점수)] """
+        with self.lock:
+            return [(symbol, self.scores[symbol]) for symbol in self._top(n or self.top_n)]
+
+    def fetch_top_volatile_coins(self, top_n=5):
+        """ ✅ CoinSelector 호환 - 상위 N 코인 """
+        with self.lock:
+            return self._top(top_n)
+
+    def best(self):
+        """ ✅ 현재 1위 코인 (없으면 None) """
+        top = self.fetch_top_volatile_coins(top_n=1)
+        return top[0] if top else None
+
+    def should_switch_coin(self, current_coin):
+        """ ✅ CoinSelector 호환 - 매매 완료 후 코인 변경 여부 판단 (REST 조회 없음) """
+        top_coins = self.fetch_top_volatile_coins(top_n=self.top_n)
+        if not top_coins or current_coin in top_coins:
+            return current_coin  # 순위 수신 전이거나 상위권 유지
+        logging.info(f"🔄 [코인 교체] {current_coin} → {top_coins[0]}")
+        return top_coins[0]
+
+    def register_streams(self, manager):
+        """ ✅ 스트림 관리자에 전 종목 스트림 등록 """
+        manager.subscribe(MINI_TICKER_STREAM, self.on_mini_tickers)
+        manager.subscribe(BOOK_TICKER_STREAM, self.on_book_ticker)
+        manager.subscribe(MARK_PRICE_STREAM, self.on_mark_prices)
+
+    def start_websocket(self, manager=None, block=False):
+        """ ✅ Combined Stream 실행 (기본: 백그라운드 스레드) """
+        if manager is not None:
+            self.register_streams(manager)  # 공유 관리자에서 실행
+            return manager
+        manager = CombinedStreamManager()
+        self.register_streams(manager)
+        manager.start(block=block)
+        return manager
+
+# ✅ 사용 예시
+if __name__ == "__main__":
+    scanner = UniverseScanner()
+    scanner.add_listener(lambda event: print(f"🚀 [상위 코인] {event['top']} (+{event['added']} -{event['removed']})"))
+    scanner.start_websocket(block=True)
@@ -1,24 +1,18 @@
-import requests
-import json
-import pandas as pd
-import numpy as np
-import websocket
-import threading
-import time
-import mysql.connector
-import psycopg2
-from pymongo import MongoClient
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
-import matplotlib.pyplot as plt
-from collections import deque
 from dotenv import load_dotenv
+from data_collection.market_data_bus import shared_market_bus
+from data_collection.message_decoder import decode_trade
+from data_collection.rolling_window import RollingWindowEngine
+from storage.batch_sink import BatchSink
+from storage.db_pool import shared_db_pool
+from notification.alert_dispatcher import shared_alert_dispatcher
+from visualization.chart_renderer import shared_chart_renderer
 from coin_selector import SELECTED_COIN  # 📌 `coin_selector.py`에서 선택된 코인 가져오기
 
 # 환경 변수 로드 (.env에서 API 및 DB 설정 불러오기)
 load_dotenv()
 
-BINANCE_FUTURES_WS_URL = os.getenv("BINANCE_FUTURES_WS_URL", "wss://fstream.binance.com/ws/")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
@@ -26,10 +20,8 @@ class VWAPCalculator:
     def __init__(self, intervals=["1m", "5m", "15m"], large_order_threshold=50, save_db=True):
         self.symbol = SELECTED_COIN.lower()  # ✅ `coin_selector.py`에서 선택된 코인 적용
         self.intervals = intervals
-        self.ws_url = f"{BINANCE_FUTURES_WS_URL}{self.symbol}@trade"
-        self.trade_data = {interval: deque(maxlen=100) for interval in self.intervals}  # 최근 100개 데이터 저장
+        self.windows = RollingWindowEngine(self.intervals, history=100)  # 구간별 거래량 / 거래대금 누적 (최근 100개 종료 구간 보관)
         self.vwap_values = {interval: 0 for interval in self.intervals}
-        self.start_times = {interval: datetime.utcnow() for interval in self.intervals}
         self.large_order_threshold = large_order_threshold  # ✅ 대량 체결 감지 기준
         self.save_db = save_db
 
@@ -38,56 +30,37 @@ class VWAPCalculator:
         self.use_postgres = os.getenv("USE_POSTGRES") == "True"
         self.use_mongo = os.getenv("USE_MONGO") == "True"
 
-        if self.use_mysql:
-            self.mysql_conn = mysql.connector.connect(
-                host=os.getenv("MYSQL_HOST"),
-                user=os.getenv("MYSQL_USER"),
-                password=os.getenv("MYSQL_PASSWORD"),
-                database=os.getenv("MYSQL_DATABASE")
-            )
-            self.mysql_cursor = self.mysql_conn.cursor()
-
-        if self.use_postgres:
-            self.postgres_conn = psycopg2.connect(
-                host=os.getenv("POSTGRES_HOST"),
-                user=os.getenv("POSTGRES_USER"),
-                password=os.getenv("POSTGRES_PASSWORD"),
-                database=os.getenv("POSTGRES_DATABASE")
-            )
-            self.postgres_cursor = self.postgres_conn.cursor()
-
+        self.mongo_collection = None
         if self.use_mongo:
-            self.mongo_client = MongoClient(os.getenv("MONGO_URI"))
+            self.mongo_client = shared_db_pool.mongo(os.getenv("MONGO_URI"))
             self.mongo_db = self.mongo_client[os.getenv("MONGO_DATABASE")]
             self.mongo_collection = self.mongo_db["vwap_data"]
 
-        # ✅ 차트 설정 (OBS 실시간 시각화 지원)
-        plt.ion()
-        self.fig, self.ax = plt.subplots(figsize=(10, 5))
-
-    def process_trade(self, data):
-        """ 실시간 체결 데이터를 기반으로 VWAP 분석 """
-        timestamp = datetime.utcfromtimestamp(data["T"] / 1000)
-        price = float(data["p"])
-        quantity = float(data["q"])
+        # ✅ Write-behind 배치 저장
+        self.sink = BatchSink("vwap_data", ["timestamp", "symbol", "price", "quantity"], mongo_collection=self.mongo_collection,
+                              use_mysql=self.use_mysql, use_postgres=self.use_postgres, use_mongo=self.use_mongo)
 
-        for interval in self.intervals:
-            if timestamp >= self.start_times[interval] + timedelta(minutes=int(interval[:-1])):
-                self.start_times[interval] = timestamp
-                self.trade_data[interval].clear()
+        # ✅ 차트 등록 (OBS 실시간 시각화 지원, 렌더링 스레드에서 고정 FPS로 출력)
+        self.chart = shared_chart_renderer.register(
+            f"vwap_{self.symbol.lower()}", self.chart_snapshot,
+            title=f"VWAP Analysis ({self.symbol.upper()})", xlabel="Time", ylabel="VWAP")
 
-            self.trade_data[interval].append((price, quantity))
+    def process_trade(self, data):
+        """ 실시간 체결 메시지 처리 (원본 메시지 직접 입력 시) """
+        self.on_trade(decode_trade(data))
 
-        self.detect_large_order(price, quantity)
+    def on_trade(self, record):
+        """ 시장 데이터 버스 체결 레코드를 기반으로 VWAP 분석 """
+        self.windows.on_trade(record)
+        self.detect_large_order(record.price, record.quantity)
         self.calculate_vwap()
         self.update_chart()
 
     def calculate_vwap(self):
-        """ VWAP(거래량 가중 평균 가격) 계산 """
+        """ VWAP(거래량 가중 평균 가격) 계산 (구간 누적 거래대금 / 거래량, O(1)) """
         for interval in self.intervals:
-            if self.trade_data[interval]:
-                total_volume = sum(q for _, q in self.trade_data[interval])
-                vwap = sum(p * q for p, q in self.trade_data[interval]) / total_volume
+            vwap = self.windows.window(interval).vwap
+            if vwap is not None:
                 self.vwap_values[interval] = vwap
                 print(f"📊 [VWAP 분석] {datetime.utcnow()} | {interval} | VWAP: {vwap:.2f}")
 
@@ -112,50 +85,37 @@ class VWAPCalculator:
                        f"🕒 시간: {log_entry['timestamp']}\n"
                        f"💰 가격: {log_entry['price']:.2f}\n"
                        f"📈 체결량: {log_entry['quantity']:.2f} BTC")
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-            payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-            requests.post(url, data=payload)
+            shared_alert_dispatcher.send(message, key=f"large_trade:{log_entry['symbol']}", chat_id=TELEGRAM_CHAT_ID,
+                                         bot_token=TELEGRAM_BOT_TOKEN)
 
     def save_to_db(self, log_entry):
         """ 대량 체결 데이터를 MySQL, PostgreSQL, MongoDB에 저장 """
         if not self.save_db:
             return
 
-        record = (log_entry["timestamp"], log_entry["symbol"], log_entry["price"], log_entry["quantity"])
-
-        if self.use_mysql:
-            query = "INSERT INTO vwap_data (timestamp, symbol, price, quantity) VALUES (%s, %s, %s, %s)"
-            self.mysql_cursor.execute(query, record)
-            self.mysql_conn.commit()
+        self.sink.put(log_entry)  # 백그라운드 배치 저장
 
-        if self.use_postgres:
-            query = "INSERT INTO vwap_data (timestamp, symbol, price, quantity) VALUES (%s, %s, %s, %s)"
-            self.postgres_cursor.execute(query, record)
-            self.postgres_conn.commit()
+    def update_chart(self):
+        """ VWAP 시각화 요청 (OBS 연동, 그리기는 렌더링 스레드에서 수행) """
+        self.chart.mark_dirty()
 
-        if self.use_mongo:
-            self.mongo_collection.insert_one(log_entry)
+    def chart_snapshot(self):
+        """ 차트 데이터 스냅샷 (렌더링 스레드에서 호출) """
+        series = {}
+        for interval in self.intervals:
+            vwaps = [stats.vwap for stats in list(self.windows.history(interval)) if stats.vwap is not None]
+            vwaps.append(self.vwap_values[interval])
+            series[f"{interval} VWAP"] = (None, vwaps)
+        return series
 
-    def update_chart(self):
-        """ VWAP을 실시간 시각화 (OBS 연동) """
-        self.ax.clear()
-        times = [i for i in range(len(self.vwap_values["1m"]))]
-        vwap_1m = list(self.vwap_values["1m"].values())
-        vwap_5m = list(self.vwap_values["5m"].values())
-        vwap_15m = list(self.vwap_values["15m"].values())
-
-        self.ax.plot(times, vwap_1m, label="1m VWAP", color="blue", marker="o")
-        self.ax.plot(times, vwap_5m, label="5m VWAP", color="green", marker="o")
-        self.ax.plot(times, vwap_15m, label="15m VWAP", color="red", marker="o")
-
-        self.ax.set_title(f"VWAP Analysis ({self.symbol.upper()})")
-        self.ax.legend()
-        plt.draw()
-        plt.pause(0.01)
+    def register_streams(self, manager):
+        """ ✅ 공용 시장 데이터 버스에 체결 소비자로 등록 (체결 스트림은 코인당 1회만 구독) """
+        shared_market_bus.subscribe(manager, "trade", self.symbol, self.on_trade)
 
 if __name__ == "__main__":
-    vwap_calculator = VWAPCalculator(save_db=True)
-    vwap_calculator.start_analysis()
+    from data_collection.stream_manager import CombinedStreamManager
 
-    time.sleep(30)
-    print("✅ VWAP 데이터 수집 종료")
+    manager = CombinedStreamManager()
+    vwap_calculator = VWAPCalculator(save_db=True)
+    vwap_calculator.register_streams(manager)
+    manager.start(block=True)
@@ -1,14 +1,14 @@
-import websocket
 import json
 import os
 import logging
-import threading
-import requests
-import mysql.connector
-import psycopg2
-from pymongo import MongoClient
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from functools import partial
+from data_collection.stream_manager import CombinedStreamManager
+from storage.batch_sink import BatchSink
+from storage.db_pool import shared_db_pool
+from storage.raw_capture import shared_market_capture
+from notification.alert_dispatcher import shared_alert_dispatcher
 
 # ✅ 환경 변수 로드
 load_dotenv()
@@ -22,90 +22,65 @@ USE_POSTGRES = os.getenv("USE_POSTGRES") == "True"
 USE_MONGO = os.getenv("USE_MONGO") == "True"
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+STORE_RAW_JSON = os.getenv("STORE_RAW_JSON") == "True"  # 원본 JSON DB 저장 (기본: 바이너리 캡처만 사용)
 
 class WebSocketListener:
-    def __init__(self, depth="100", reconnect_delay=5, ping_interval=30):
+    def __init__(self, depth="100", reconnect_delay=5, ping_interval=30, capture=shared_market_capture, store_json=STORE_RAW_JSON):
         """ ✅ 다중 코인 WebSocket 리스너 """
         self.symbols = [coin.strip().lower() for coin in SELECTED_COINS]
         self.depth = depth
         self.reconnect_delay = reconnect_delay
-        self.ws_urls = {symbol: f"{BINANCE_WS_BASE}{symbol}@depth{depth}@100ms" for symbol in self.symbols}
-        
-        # ✅ 데이터베이스 설정
-        if USE_MONGO:
-            self.mongo_client = MongoClient(MONGO_URL)
-            self.db = self.mongo_client[MONGO_DB]
-            self.collection = self.db[MONGO_COLLECTION]
+        self.ping_interval = ping_interval
+        self.streams = {symbol: f"{symbol}@depth{depth}@100ms" for symbol in self.symbols}
+        self.capture = capture  # ✅ 코인별 / 일별 바이너리 캡처 (체결 + Diff Depth, 메모리 맵 조회)
+        self.store_json = store_json
 
-        if USE_MYSQL:
-            self.mysql_conn = mysql.connector.connect(
-                host=os.getenv("MYSQL_HOST"),
-                user=os.getenv("MYSQL_USER"),
-                password=os.getenv("MYSQL_PASSWORD"),
-                database=os.getenv("MYSQL_DATABASE")
-            )
-            self.mysql_cursor = self.mysql_conn.cursor()
+        # ✅ 데이터베이스 설정 (원본 JSON 저장 사용 시 Write-behind 배치 저장)
+        self.collection = None
+        self.sink = None
+        if store_json:
+            if USE_MONGO:
+                self.mongo_client = shared_db_pool.mongo(MONGO_URL)
+                self.db = self.mongo_client[MONGO_DB]
+                self.collection = self.db[MONGO_COLLECTION]
 
-        if USE_POSTGRES:
-            self.postgres_conn = psycopg2.connect(
-                host=os.getenv("POSTGRES_HOST"),
-                user=os.getenv("POSTGRES_USER"),
-                password=os.getenv("POSTGRES_PASSWORD"),
-                database=os.getenv("POSTGRES_DATABASE")
-            )
-            self.postgres_cursor = self.postgres_conn.cursor()
+            self.sink = BatchSink("websocket_data", ["timestamp", "symbol", "data"],
+                                  mongo_collection=self.collection,
+                                  sql_row=lambda row: (row["timestamp"], row["symbol"], json.dumps(row["data"])))
 
     def process_data(self, data, symbol):
         """ ✅ WebSocket 데이터 처리 및 저장 """
-        timestamp = datetime.utcnow()
-        row = {"timestamp": timestamp, "symbol": symbol.upper(), "data": data}
+        # ✅ MongoDB, MySQL, PostgreSQL 저장 (원본 JSON 저장 사용 시 백그라운드 배치 저장)
+        if self.sink is not None:
+            timestamp = datetime.utcnow()
+            self.sink.put({"timestamp": timestamp, "symbol": symbol.upper(), "data": data})
+            logging.info(f"✅ [WebSocket 데이터 저장] {symbol.upper()} - {timestamp}")
 
-        # ✅ MongoDB 저장
-        if USE_MONGO:
-            self.collection.insert_one(row)
-
-        # ✅ MySQL 저장
-        if USE_MYSQL:
-            sql = "INSERT INTO websocket_data (timestamp, symbol, data) VALUES (%s, %s, %s)"
-            self.mysql_cursor.execute(sql, (timestamp, symbol.upper(), json.dumps(data)))
-            self.mysql_conn.commit()
-
-        # ✅ PostgreSQL 저장
-        if USE_POSTGRES:
-            sql = "INSERT INTO websocket_data (timestamp, symbol, data) VALUES (%s, %s, %s)"
-            self.postgres_cursor.execute(sql, (timestamp, symbol.upper(), json.dumps(data)))
-            self.postgres_conn.commit()
-
-        logging.info(f"✅ [WebSocket 데이터 저장] {symbol.upper()} - {timestamp}")
-
-    def on_message(self, ws, message, symbol):
-        """ ✅ WebSocket 메시지 처리 """
-        data = json.loads(message)
-        self.process_data(data, symbol)
-
-    def on_error(self, ws, error):
-        logging.error(f"🚨 WebSocket 오류 발생: {error}")
-
-    def on_close(self, ws, close_status_code, close_msg):
-        logging.warning("⚠️ WebSocket 연결 종료! 5초 후 재연결...")
-        time.sleep(self.reconnect_delay)
-        self.start_websocket()
-
-    def send_telegram_alert(self, message):
+    def send_telegram_alert(self, message, key=None):
         """ ✅ Telegram 알림 전송 """
         if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-            payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-            requests.post(url, data=payload)
+            shared_alert_dispatcher.send(message, key=key, chat_id=TELEGRAM_CHAT_ID, bot_token=TELEGRAM_BOT_TOKEN)
+
+    def register_streams(self, manager):
+        """ ✅ Combined Stream 관리자에 코인별 호가 스트림 + 원본 캡처(체결, Diff Depth) 등록
+
+        부분 호가(@depthN) 메시지는 Diff 가 아니므로 캡처하지 않습니다 (재생 / Parquet 변환은 Diff 로 적용).
+        """
+        if self.capture is not None:
+            self.capture.register_streams(manager, self.symbols)
+        if self.sink is None:
+            return  # 원본 JSON 저장을 사용하지 않으면 부분 호가 스트림 구독 불필요
+        for symbol, stream in self.streams.items():
+            manager.subscribe(stream, partial(self.process_data, symbol=symbol))
 
-    def start_websocket(self):
-        """ ✅ 다중 WebSocket 실행 (각 코인별 호가 데이터 수집) """
-        for symbol, ws_url in self.ws_urls.items():
-            ws = websocket.WebSocketApp(ws_url,
-                                        on_message=lambda ws, msg: self.on_message(ws, msg, symbol),
-                                        on_error=self.on_error,
-                                        on_close=self.on_close)
-            threading.Thread(target=ws.run_forever).start()
+    def start_websocket(self, manager=None):
+        """ ✅ Combined Stream 실행 (각 코인별 호가 데이터 수집) """
+        if manager is not None:
+            self.register_streams(manager)  # 공유 관리자에서 실행
+            return
+        manager = CombinedStreamManager(reconnect_delay=self.reconnect_delay, ping_interval=self.ping_interval)
+        self.register_streams(manager)
+        manager.start(block=True)
 
 # ✅ 사용 예시
 if __name__ == "__main__":
@@ -7,10 +7,9 @@ from ta.volatility import BollingerBands, AverageTrueRange
 from ta.volume import OnBalanceVolumeIndicator
 from sklearn.preprocessing import MinMaxScaler
 import os
-from pymongo import MongoClient
-import mysql.connector
-import psycopg2
 from dotenv import load_dotenv
+from storage.bulk_loader import BulkLoader
+from storage.db_pool import shared_db_pool
 
 # ✅ 환경 변수 로드
 load_dotenv()
@@ -21,6 +20,8 @@ SELECTED_COINS = os.getenv("SELECTED_COINS", "BTCUSDT,ETHUSDT,SOLUSDT").split(",
 USE_MYSQL = os.getenv("USE_MYSQL") == "True"
 USE_POSTGRES = os.getenv("USE_POSTGRES") == "True"
 USE_MONGO = os.getenv("USE_MONGO") == "True"
+FEATURE_COLUMNS = ["timestamp", "symbol", "price_mean", "price_median", "price_std", "price_max", "price_min",
+    "ATR", "BB_High", "BB_Low", "BB_Width", "RSI", "Momentum", "MACD", "MACD_Signal"]
 
 class FeatureEngineering:
     def __init__(self, df, symbol):
@@ -32,29 +33,14 @@ class FeatureEngineering:
         self.df = df.copy()
         self.symbol = symbol
 
-        # ✅ 데이터베이스 설정
+        # ✅ 데이터베이스 설정 (COPY / 다중 행 VALUES 대량 적재)
+        self.collection = None
         if USE_MONGO:
-            self.mongo_client = MongoClient(MONGO_URL)
+            self.mongo_client = shared_db_pool.mongo(MONGO_URL)
             self.db = self.mongo_client[MONGO_DB]
             self.collection = self.db[MONGO_COLLECTION]
 
-        if USE_MYSQL:
-            self.mysql_conn = mysql.connector.connect(
-                host=os.getenv("MYSQL_HOST"),
-                user=os.getenv("MYSQL_USER"),
-                password=os.getenv("MYSQL_PASSWORD"),
-                database=os.getenv("MYSQL_DATABASE")
-            )
-            self.mysql_cursor = self.mysql_conn.cursor()
-
-        if USE_POSTGRES:
-            self.postgres_conn = psycopg2.connect(
-                host=os.getenv("POSTGRES_HOST"),
-                user=os.getenv("POSTGRES_USER"),
-                password=os.getenv("POSTGRES_PASSWORD"),
-                database=os.getenv("POSTGRES_DATABASE")
-            )
-            self.postgres_cursor = self.postgres_conn.cursor()
+        self.loader = BulkLoader(use_mysql=USE_MYSQL, use_postgres=USE_POSTGRES, mongo_collection=self.collection)
 
     def add_basic_stats(self):
         """ 기본 통계 특성 추가 (평균, 중앙값, 표준편차 등) """
@@ -84,39 +70,9 @@ class FeatureEngineering:
         self.df["MACD_Signal"] = macd.macd_signal()
 
     def store_features(self):
-        """ 특성 저장 (MongoDB, MySQL, PostgreSQL) """
-        features = self.df.to_dict(orient="records")
-
-        if USE_MONGO:
-            self.collection.insert_many(features)
-
-        if USE_MYSQL:
-            sql = """
-            INSERT INTO feature_data (timestamp, symbol, price_mean, price_median, price_std, price_max, price_min, ATR, BB_High, BB_Low, BB_Width, RSI, Momentum, MACD, MACD_Signal) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            for feature in features:
-                self.mysql_cursor.execute(sql, (
-                    feature["timestamp"], feature["symbol"], feature["price_mean"], feature["price_median"],
-                    feature["price_std"], feature["price_max"], feature["price_min"], feature["ATR"], 
-                    feature["BB_High"], feature["BB_Low"], feature["BB_Width"], feature["RSI"], feature["Momentum"], 
-                    feature["MACD"], feature["MACD_Signal"]
-                ))
-            self.mysql_conn.commit()
-
-        if USE_POSTGRES:
-            sql = """
-            INSERT INTO feature_data (timestamp, symbol, price_mean, price_median, price_std, price_max, price_min, ATR, BB_High, BB_Low, BB_Width, RSI, Momentum, MACD, MACD_Signal) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            for feature in features:
-                self.postgres_cursor.execute(sql, (
-                    feature["timestamp"], feature["symbol"], feature["price_mean"], feature["price_median"],
-                    feature["price_std"], feature["price_max"], feature["price_min"], feature["ATR"], 
-                    feature["BB_High"], feature["BB_Low"], feature["BB_Width"], feature["RSI"], feature["Momentum"], 
-                    feature["MACD"], feature["MACD_Signal"]
-                ))
-            self.postgres_conn.commit()
+        """ 특성 저장 (MongoDB, MySQL, PostgreSQL - (symbol, timestamp) 기준 업서트) """
+        features = self.df.assign(symbol=self.symbol)
+        self.loader.load("feature_data", features, key_columns=["symbol", "timestamp"], columns=FEATURE_COLUMNS)
 
     def process(self):
         """ 특성 공학 프로세스 실행 """
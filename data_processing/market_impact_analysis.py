@@ -35,10 +35,10 @@ class MarketImpactAnalysis:
 
     def fetch_price_data(self):
         """
-        지정된 자산의 가격 데이터 수집 (최근 100개 캔들)
+        지정된 자산의 가격 데이터 수집 (최근 100개 캔들, Parquet 저장소 + 누락분만 증분 수집)
         """
         try:
-            df = self.price_collector.fetch_ohlcv(self.asset, self.interval, self.lookback)
+            df = self.price_collector.get_ohlcv(self.asset, self.interval, self.lookback)
             return self.compute_price_change(df)
         except Exception as e:
             print(f"❌ 가격 데이터 수집 실패: {e}")
@@ -1,10 +1,9 @@
 import numpy as np
 import pandas as pd
 import talib
-from pymongo import MongoClient
-import mysql.connector
-import psycopg2
 from dotenv import load_dotenv
+from storage.bulk_loader import BulkLoader
+from storage.db_pool import shared_db_pool
 import os
 
 # ✅ 환경 변수 로드
@@ -16,6 +15,8 @@ SELECTED_COINS = os.getenv("SELECTED_COINS", "BTCUSDT,ETHUSDT,SOLUSDT").split(",
 USE_MYSQL = os.getenv("USE_MYSQL") == "True"
 USE_POSTGRES = os.getenv("USE_POSTGRES") == "True"
 USE_MONGO = os.getenv("USE_MONGO") == "True"
+INDICATOR_COLUMNS = ["timestamp", "symbol", "SMA_20", "EMA_20", "VWAP", "ATR", "RSI", "MACD", "MACD_Signal",
+    "MACD_Hist", "Upper_BB", "Middle_BB", "Lower_BB", "OBV"]
 
 class TechnicalIndicators:
     def __init__(self, df, symbol):
@@ -27,29 +28,14 @@ class TechnicalIndicators:
         self.df = df.copy()
         self.symbol = symbol
 
-        # ✅ 데이터베이스 설정
+        # ✅ 데이터베이스 설정 (COPY / 다중 행 VALUES 대량 적재)
+        self.collection = None
         if USE_MONGO:
-            self.mongo_client = MongoClient(MONGO_URL)
+            self.mongo_client = shared_db_pool.mongo(MONGO_URL)
             self.db = self.mongo_client[MONGO_DB]
             self.collection = self.db[MONGO_COLLECTION]
 
-        if USE_MYSQL:
-            self.mysql_conn = mysql.connector.connect(
-                host=os.getenv("MYSQL_HOST"),
-                user=os.getenv("MYSQL_USER"),
-                password=os.getenv("MYSQL_PASSWORD"),
-                database=os.getenv("MYSQL_DATABASE")
-            )
-            self.mysql_cursor = self.mysql_conn.cursor()
-
-        if USE_POSTGRES:
-            self.postgres_conn = psycopg2.connect(
-                host=os.getenv("POSTGRES_HOST"),
-                user=os.getenv("POSTGRES_USER"),
-                password=os.getenv("POSTGRES_PASSWORD"),
-                database=os.getenv("POSTGRES_DATABASE")
-            )
-            self.postgres_cursor = self.postgres_conn.cursor()
+        self.loader = BulkLoader(use_mysql=USE_MYSQL, use_postgres=USE_POSTGRES, mongo_collection=self.collection)
 
     def calculate_sma(self, period=20):
         """ 단순 이동평균선 (SMA) 계산 """
@@ -88,37 +74,9 @@ class TechnicalIndicators:
         self.df["OBV"] = talib.OBV(self.df["close"], self.df["volume"])
 
     def store_features(self):
-        """ 특성 저장 (MongoDB, MySQL, PostgreSQL) """
-        features = self.df.to_dict(orient="records")
-
-        if USE_MONGO:
-            self.collection.insert_many(features)
-
-        if USE_MYSQL:
-            sql = """
-            INSERT INTO technical_indicators (timestamp, symbol, SMA_20, EMA_20, VWAP, ATR, RSI, MACD, MACD_Signal, MACD_Hist, Upper_BB, Middle_BB, Lower_BB, OBV) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            for feature in features:
-                self.mysql_cursor.execute(sql, (
-                    feature["timestamp"], feature["symbol"], feature["SMA_20"], feature["EMA_20"], feature["VWAP"], 
-                    feature["ATR"], feature["RSI"], feature["MACD"], feature["MACD_Signal"], feature["MACD_Hist"],
-                    feature["Upper_BB"], feature["Middle_BB"], feature["Lower_BB"], feature["OBV"]
-                ))
-            self.mysql_conn.commit()
-
-        if USE_POSTGRES:
-            sql = """
-            INSERT INTO technical_indicators (timestamp, symbol, SMA_20, EMA_20, VWAP, ATR, RSI, MACD, MACD_Signal, MACD_Hist, Upper_BB, Middle_BB, Lower_BB, OBV) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            for feature in features:
-                self.postgres_cursor.execute(sql, (
-                    feature["timestamp"], feature["symbol"], feature["SMA_20"], feature["EMA_20"], feature["VWAP"], 
-                    feature["ATR"], feature["RSI"], feature["MACD"], feature["MACD_Signal"], feature["MACD_Hist"],
-                    feature["Upper_BB"], feature["Middle_BB"], feature["Lower_BB"], feature["OBV"]
-                ))
-            self.postgres_conn.commit()
+        """ 특성 저장 (MongoDB, MySQL, PostgreSQL - (symbol, timestamp) 기준 업서트) """
+        features = self.df.assign(symbol=self.symbol)
+        self.loader.load("technical_indicators", features, key_columns=["symbol", "timestamp"], columns=INDICATOR_COLUMNS)
 
     def process(self):
         """ 기술적 지표 계산 및 저장 """
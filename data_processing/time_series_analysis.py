@@ -16,7 +16,7 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 from sklearn.preprocessing import MinMaxScaler
-from ohlcv_collector import OHLCVCollector  # OHLCV 데이터 수집 모듈
+from data_collection.ohlcv_collector import OHLCVCollector  # OHLCV 데이터 수집 모듈 (Parquet 저장소 조회)
 
 class TimeSeriesAnalysis:
     def __init__(self, asset="BTCUSDT", interval="1h", use_lstm=False):
@@ -34,7 +34,7 @@ class TimeSeriesAnalysis:
 
     def fetch_data(self, lookback=500):
         """
-        시계열 분석을 위한 데이터 수집
+        시계열 분석을 위한 데이터 수집 (Parquet 저장소 + 누락분만 증분 수집)
         """
         df = self.price_collector.get_ohlcv(self.asset, self.interval, lookback)
         df['returns'] = df['close'].pct_change()
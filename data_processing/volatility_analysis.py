@@ -14,7 +14,7 @@ import seaborn as sns
 from scipy.stats import kurtosis, skew
 from statsmodels.tsa.stattools import adfuller
 from arch import arch_model  # GARCH 모델
-from ohlcv_collector import OHLCVCollector  # 가격 데이터 수집 모듈
+from data_collection.ohlcv_collector import OHLCVCollector  # 가격 데이터 수집 모듈 (Parquet 저장소 조회)
 from total_trading_value import TradingVolumeAnalyzer  # 거래대금 분석 모듈
 from data_processing.total_trading_value import TotalTradingValue
 
@@ -32,7 +32,7 @@ class VolatilityAnalysis:
 
     def fetch_price_data(self, lookback=200):
         """
-        지정된 자산의 가격 데이터 수집 (최근 200개 캔들)
+        지정된 자산의 가격 데이터 수집 (최근 200개 캔들, Parquet 저장소 + 누락분만 증분 수집)
         """
         return self.price_collector.get_ohlcv(self.asset, self.interval, lookback)
 
@@ -3,12 +3,12 @@ import logging
 import os
 import pymysql
 import sqlite3
-import pymongo
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, String, Float, DateTime
+from sqlalchemy import Column, String, Float, DateTime
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+from storage.db_pool import shared_db_pool
 
 # ✅ 환경 변수 로드
 load_dotenv()
@@ -39,12 +39,12 @@ class TradeLogger:
         self.mongo_collection = os.getenv("MONGO_COLLECTION", "trade_logs")
 
         if self.storage_type == "MYSQL" or self.storage_type == "SQLITE":
-            self.engine = create_engine(self.db_url)
+            self.engine = shared_db_pool.sqlalchemy_engine(self.db_url)  # 프로세스 공용 엔진 (연결 풀 공유)
             Base.metadata.create_all(self.engine)
             self.Session = sessionmaker(bind=self.engine)
 
         elif self.storage_type == "MONGODB":
-            self.mongo_client = pymongo.MongoClient(self.mongo_url)
+            self.mongo_client = shared_db_pool.mongo(self.mongo_url)
             self.mongo_database = self.mongo_client[self.mongo_db]
             self.mongo_collection = self.mongo_database[self.mongo_collection]
 
@@ -0,0 +1,272 @@
+# 📌 수집 경로 지연 / 처리량 계측
+# 스트림별 거래소 이벤트 시각(E/T) → 수신 → 디코딩 → 핸들러 완료 구간을 HDR 방식 히스토그램으로 집계
+# msgs/s, bytes/s, 대기열 길이, 핸들러 처리 시간 백분위를 프로세스 내부 / HTTP 엔드포인트로 제공
+
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+
+# ✅ 환경 변수 로드
+load_dotenv()
+STREAM_METRICS = os.getenv("STREAM_METRICS", "True") == "True"  # 수집 경로 계측 사용 여부
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # HTTP 지표 엔드포인트 포트 (0 = 비활성화)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_WINDOW = float(os.getenv("METRICS_WINDOW", "60"))  # 처리량 / 백분위 집계 구간 (초, 직전 구간과 합산해 보고)
+
+HISTOGRAM_SUB_BITS = 7  # 구간당 128개 하위 bucket → 상대 오차 1% 이내
+HISTOGRAM_MAX_US = 3_600_000_000  # 최대 기록 값 (1시간, 초과 값은 최대 bucket 에 기록)
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    def __init__(self, sub_bits=HISTOGRAM_SUB_BITS, max_value=HISTOGRAM_MAX_US):
+        """ ✅ HDR 방식 로그-선형 히스토그램 (µs 정수 값, 기록 O(1), 상대 오차 2^-(sub_bits-1) 이내) """
+        self.sub_bits = sub_bits
+        self.sub_count = 1 << sub_bits
+        self.half = self.sub_count >> 1
+        self.max_value = max_value
+        self.counts = [0] * (self.index(max_value) + 1)
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def index(self, value):
+        if value < self.sub_count:
+            return value
+        shift = value.bit_length() - self.sub_bits
+        return self.sub_count + (shift - 1) * self.half + (value >> shift) - self.half
+
+    def value_at(self, index):
+        """ ✅ bucket 대표 값 (구간 중앙) """
+        if index < self.sub_count:
+            return index
+        shift = (index - self.sub_count) // self.half + 1
+        base = ((index - self.sub_count) % self.half + self.half) << shift
+        return base + (1 << (shift - 1))
+
+    def record(self, value_us):
+        value = min(max(int(value_us), 0), self.max_value)
+        self.counts[self.index(value)] += 1
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentiles(self, percentiles=PERCENTILES):
+        """ ✅ 백분위 값 {p: µs} (누적합 1회) """
+        if self.total == 0:
+            return {p: None for p in percentiles}
+        cumulative = np.cumsum(self.counts)
+        ranks = np.ceil(np.asarray(percentiles) / 100 * self.total)
+        indexes = np.searchsorted(cumulative, np.maximum(ranks, 1))
+        return {p: min(self.value_at(int(i)), self.max) for p, i in zip(percentiles, indexes)}
+
+    def summary(self):
+        """ ✅ 건수, 평균, 최대, 백분위 (ms) """
+        percentiles = self.percentiles()
+        return {
+            "count": self.total,
+            "mean_ms": self.sum / self.total / 1000 if self.total else None,
+            "max_ms": self.max / 1000 if self.total else None,
+            **{f"p{p:g}_ms": (value / 1000 if value is not None else None) for p, value in percentiles.items()},
+        }
+
+
+class StreamStats:
+    def __init__(self):
+        """ ✅ 스트림 1개 지표 (현재 / 직전 집계 구간) """
+        self.stages = defaultdict(LatencyHistogram)  # 구간 이름 → 히스토그램
+        self.previous = {}
+        self.messages = 0
+        self.bytes = 0
+        self.previous_counts = (0, 0)
+        self.total_messages = 0
+        self.total_bytes = 0
+
+
+class StreamMetrics:
+    def __init__(self, enabled=STREAM_METRICS, window=METRICS_WINDOW):
+        """ ✅ 스트림별 지연 / 처리량 집계기
+
+        구간 (stage):
+        - exchange_lag: 거래소 이벤트 시각(E/T) → 수신
+        - parse / decode: JSON 파싱, 레코드 변환
+        - queue: 수신 → 처리 시작 대기 (asyncio 엔진)
+        - handler: 핸들러 처리 시간
+        - end_to_end: 거래소 이벤트 시각 → 핸들러 완료
+        """
+        self.enabled = enabled
+        self.window = window
+        self.streams = defaultdict(StreamStats)
+        self.gauges = {}  # 이름 → 대기열 길이 등 현재 값 함수
+        self.window_start = time.time()
+        self.previous_window = 0.0
+        self.lock = threading.Lock()
+        self.server = None
+
+    def _rotate(self, now):
+        """ ✅ 집계 구간 교체 (직전 구간 보관, 현재 구간 초기화) """
+        with self.lock:
+            if now - self.window_start < self.window:
+                return
+            for stats in list(self.streams.values()):
+                stats.previous = stats.stages
+                stats.stages = defaultdict(LatencyHistogram)
+                stats.previous_counts = (stats.messages, stats.bytes)
+                stats.messages = 0
+                stats.bytes = 0
+            self.previous_window = now - self.window_start
+            self.window_start = now
+
+    def received(self, stream, size, data=None, received_at=None):
+        """ ✅ 메시지 수신 기록 (건수, 바이트, 거래소 이벤트 시각 → 수신 지연) """
+        if not self.enabled:
+            return
+        now = received_at or time.time()
+        if now - self.window_start >= self.window:
+            self._rotate(now)
+        stats = self.streams[stream]
+        stats.messages += 1
+        stats.bytes += size
+        stats.total_messages += 1
+        stats.total_bytes += size
+        event_time = event_time_ms(data)
+        if event_time is not None:
+            stats.stages["exchange_lag"].record((now * 1000 - event_time) * 1000)
+
+    def observe(self, stream, stage, seconds):
+        """ ✅ 구간 소요 시간 기록 (초) """
+        if self.enabled:
+            self.streams[stream].stages[stage].record(seconds * 1_000_000)
+
+    def handled(self, stream, data, handler_seconds, done_at=None):
+        """ ✅ 핸들러 완료 기록 (핸들러 시간 + 거래소 이벤트 시각 → 완료 지연) """
+        if not self.enabled:
+            return
+        stages = self.streams[stream].stages
+        stages["handler"].record(handler_seconds * 1_000_000)
+        event_time = event_time_ms(data)
+        if event_time is not None:
+            stages["end_to_end"].record(((done_at or time.time()) * 1000 - event_time) * 1000)
+
+    def gauge(self, name, getter):
+        """ ✅ 현재 값 지표 등록 (예: 대기열 길이 → queue.qsize) """
+        self.gauges[name] = getter
+
+    def snapshot(self):
+        """ ✅ 전체 지표 (스트림별 msgs/s, bytes/s, 구간별 백분위 + 현재 값 지표) """
+        now = time.time()
+        self._rotate(now)
+        elapsed = max(now - self.window_start + self.previous_window, 1e-9)
+        streams = {}
+        with self.lock:
+            items = list(self.streams.items())
+        for stream, stats in items:
+            stages = {}
+            current, previous = dict(stats.stages), dict(stats.previous)  # 수집 스레드 갱신 중 복사
+            for stage in set(current) | set(previous):
+                histogram = LatencyHistogram()
+                for source in (previous.get(stage), current.get(stage)):
+                    if source is not None:
+                        histogram.merge(source)
+                stages[stage] = histogram.summary()
+            messages = stats.messages + stats.previous_counts[0]
+            streams[stream] = {
+                "msgs_per_sec": messages / elapsed,
+                "bytes_per_sec": (stats.bytes + stats.previous_counts[1]) / elapsed,
+                "total_messages": stats.total_messages,
+                "total_bytes": stats.total_bytes,
+                "stages": stages,
+            }
+        gauges = {}
+        for name, getter in list(self.gauges.items()):
+            try:
+                gauges[name] = getter()
+            except Exception as e:
+                gauges[name] = None
+                logging.warning(f"⚠️ [지표] {name} 조회 실패: {e}")
+        return {"timestamp": now, "window_sec": elapsed, "streams": streams, "gauges": gauges}
+
+    def prometheus(self):
+        """ ✅ Prometheus 텍스트 형식 """
+        snapshot = self.snapshot()
+        lines = []
+        for stream, stats in snapshot["streams"].items():
+            labels = f'stream="{stream}"'
+            lines.append(f"stream_messages_per_second{{{labels}}} {stats['msgs_per_sec']:.3f}")
+            lines.append(f"stream_bytes_per_second{{{labels}}} {stats['bytes_per_sec']:.3f}")
+            lines.append(f"stream_messages_total{{{labels}}} {stats['total_messages']}")
+            for stage, summary in stats["stages"].items():
+                for key, value in summary.items():
+                    if key.startswith("p") and value is not None:
+                        quantile = float(key[1:-3]) / 100
+                        lines.append(f'stream_latency_ms{{{labels},stage="{stage}",quantile="{quantile:g}"}} {value:.3f}')
+        for name, value in snapshot["gauges"].items():
+            if isinstance(value, (int, float)):
+                lines.append(f'stream_gauge{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=METRICS_PORT, host=METRICS_HOST):
+        """ ✅ HTTP 지표 엔드포인트 실행 (/metrics: Prometheus, /metrics.json: JSON, port 0 이면 실행 안 함) """
+        if self.server is not None or not port:
+            return self.server
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body, content_type = json.dumps(metrics.snapshot(), default=float).encode(), "application/json"
+                elif self.path.startswith("/metrics"):
+                    body, content_type = metrics.prometheus().encode(), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 요청 로그 생략
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=self.server.serve_forever, name="metrics-http")
+        thread.daemon = True
+        thread.start()
+        logging.info(f"✅ [지표] HTTP 엔드포인트 시작 http://{host}:{port}/metrics")
+        return self.server
+
+
+def event_time_ms(data):
+    """ ✅ 거래소 이벤트 시각 (E, 없으면 T) """
+    if not isinstance(data, dict):
+        return None
+    return data.get("E") or data.get("T")
+
+
+# ✅ 프로세스 공용 스트림 지표
+shared_stream_metrics = StreamMetrics()
+
+# ✅ 사용 예시 (수집 실행 중 http://127.0.0.1:9108/metrics 조회)
+if __name__ == "__main__":
+    from data_collection.stream_manager import CombinedStreamManager
+    from data_collection.local_order_book import shared_order_books
+
+    shared_stream_metrics.serve(port=METRICS_PORT or 9108)
+    manager = CombinedStreamManager()
+    shared_order_books.subscribe(manager, "BTCUSDT")
+    manager.start(block=True)
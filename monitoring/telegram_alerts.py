@@ -3,8 +3,8 @@
 # API 장애 감지 시 알림 전송
 # 텔레그램 봇을 사용하여 자동 메시지 전송
 
-import requests
 import logging
+from notification.alert_dispatcher import shared_alert_dispatcher
 
 class TelegramAlerts:
     def __init__(self, bot_token: str, chat_id: str):
@@ -14,16 +14,11 @@ class TelegramAlerts:
         logging.basicConfig(level=logging.INFO)
 
     def send_alert(self, message: str):
-        """ 텔레그램으로 알림 전송 """
-        payload = {
-            "chat_id": self.chat_id,
-            "text": message
-        }
-        response = requests.post(self.api_url, json=payload)
-        if response.status_code == 200:
-            logging.info(f"📢 Telegram Alert Sent: {message}")
+        """ 텔레그램으로 알림 전송 (공용 알림 발송기 대기열에 적재, 동일 알림 병합 + 요청 제한) """
+        if shared_alert_dispatcher.send(message, chat_id=self.chat_id, bot_token=self.bot_token):
+            logging.info(f"📢 Telegram Alert Queued: {message}")
         else:
-            logging.warning(f"🚨 Telegram Alert Failed: {response.text}")
+            logging.warning(f"🚨 Telegram Alert Dropped: {message}")
 
 if __name__ == "__main__":
     bot_token = "YOUR_TELEGRAM_BOT_TOKEN"
@@ -0,0 +1,268 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+import requests
+from collections import deque
+from dotenv import load_dotenv
+
+# ✅ 환경 변수 로드
+load_dotenv()
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "1000"))  # 수신 대기열 / 채팅별 발송 대기열 최대 알림 수
+ALERT_COALESCE_WINDOW = float(os.getenv("ALERT_COALESCE_WINDOW", "2.0"))  # 동일 알림 병합 구간 (초)
+ALERT_CHAT_RATE = float(os.getenv("ALERT_CHAT_RATE", "1.0"))  # 채팅별 초당 발송 수 (Telegram 채팅당 약 1건/초)
+ALERT_CHAT_BURST = float(os.getenv("ALERT_CHAT_BURST", "3"))  # 채팅별 순간 최대 발송 수
+ALERT_GLOBAL_RATE = float(os.getenv("ALERT_GLOBAL_RATE", "25"))  # 봇 전체 초당 발송 수 (Telegram 약 30건/초)
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        """ ✅ 토큰 버킷 (초당 rate 개 충전, 최대 capacity 개) """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now=None):
+        now = now or time.monotonic()
+        self._refill(now)
+        if now < self.paused_until or self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def wait_time(self, now=None):
+        """ ✅ 다음 토큰까지 남은 시간 (초) """
+        now = now or time.monotonic()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class AlertDispatcher:
+    def __init__(self, bot_token=TELEGRAM_BOT_TOKEN, chat_id=TELEGRAM_CHAT_ID, queue_size=ALERT_QUEUE_SIZE,
+                 coalesce_window=ALERT_COALESCE_WINDOW, chat_rate=ALERT_CHAT_RATE, chat_burst=ALERT_CHAT_BURST,
+                 global_rate=ALERT_GLOBAL_RATE):
+        """ ✅ 비동기 알림 발송기 (수신 대기열 → 동일 알림 병합 → 채팅별 토큰 버킷 → 공유 세션으로 Telegram 발송)
+
+        수집 경로에서는 send()로 대기열에 넣기만 하고, HTTP 요청은 발송 스레드에서만 수행합니다.
+        """
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.queue_size = queue_size
+        self.coalesce_window = coalesce_window
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.session = requests.Session()
+        self.windows = {}  # (bot_token, chat_id, key) → 병합 구간 상태
+        self.outboxes = {}  # (bot_token, chat_id) → 발송 대기 [(text, parse_mode)]
+        self.buckets = {}  # (bot_token, chat_id) → TokenBucket
+        self.thread = None
+        self.running = False
+        self.lock = threading.Lock()
+
+        # ✅ 통계
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.merged = 0
+
+    def start(self):
+        """ ✅ 발송 스레드 시작 (첫 send() 시 자동 호출) """
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+            self.thread.start()
+        atexit.register(self.close)
+
+    def send(self, text, key=None, chat_id=None, bot_token=None, parse_mode=None, coalesce=True):
+        """ ✅ 알림 대기열 적재 (즉시 반환, 대기열 초과 시 드롭 후 False)
+
+        key가 같은 알림은 coalesce_window 동안 1건으로 병합됩니다 (기본 key: 메시지 첫 줄).
+        가격 / 수량이 바뀌어도 병합되도록 호출 측에서 f"{종류}:{코인}" 형태의 고정 key를 지정합니다.
+        coalesce=False 이면 병합 없이 그대로 발송합니다 (리포트 등).
+        """
+        bot_token = bot_token or self.bot_token
+        chat_id = chat_id or self.chat_id
+        if not bot_token or not chat_id:
+            return False
+        if self.thread is None:
+            self.start()
+        if not coalesce:
+            key = None
+        elif key is None:
+            key = text.split("\n", 1)[0]
+        try:
+            self.queue.put_nowait((bot_token, str(chat_id), key, text, parse_mode))
+        except queue.Full:
+            self._drop()
+            return False
+        self.enqueued += 1
+        return True
+
+    def _drop(self):
+        self.dropped += 1
+        if self.dropped % 100 == 1:
+            logging.warning(f"⚠️ [알림] 대기열 초과 - 누적 드롭 {self.dropped}건")
+
+    def _accept(self, bot_token, chat_id, key, text, parse_mode, now):
+        """ ✅ 병합 구간의 첫 알림은 즉시 발송 대기열로, 이후 알림은 병합 (key=None 은 병합 없이 발송) """
+        if key is None:
+            self._enqueue_outbox(bot_token, chat_id, text, parse_mode)
+            return
+        window = self.windows.get((bot_token, chat_id, key))
+        if window is not None and now < window["until"]:
+            window["count"] += 1
+            window["text"] = text
+            window["parse_mode"] = parse_mode
+            self.merged += 1
+            return
+        self.windows[(bot_token, chat_id, key)] = {"until": now + self.coalesce_window, "count": 0,
+                                                   "text": text, "parse_mode": parse_mode}
+        self._enqueue_outbox(bot_token, chat_id, text, parse_mode)
+
+    def _flush_windows(self, now):
+        """ ✅ 종료된 병합 구간 → 요약 알림 1건 발송 """
+        for window_key, window in list(self.windows.items()):
+            if now < window["until"]:
+                continue
+            del self.windows[window_key]
+            if window["count"]:
+                bot_token, chat_id, _ = window_key
+                summary = (f"{window['text']}\n\n🔁 최근 {self.coalesce_window:g}초 동안 "
+                           f"동일 알림 {window['count']}건 추가 발생 (마지막 알림 표시)")
+                self._enqueue_outbox(bot_token, chat_id, summary, window["parse_mode"])
+
+    def _enqueue_outbox(self, bot_token, chat_id, text, parse_mode):
+        outbox = self.outboxes.setdefault((bot_token, chat_id), deque())
+        if len(outbox) >= self.queue_size:
+            outbox.popleft()  # 가장 오래된 알림 폐기
+            self._drop()
+        outbox.append((text, parse_mode))
+
+    def _bucket(self, target):
+        bucket = self.buckets.get(target)
+        if bucket is None:
+            bucket = self.buckets[target] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _deliver(self, now):
+        """ ✅ 토큰이 있는 채팅의 대기 알림 발송 (다음 발송 가능까지 대기 시간 반환) """
+        wait = self.coalesce_window
+        for target, outbox in self.outboxes.items():
+            bucket = self._bucket(target)
+            while outbox:
+                if not self.global_bucket.try_take(now):
+                    return self.global_bucket.wait_time(now)
+                if not bucket.try_take(now):
+                    self.global_bucket.tokens += 1  # 채팅 한도 초과 시 전체 토큰 반환
+                    wait = min(wait, bucket.wait_time(now))
+                    break
+                text, parse_mode = outbox.popleft()
+                if not self._post(target, bucket, text, parse_mode):
+                    outbox.appendleft((text, parse_mode))  # 요청 제한(429) → 버킷 대기 후 같은 순서로 재발송
+                    wait = min(wait, bucket.wait_time())
+                    break
+                now = time.monotonic()
+        return wait
+
+    def _post(self, target, bucket, text, parse_mode):
+        """ ✅ Telegram 발송 (요청 제한으로 재발송이 필요하면 False) """
+        bot_token, chat_id = target
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        try:
+            response = self.session.post(f"https://api.telegram.org/bot{bot_token}/sendMessage", data=payload, timeout=10)
+        except requests.RequestException as e:
+            self.failed += 1
+            logging.error(f"🚨 [알림] Telegram 전송 실패: {e}")
+            return True
+        if response.status_code == 200:
+            self.sent += 1
+            return True
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.json().get("parameters", {}).get("retry_after", 1))
+            except ValueError:
+                retry_after = 1.0
+            bucket.pause(retry_after)
+            logging.warning(f"⚠️ [알림] Telegram 요청 제한 - {retry_after:.0f}초 대기")
+            return False
+        self.failed += 1
+        logging.error(f"🚨 [알림] Telegram 전송 실패: {response.text}")
+        return True
+
+    def _next_timeout(self, wait):
+        if self.windows:
+            wait = min(wait, min(window["until"] for window in self.windows.values()) - time.monotonic())
+        if not any(self.outboxes.values()) and not self.windows:
+            return None if self.running else 0.0  # 대기 알림이 없으면 새 알림까지 대기
+        return max(wait, 0.01)
+
+    def _run(self):
+        """ ✅ 발송 루프 (수신 → 병합 → 요약 → 토큰 버킷 발송) """
+        wait = None
+        while True:
+            try:
+                item = self.queue.get(timeout=wait)
+            except queue.Empty:
+                item = None
+            if item is None and not self.running and self.queue.empty():
+                self._flush_windows(float("inf"))
+                self._deliver(time.monotonic())
+                if not any(self.outboxes.values()):
+                    return
+            now = time.monotonic()
+            while item is not None:
+                self._accept(*item, now)
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = None
+            self._flush_windows(now)
+            wait = self._next_timeout(self._deliver(now))
+
+    def close(self, timeout=5):
+        """ ✅ 병합 중인 요약과 대기 알림 발송 후 종료 """
+        if self.thread is None or not self.thread.is_alive():
+            return
+        self.running = False
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+
+    def stats(self):
+        """ ✅ 적재/발송/실패/드롭/병합 건수 및 대기 알림 수 """
+        return {
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "merged": self.merged,
+            "queued": self.queue.qsize() + sum(len(outbox) for outbox in self.outboxes.values()),
+        }
+
+
+# ✅ 프로세스 공용 알림 발송기
+shared_alert_dispatcher = AlertDispatcher()
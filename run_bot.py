@@ -1,5 +1,5 @@
 import time
-from trade import place_order
+from trade import place_order, start_coin_selector, get_trading_pair
 from config import Config
 
 if __name__ == "__main__":
@@ -8,9 +8,12 @@ if __name__ == "__main__":
     else:
         print("✅ Binance API 연결 성공. 실거래 모드 실행.")
 
+    start_coin_selector()  # ✅ AUTO_SELECT_COIN=True 이면 전 종목 스트림 순위 갱신 시작
+
     # ✅ 변경된 코드 (반복 실행)
     while True:
-        print("📌 [자동매매] BTCUSDT 매수 주문 실행 중...")
-        response = place_order("BTCUSDT", "BUY")  # ✅ 주문 실행
+        symbol = get_trading_pair()  # ✅ 매매 완료 후 자동 교체된 코인
+        print(f"📌 [자동매매] {symbol} 매수 주문 실행 중...")
+        response = place_order(symbol, "BUY")  # ✅ 주문 실행
         print(f"📌 [주문 응답]: {response}")  # ✅ 주문 결과 출력
         time.sleep(10)  # ✅ 10초마다 실행
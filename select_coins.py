@@ -1,51 +1,87 @@
 import requests
 import numpy as np
+import pandas as pd
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 # 환경 변수 로드 (.env 파일에서 API 키 및 설정값 가져오기)
 load_dotenv()
+COIN_SELECTOR_CACHE_TTL = float(os.getenv("COIN_SELECTOR_CACHE_TTL", "60"))  # 점수 캐시 유지 시간 (초)
+COIN_SELECTOR_WORKERS = int(os.getenv("COIN_SELECTOR_WORKERS", "16"))  # 코인별 요청 동시 실행 수
+
+def coin_score(price_change, volume, spread, oi=0.0, funding_rate=0.0, whale_activity=0.0):
+    """ 변동성 + 거래량 + 유동성 + OI + 펀딩비 + 고래 매매 점수 (스칼라 / 배열 모두 지원) """
+    return price_change * np.sqrt(volume) / (spread + 1e-9) + oi * 0.1 + funding_rate * 10 + whale_activity * 5
 
 class CoinSelector:
-    def __init__(self):
+    def __init__(self, cache_ttl=COIN_SELECTOR_CACHE_TTL, max_workers=COIN_SELECTOR_WORKERS):
         self.binance_base_url = os.getenv("BINANCE_BASE_URL", "https://api.binance.com/api/v3/ticker/24hr")
+        self.binance_book_ticker_url = os.getenv("BINANCE_BOOK_TICKER_URL", "https://api.binance.com/api/v3/ticker/bookTicker")
         self.binance_oi_url = os.getenv("BINANCE_OI_URL", "https://fapi.binance.com/fapi/v1/openInterest")
         self.binance_funding_url = os.getenv("BINANCE_FUNDING_URL", "https://fapi.binance.com/fapi/v1/premiumIndex")
         self.glassnode_api_key = os.getenv("GLASSNODE_API_KEY")  # ✅ 온체인 데이터 API 키
+        self.cache_ttl = cache_ttl
+        self.max_workers = max_workers
 
-    def fetch_top_volatile_coins(self, top_n=5):
-        """ 변동성 + 거래량 + 유동성을 고려한 최적의 코인 자동 선택 """
-        response = requests.get(self.binance_base_url)
-        if response.status_code != 200:
-            print("🚨 [API 오류] 변동성 데이터 조회 실패")
-            return []
+        # ✅ Keep-alive 공유 세션
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
 
-        tickers = response.json()
-        volatility_data = []
+        # ✅ 점수 캐시 (cache_ttl 동안 재사용)
+        self.scores = None
+        self.scored_at = 0.0
+        self.lock = threading.Lock()
 
-        for ticker in tickers:
-            if ticker["symbol"].endswith("USDT"):  # USDT 마켓 필터링
-                price_change = abs(float(ticker["priceChangePercent"]))  # 24시간 변동성
-                volume = float(ticker["quoteVolume"])  # 거래대금
-                spread = self.fetch_bid_ask_spread(ticker["symbol"])  # 호가 스프레드
-                oi = self.fetch_open_interest(ticker["symbol"])  # 미결제약정(OI)
-                funding_rate = self.fetch_funding_rate(ticker["symbol"])  # 펀딩비
-                whale_activity = self.fetch_whale_activity(ticker["symbol"])  # 고래 매매 분석
+    def _get_json(self, url, params=None):
+        try:
+            response = self.session.get(url, params=params, timeout=10)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200:
+            return None
+        return response.json()
 
-                # ✅ 변동성 + 거래량 + 유동성 + OI + 펀딩비 + 고래 매매 데이터를 반영한 점수 계산
-                score = (price_change * (volume ** 0.5) / (spread + 1e-9)) + (oi * 0.1) + (funding_rate * 10) + (whale_activity * 5)
-                volatility_data.append((ticker["symbol"], score))
+    def fetch_tickers(self):
+        """ 24시간 시세 일괄 조회 (USDT 마켓) """
+        tickers = self._get_json(self.binance_base_url)
+        if not tickers:
+            return None
+        df = pd.DataFrame(tickers, columns=["symbol", "priceChangePercent", "quoteVolume"])
+        df = df[df["symbol"].str.endswith("USDT")]
+        return pd.DataFrame({
+            "symbol": df["symbol"].values,
+            "price_change": np.abs(df["priceChangePercent"].astype(float).values),  # 24시간 변동성
+            "volume": df["quoteVolume"].astype(float).values,  # 거래대금
+        }).set_index("symbol")
 
-        # ✅ 상위 N개 코인 선택
-        volatility_data.sort(key=lambda x: x[1], reverse=True)
-        return [symbol for symbol, _ in volatility_data[:top_n]]
+    def fetch_spreads(self):
+        """ 전 종목 최우선 호가 일괄 조회 → Bid-Ask 스프레드 (bookTicker, symbol 미지정) """
+        book = self._get_json(self.binance_book_ticker_url)
+        if not book:
+            return pd.Series(dtype=float)
+        df = pd.DataFrame(book, columns=["symbol", "bidPrice", "askPrice"]).set_index("symbol")
+        bid = df["bidPrice"].astype(float)
+        ask = df["askPrice"].astype(float)
+        return ((ask - bid).abs() / bid.where(bid > 0)).dropna()
+
+    def fetch_funding_rates(self):
+        """ 전 종목 펀딩비 일괄 조회 (premiumIndex, symbol 미지정) """
+        premium = self._get_json(self.binance_funding_url)
+        if not premium:
+            return pd.Series(dtype=float)
+        df = pd.DataFrame(premium, columns=["symbol", "lastFundingRate"]).set_index("symbol")
+        return pd.to_numeric(df["lastFundingRate"], errors="coerce").fillna(0.0)
 
     def fetch_bid_ask_spread(self, symbol):
         """ 유동성을 평가하기 위한 Bid-Ask 스프레드 계산 """
         url = f"{os.getenv('BINANCE_ORDER_BOOK_URL', 'https://api.binance.com/api/v3/depth')}?symbol={symbol}&limit=5"
-        response = requests.get(url)
-        if response.status_code == 200:
-            order_book = response.json()
+        order_book = self._get_json(url)
+        if order_book and order_book["bids"] and order_book["asks"]:
             best_bid = float(order_book["bids"][0][0])
             best_ask = float(order_book["asks"][0][0])
             spread = abs(best_ask - best_bid) / best_bid
@@ -54,37 +90,92 @@ class CoinSelector:
 
     def fetch_open_interest(self, symbol):
         """ 미결제약정(OI) 데이터 가져오기 """
-        response = requests.get(f"{self.binance_oi_url}?symbol={symbol}")
-        if response.status_code == 200:
-            oi_data = response.json()
+        oi_data = self._get_json(self.binance_oi_url, params={"symbol": symbol})
+        if oi_data:
             return float(oi_data["openInterest"])
         return 0
 
     def fetch_funding_rate(self, symbol):
         """ 펀딩비 데이터 가져오기 """
-        response = requests.get(f"{self.binance_funding_url}?symbol={symbol}")
-        if response.status_code == 200:
-            funding_data = response.json()
+        funding_data = self._get_json(self.binance_funding_url, params={"symbol": symbol})
+        if funding_data:
             return float(funding_data["lastFundingRate"])
         return 0
 
     def fetch_whale_activity(self, symbol):
         """ 온체인 데이터를 기반으로 고래 매매 분석 """
+        if not self.glassnode_api_key:
+            return 0
         url = f"https://api.glassnode.com/v1/metrics/transactions/transfers_volume_whales"
         params = {"a": symbol.replace("USDT", ""), "api_key": self.glassnode_api_key}
-        response = requests.get(url, params=params)
-        
-        if response.status_code == 200:
-            whale_data = response.json()
+        whale_data = self._get_json(url, params=params)
+
+        if whale_data:
             whale_volume = whale_data[-1]["v"]  # 최근 고래 거래량
             return whale_volume / 1e6  # 값 정규화
         return 0
 
+    def fetch_per_symbol(self, fetch, symbols):
+        """ 코인별 요청 동시 실행 (max_workers 로 동시 요청 수 제한) """
+        if not symbols:
+            return pd.Series(dtype=float)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            values = list(executor.map(fetch, symbols))
+        return pd.Series(values, index=symbols, dtype=float)
+
+    def score_coins(self):
+        """ 변동성 + 거래량 + 유동성 + OI + 펀딩비 + 고래 매매 점수 계산 (DataFrame 벡터 연산) """
+        df = self.fetch_tickers()
+        if df is None:
+            print("🚨 [API 오류] 변동성 데이터 조회 실패")
+            return None
+
+        funding = self.fetch_funding_rates()
+        futures_symbols = [symbol for symbol in df.index if symbol in funding.index]  # OI는 선물 상장 코인만 존재
+
+        df["spread"] = self.fetch_spreads().reindex(df.index).fillna(0.01)
+        df["funding_rate"] = funding.reindex(df.index).fillna(0.0)
+        df["oi"] = self.fetch_per_symbol(self.fetch_open_interest, futures_symbols).reindex(df.index).fillna(0.0)
+        if self.glassnode_api_key:
+            df["whale_activity"] = self.fetch_per_symbol(self.fetch_whale_activity, list(df.index)).fillna(0.0)
+        else:
+            df["whale_activity"] = 0.0
+
+        # ✅ 변동성 + 거래량 + 유동성 + OI + 펀딩비 + 고래 매매 데이터를 반영한 점수 계산
+        df["score"] = coin_score(df["price_change"], df["volume"], df["spread"],
+                                 df["oi"], df["funding_rate"], df["whale_activity"])
+        return df
+
+    def get_scores(self, force=False):
+        """ 캐시된 점수 반환 (cache_ttl 경과 시 재계산) """
+        with self.lock:
+            if force or self.scores is None or time.time() - self.scored_at >= self.cache_ttl:
+                scores = self.score_coins()
+                if scores is not None:
+                    self.scores = scores
+                    self.scored_at = time.time()
+            return self.scores
+
+    def fetch_top_volatile_coins(self, top_n=5, force=False):
+        """ 변동성 + 거래량 + 유동성을 고려한 최적의 코인 자동 선택 """
+        df = self.get_scores(force=force)
+        if df is None or df.empty:
+            return []
+
+        # ✅ 상위 N개 코인 선택 (부분 정렬 후 N개만 정렬)
+        scores = df["score"].to_numpy()
+        top_n = min(top_n, len(scores))
+        if top_n <= 0:
+            return []
+        top = np.argpartition(-scores, top_n - 1)[:top_n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return df.index[top].tolist()
+
     def should_switch_coin(self, current_coin):
         """ 매매 완료 후 코인을 변경할지 판단 """
         top_coins = self.fetch_top_volatile_coins(top_n=5)
 
-        if current_coin in top_coins:
+        if not top_coins or current_coin in top_coins:
             print(f"✅ [코인 유지] 현재 코인({current_coin}) 변동성 상위권 유지")
             return current_coin  # 현재 코인 유지
         else:
@@ -94,8 +185,9 @@ class CoinSelector:
 
 if __name__ == "__main__":
     selector = CoinSelector()
+    started = time.time()
     top_coins = selector.fetch_top_volatile_coins()
-    print(f"🚀 [변동성 높은 코인 TOP 5]: {top_coins}")
+    print(f"🚀 [변동성 높은 코인 TOP 5]: {top_coins} ({time.time() - started:.2f}초)")
 
     current_coin = "BTCUSDT"
     new_coin = selector.should_switch_coin(current_coin)
@@ -0,0 +1,202 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from dotenv import load_dotenv
+from storage.db_pool import shared_db_pool
+from monitoring.stream_metrics import shared_stream_metrics
+
+# ✅ 환경 변수 로드
+load_dotenv()
+USE_MYSQL = os.getenv("USE_MYSQL") == "True"
+USE_POSTGRES = os.getenv("USE_POSTGRES") == "True"
+USE_MONGO = os.getenv("USE_MONGO") == "True"
+SINK_BATCH_SIZE = int(os.getenv("SINK_BATCH_SIZE", "500"))  # 배치당 최대 레코드 수
+SINK_MAX_LATENCY = float(os.getenv("SINK_MAX_LATENCY", "1.0"))  # 첫 레코드 적재 후 최대 대기 시간 (초)
+SINK_QUEUE_SIZE = int(os.getenv("SINK_QUEUE_SIZE", "100000"))  # 대기열 최대 레코드 수
+
+_STOP = object()
+
+
+class BatchSink:
+    def __init__(self, table, columns, mongo_collection=None, sql_row=None,
+                 batch_size=SINK_BATCH_SIZE, max_latency=SINK_MAX_LATENCY, queue_size=SINK_QUEUE_SIZE,
+                 backpressure_timeout=0.0, use_mysql=USE_MYSQL, use_postgres=USE_POSTGRES, use_mongo=USE_MONGO):
+        """ ✅ Write-behind 배치 저장소 (대기열 적재 → 백그라운드 스레드에서 크기/시간 기준 일괄 저장)
+
+        - MySQL: executemany (다중 행 INSERT)
+        - PostgreSQL: execute_values (다중 행 INSERT)
+        - MongoDB: insert_many(ordered=False)
+        """
+        self.table = table
+        self.columns = list(columns)
+        self.mongo_collection = mongo_collection
+        self.sql_row = sql_row or (lambda record: tuple(record[column] for column in self.columns))
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.backpressure_timeout = backpressure_timeout  # 0이면 대기열이 가득 찰 때 즉시 드롭
+        self.use_mysql = use_mysql
+        self.use_postgres = use_postgres
+        self.use_mongo = use_mongo and mongo_collection is not None
+        self.queue = queue.Queue(maxsize=queue_size)
+
+        placeholders = ", ".join(["%s"] * len(self.columns))
+        self.insert_sql = f"INSERT INTO {table} ({', '.join(self.columns)}) VALUES ({placeholders})"
+        self.values_sql = f"INSERT INTO {table} ({', '.join(self.columns)}) VALUES %s"
+
+        # ✅ 통계
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+
+        shared_stream_metrics.gauge(f"sink_queue:{table}", self.queue.qsize)  # DB 저장 적체 확인용
+
+        self.thread = threading.Thread(target=self._run, name=f"sink-{table}")
+        self.thread.daemon = True
+        self.thread.start()
+        atexit.register(self.close)
+
+    def put(self, record):
+        """ ✅ 레코드 적재 (저장은 백그라운드에서 수행, 대기열 초과 시 드롭 후 False 반환) """
+        try:
+            if self.backpressure_timeout > 0:
+                self.queue.put(record, timeout=self.backpressure_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logging.warning(f"⚠️ [{self.table}] 저장 대기열 초과 - 누적 드롭 {self.dropped}건")
+            return False
+        self.enqueued += 1
+        return True
+
+    def put_many(self, records):
+        """ ✅ 레코드 목록 적재 (적재된 건수 반환) """
+        return sum(self.put(record) for record in records)
+
+    def _run(self):
+        """ ✅ 배치 수집 루프 (batch_size 도달 또는 max_latency 경과 시 저장) """
+        while True:
+            record = self.queue.get()
+            if record is _STOP:
+                return
+            batch = [record]
+            deadline = time.monotonic() + self.max_latency
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stop = True
+                    break
+                batch.append(record)
+            try:
+                self.flush(batch)
+            except Exception as e:  # 저장 스레드가 종료되면 이후 레코드가 모두 유실되므로 배치 단위로 격리
+                self.failed += len(batch)
+                logging.error(f"🚨 [{self.table}] 배치 저장 처리 실패 ({len(batch)}건): {e}")
+            if stop:
+                return
+
+    def flush(self, batch):
+        """ ✅ 배치 일괄 저장 (MySQL, PostgreSQL, MongoDB)
+
+        레코드마다 1회만 집계: 모든 저장소에 성공하면 written, 저장소 하나라도 실패하거나 SQL 변환에 실패하면 failed
+        """
+        started = time.perf_counter()
+        ok = True
+        rejected = 0
+        if self.use_mysql or self.use_postgres:
+            rows = self._sql_rows(batch)
+            rejected = len(batch) - len(rows)
+            if self.use_mysql:
+                ok = self._write_mysql(rows) and ok
+            if self.use_postgres:
+                ok = self._write_postgres(rows) and ok
+        if self.use_mongo:
+            ok = self._write_mongo(batch) and ok
+        if ok:
+            self.written += len(batch) - rejected
+            self.failed += rejected
+        else:
+            self.failed += len(batch)
+        self.flushes += 1
+        shared_stream_metrics.observe(f"sink:{self.table}", "flush", time.perf_counter() - started)
+
+    def _sql_rows(self, batch):
+        """ ✅ 레코드 → SQL 행 변환 (변환 실패 레코드만 제외) """
+        try:
+            return [self.sql_row(record) for record in batch]
+        except Exception:
+            rows = []
+            for record in batch:
+                try:
+                    rows.append(self.sql_row(record))
+                except Exception as e:
+                    logging.error(f"🚨 [{self.table}] 레코드 변환 실패: {e} ({record})")
+            return rows
+
+    def _write_mysql(self, rows):
+        try:
+            with shared_db_pool.mysql() as conn:  # 실패한 연결은 풀에서 폐기 후 다음 배치에서 재연결
+                cursor = conn.cursor()
+                cursor.executemany(self.insert_sql, rows)
+                conn.commit()
+                cursor.close()
+            return True
+        except Exception as e:
+            logging.error(f"🚨 [MySQL] {self.table} 배치 저장 실패 ({len(rows)}건): {e}")
+            return False
+
+    def _write_postgres(self, rows):
+        try:
+            from psycopg2.extras import execute_values
+            with shared_db_pool.postgres() as conn:
+                with conn.cursor() as cursor:
+                    execute_values(cursor, self.values_sql, rows, page_size=self.batch_size)
+                conn.commit()
+            return True
+        except Exception as e:
+            logging.error(f"🚨 [PostgreSQL] {self.table} 배치 저장 실패 ({len(rows)}건): {e}")
+            return False
+
+    def _write_mongo(self, batch):
+        try:
+            self.mongo_collection.insert_many(batch, ordered=False)
+            return True
+        except Exception as e:
+            logging.error(f"🚨 [MongoDB] {self.table} 배치 저장 실패 ({len(batch)}건): {e}")
+            return False
+
+    def close(self, timeout=10):
+        """ ✅ 남은 레코드 저장 후 종료 """
+        if not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)  # 대기열이 가득 차도 종료(atexit)가 멈추지 않도록 제한
+        except queue.Full:
+            logging.warning(f"⚠️ [{self.table}] 종료 시 저장 대기열 초과 - {self.queue.qsize()}건 미저장")
+            return
+        self.thread.join(timeout)
+
+    def stats(self):
+        """ ✅ 적재/드롭/저장/실패 건수 및 대기열 길이 """
+        return {
+            "table": self.table,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "queued": self.queue.qsize(),
+        }
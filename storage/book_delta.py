@@ -0,0 +1,364 @@
+import os
+import time
+import glob
+import atexit
+import zlib
+import logging
+import threading
+import numpy as np
+import requests
+from dotenv import load_dotenv
+from storage.raw_capture import INDEX_DTYPE, capture_day
+
+# ✅ 환경 변수 로드
+load_dotenv()
+BOOK_DELTA_DIR = os.getenv("BOOK_DELTA_DIR", "data/book")  # 호가 Delta 저장 경로
+BOOK_KEYFRAME_INTERVAL_MS = int(os.getenv("BOOK_KEYFRAME_INTERVAL_MS", "60000"))  # 전체 호가 키프레임 간격 (ms)
+BOOK_DEFAULT_TICK = float(os.getenv("BOOK_DEFAULT_TICK", "1e-8"))  # 거래소 필터 조회 실패 시 가격 단위
+BOOK_DEFAULT_LOT = float(os.getenv("BOOK_DEFAULT_LOT", "1e-8"))  # 거래소 필터 조회 실패 시 수량 단위
+BOOK_FLUSH_INTERVAL = float(os.getenv("BOOK_FLUSH_INTERVAL", "1.0"))  # 호가 Delta 파일 디스크 기록 주기 (초)
+
+FILE_MAGIC = b"BKD1"
+FILE_HEADER_DTYPE = np.dtype([("magic", "S4"), ("tick", "<f8"), ("lot", "<f8")])
+
+# ✅ 프레임 헤더 (kind: 0 = 키프레임, 1 = Delta / payload: zlib 압축 int64 배열)
+FRAME_HEADER_DTYPE = np.dtype([
+    ("kind", "u1"),
+    ("event_time", "<i8"),
+    ("update_id", "<i8"),
+    ("n_bids", "<u4"),
+    ("n_asks", "<u4"),
+    ("size", "<u4"),
+])
+KEYFRAME, DELTA = 0, 1
+
+
+def fetch_symbol_filters(base_url, symbols, session=None):
+    """ ✅ exchangeInfo → {코인: (tickSize, stepSize)} (1회 조회, 실패 시 빈 dict) """
+    session = session or requests.Session()
+    try:
+        response = session.get(f"{base_url}/exchangeInfo", timeout=10)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logging.warning(f"⚠️ [호가 Delta] 거래소 필터 조회 실패 - 기본 단위 사용: {e}")
+        return {}
+    symbols = {symbol.upper() for symbol in symbols}
+    filters = {}
+    for info in response.json().get("symbols", []):
+        if info["symbol"] not in symbols:
+            continue
+        by_type = {f["filterType"]: f for f in info.get("filters", [])}
+        filters[info["symbol"]] = (float(by_type.get("PRICE_FILTER", {}).get("tickSize", BOOK_DEFAULT_TICK)),
+                                   float(by_type.get("LOT_SIZE", {}).get("stepSize", BOOK_DEFAULT_LOT)))
+    return filters
+
+
+def to_units(values, unit):
+    """ ✅ 가격 / 수량 → 정수 tick / lot """
+    return np.rint(np.asarray(values, dtype=np.float64) / unit).astype(np.int64)
+
+
+def diff_levels(prev_ticks, prev_lots, ticks, lots):
+    """ ✅ 이전 → 현재 레벨 변경분 (가격 오름차순 정렬 입력, 삭제 레벨은 lot 0)
+
+    searchsorted 1회씩으로 추가 / 수량 변경 / 삭제 레벨을 벡터화 계산합니다.
+    """
+    if len(prev_ticks) == 0:
+        return ticks, lots
+    pos = np.searchsorted(prev_ticks, ticks)
+    clipped = np.minimum(pos, len(prev_ticks) - 1)
+    changed = (prev_ticks[clipped] != ticks) | (prev_lots[clipped] != lots)
+
+    pos = np.searchsorted(ticks, prev_ticks)
+    clipped = np.minimum(pos, max(len(ticks) - 1, 0))
+    removed = prev_ticks[(pos >= len(ticks)) | (ticks[clipped] != prev_ticks)] if len(ticks) else prev_ticks
+
+    out_ticks = np.concatenate((ticks[changed], removed))
+    out_lots = np.concatenate((lots[changed], np.zeros(len(removed), dtype=np.int64)))
+    order = np.argsort(out_ticks, kind="stable")
+    return out_ticks[order], out_lots[order]
+
+
+def apply_levels(ticks, lots, delta_ticks, delta_lots):
+    """ ✅ 레벨 변경분 적용 (같은 가격은 Delta 우선, lot 0 레벨 삭제) """
+    merged_ticks = np.concatenate((delta_ticks, ticks))
+    merged_lots = np.concatenate((delta_lots, lots))
+    ticks, first = np.unique(merged_ticks, return_index=True)
+    lots = merged_lots[first]
+    keep = lots > 0
+    return ticks[keep], lots[keep]
+
+
+def pack_levels(ticks, lots):
+    """ ✅ 가격 tick은 차분(첫 값은 절대값)으로 바꿔 압축률 향상 """
+    return np.concatenate((np.diff(ticks, prepend=0), lots)).astype("<i8").tobytes()
+
+
+def unpack_levels(buffer, n):
+    values = np.frombuffer(buffer, dtype="<i8", count=2 * n)
+    return np.cumsum(values[:n]), values[n:].copy()
+
+
+class BookState:
+    __slots__ = ("bid_ticks", "bid_lots", "ask_ticks", "ask_lots")
+
+    def __init__(self):
+        """ ✅ 정수 tick / lot 호가 상태 (양쪽 모두 가격 오름차순) """
+        empty = np.empty(0, dtype=np.int64)
+        self.bid_ticks, self.bid_lots, self.ask_ticks, self.ask_lots = empty, empty, empty, empty
+
+    def to_levels(self, tick, lot, depth=None):
+        """ ✅ 상위 depth 레벨 (bids 내림차순, asks 오름차순) → (N, 2) float 배열 """
+        bids = np.column_stack((self.bid_ticks[::-1] * tick, self.bid_lots[::-1] * lot))
+        asks = np.column_stack((self.ask_ticks * tick, self.ask_lots * lot))
+        return (bids, asks) if depth is None else (bids[:depth], asks[:depth])
+
+
+class BookDeltaWriter:
+    def __init__(self, path, tick, lot):
+        """ ✅ 코인 / 일별 호가 Delta 파일 (파일 헤더 + 프레임, 키프레임 위치는 .idx 색인) """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.file = open(path, "ab")
+        self.index_file = open(path[:-5] + ".idx", "ab")
+        if self.file.tell() < FILE_HEADER_DTYPE.itemsize:
+            self.file.truncate(0)
+            self.index_file.truncate(0)
+            self.file.write(np.array([(FILE_MAGIC, tick, lot)], dtype=FILE_HEADER_DTYPE).tobytes())
+        else:
+            header = np.fromfile(path, dtype=FILE_HEADER_DTYPE, count=1)[0]
+            tick, lot = float(header["tick"]), float(header["lot"])  # 기존 파일 단위 유지
+            self._recover()
+        self.tick = tick
+        self.lot = lot
+        self.state = BookState()
+        self.last_keyframe = None
+        self.bytes_written = 0
+
+    def _recover(self):
+        """ ✅ 비정상 종료로 잘린 마지막 프레임 제거 (마지막 색인 키프레임부터 프레임을 따라가 완전한 프레임 끝에서 자름) """
+        size = self.file.tell()
+        index_size = self.index_file.tell()
+        if index_size % INDEX_DTYPE.itemsize:
+            index_size -= index_size % INDEX_DTYPE.itemsize
+            self.index_file.truncate(index_size)
+        index = np.fromfile(self.index_file.name, dtype=INDEX_DTYPE, count=index_size // INDEX_DTYPE.itemsize)
+        index = index[index["offset"] < size]
+        end = int(index["offset"][-1]) if len(index) else FILE_HEADER_DTYPE.itemsize
+
+        header_size = FRAME_HEADER_DTYPE.itemsize
+        with open(self.path, "rb") as file:
+            while end + header_size <= size:
+                file.seek(end)
+                header = np.frombuffer(file.read(header_size), dtype=FRAME_HEADER_DTYPE)[0]
+                if end + header_size + int(header["size"]) > size:
+                    break
+                end += header_size + int(header["size"])
+
+        if end < size:
+            logging.warning(f"⚠️ [호가 Delta] 잘린 프레임 제거: {self.path} ({size - end} bytes)")
+            self.file.truncate(end)
+            self.file.seek(0, os.SEEK_END)
+        index = index[index["offset"] < end]  # 잘린 프레임을 가리키는 색인 제거
+        if len(index) * INDEX_DTYPE.itemsize != index_size:
+            self.index_file.truncate(len(index) * INDEX_DTYPE.itemsize)
+        self.index_file.seek(0, os.SEEK_END)
+
+    def write(self, event_time, update_id, bids, asks, keyframe_interval_ms=BOOK_KEYFRAME_INTERVAL_MS):
+        """ ✅ 호가 스냅샷 기록 (키프레임 간격마다 전체, 그 외 변경 레벨만) → 기록 바이트 수 """
+        bids = np.asarray(bids, dtype=np.float64).reshape(-1, 2)
+        asks = np.asarray(asks, dtype=np.float64).reshape(-1, 2)
+        bid_order = np.argsort(bids[:, 0], kind="stable")
+        ask_order = np.argsort(asks[:, 0], kind="stable")
+        bid_ticks, bid_lots = to_units(bids[bid_order, 0], self.tick), to_units(bids[bid_order, 1], self.lot)
+        ask_ticks, ask_lots = to_units(asks[ask_order, 0], self.tick), to_units(asks[ask_order, 1], self.lot)
+
+        if self.last_keyframe is None or event_time - self.last_keyframe >= keyframe_interval_ms:
+            kind = KEYFRAME
+            frame = (bid_ticks, bid_lots, ask_ticks, ask_lots)
+            self.last_keyframe = event_time
+            offset = self.file.tell()
+            self.index_file.write(np.array([(event_time, offset)], dtype=INDEX_DTYPE).tobytes())
+        else:
+            kind = DELTA
+            frame = (*diff_levels(self.state.bid_ticks, self.state.bid_lots, bid_ticks, bid_lots),
+                     *diff_levels(self.state.ask_ticks, self.state.ask_lots, ask_ticks, ask_lots))
+            if len(frame[0]) == 0 and len(frame[2]) == 0:
+                return 0  # 변경 없음
+
+        self.state.bid_ticks, self.state.bid_lots = bid_ticks, bid_lots
+        self.state.ask_ticks, self.state.ask_lots = ask_ticks, ask_lots
+        payload = zlib.compress(pack_levels(frame[0], frame[1]) + pack_levels(frame[2], frame[3]), 1)
+        header = np.array([(kind, event_time, update_id, len(frame[0]), len(frame[2]), len(payload))],
+                          dtype=FRAME_HEADER_DTYPE)
+        self.file.write(header.tobytes())
+        self.file.write(payload)
+        self.bytes_written += FRAME_HEADER_DTYPE.itemsize + len(payload)
+        return FRAME_HEADER_DTYPE.itemsize + len(payload)
+
+    def flush(self):
+        self.file.flush()
+        self.index_file.flush()
+
+    def close(self):
+        self.file.close()
+        self.index_file.close()
+
+
+class BookDeltaStore:
+    def __init__(self, root=BOOK_DELTA_DIR, filters=None, keyframe_interval_ms=BOOK_KEYFRAME_INTERVAL_MS,
+                 flush_interval=BOOK_FLUSH_INTERVAL):
+        """ ✅ 호가 Delta 저장소 (주기적 전체 키프레임 + 변경 레벨 Delta, 정수 tick / lot 인코딩)
+
+        filters: {코인: (tickSize, stepSize)} (fetch_symbol_filters 결과, 없으면 기본 단위)
+        첫 기록 시 flush_interval 마다 디스크에 기록하는 스레드를 시작하고, 종료 시 파일을 닫습니다.
+        """
+        self.root = root
+        self.filters = filters or {}
+        self.keyframe_interval_ms = keyframe_interval_ms
+        self.flush_interval = flush_interval
+        self.writers = {}  # 코인 → (날짜, BookDeltaWriter)
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.skipped = 0
+        self.thread = None
+        self.running = False
+
+    def path(self, symbol, day):
+        return os.path.join(self.root, symbol.upper(), f"{day}.book")
+
+    def write(self, symbol, event_time, update_id, bids, asks):
+        """ ✅ 호가 스냅샷 1건 기록 (날짜 변경 시 새 파일, 첫 프레임은 키프레임) """
+        symbol = symbol.upper()
+        day = capture_day(event_time)
+        if self.thread is None:
+            self.start()
+        with self.lock:
+            current = self.writers.get(symbol)
+            if current is None or current[0] != day:
+                if current is not None:
+                    current[1].close()
+                tick, lot = self.filters.get(symbol, (BOOK_DEFAULT_TICK, BOOK_DEFAULT_LOT))
+                current = self.writers[symbol] = (day, BookDeltaWriter(self.path(symbol, day), tick, lot))
+            written = current[1].write(event_time, update_id, bids, asks, self.keyframe_interval_ms)
+            if written:
+                self.frames += 1
+            else:
+                self.skipped += 1
+            return written
+
+    def start(self):
+        """ ✅ 주기적 디스크 기록 스레드 시작 (첫 write() 시 자동 호출) """
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name="book-delta-flush", daemon=True)
+            self.thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while self.running:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except (OSError, ValueError) as e:
+                logging.error(f"🚨 [호가 Delta] 디스크 기록 실패: {e}")
+
+    def flush(self):
+        with self.lock:
+            for _, writer in self.writers.values():
+                writer.flush()
+
+    def close(self):
+        self.running = False
+        with self.lock:
+            for _, writer in self.writers.values():
+                writer.close()
+            self.writers.clear()
+
+    def stats(self):
+        """ ✅ 기록 프레임 수, 변경 없어 생략한 스냅샷 수, 기록 바이트 """
+        return {"frames": self.frames, "skipped": self.skipped,
+                "bytes": sum(writer.bytes_written for _, writer in self.writers.values())}
+
+
+class BookDeltaReader:
+    def __init__(self, root=BOOK_DELTA_DIR):
+        """ ✅ 호가 Delta 파일 리더 (가장 가까운 이전 키프레임부터 Delta 적용해 임의 시점 / 깊이 복원) """
+        self.root = root
+
+    def paths(self, symbol):
+        return sorted(glob.glob(os.path.join(self.root, symbol.upper(), "*.book")))
+
+    def frames(self, path, start_offset=None):
+        """ ✅ 프레임 순회 → (헤더, payload) (파일 전체를 메모리 맵으로 읽음) """
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        offset = start_offset or FILE_HEADER_DTYPE.itemsize
+        header_size = FRAME_HEADER_DTYPE.itemsize
+        while offset + header_size <= len(data):
+            header = np.frombuffer(data, dtype=FRAME_HEADER_DTYPE, count=1, offset=offset)[0]
+            end = offset + header_size + int(header["size"])
+            if end > len(data):
+                break  # 기록 중이던 마지막 프레임
+            yield header, data[offset + header_size:end]
+            offset = end
+
+    def units(self, path):
+        header = np.fromfile(path, dtype=FILE_HEADER_DTYPE, count=1)[0]
+        if header["magic"] != FILE_MAGIC:
+            raise ValueError(f"호가 Delta 파일 형식 오류: {path}")
+        return float(header["tick"]), float(header["lot"])
+
+    def replay(self, symbol, start_ms=None, end_ms=None, depth=None):
+        """ ✅ 프레임별 복원 호가 → (event_time, update_id, bids, asks) """
+        for path in self.paths(symbol):
+            day = os.path.basename(path)[:8]
+            if (start_ms is not None and day < capture_day(start_ms)) or (end_ms is not None and day > capture_day(end_ms)):
+                continue
+            tick, lot = self.units(path)
+            offset = self.keyframe_offset(path, start_ms)
+            state = BookState()
+            for header, payload in self.frames(path, offset):
+                event_time = int(header["event_time"])
+                if end_ms is not None and event_time >= end_ms:
+                    return
+                self._apply(state, header, payload)
+                if start_ms is None or event_time >= start_ms:
+                    yield (event_time, int(header["update_id"]), *state.to_levels(tick, lot, depth))
+
+    def snapshot(self, symbol, at_ms, depth=None):
+        """ ✅ at_ms 시점 호가 (bids, asks) 복원 (해당 시점 이전 데이터가 없으면 None) """
+        path = next((path for path in reversed(self.paths(symbol)) if os.path.basename(path)[:8] <= capture_day(at_ms)), None)
+        if path is None:
+            return None
+        tick, lot = self.units(path)
+        state = BookState()
+        found = False
+        for header, payload in self.frames(path, self.keyframe_offset(path, at_ms)):
+            if int(header["event_time"]) > at_ms:
+                break
+            self._apply(state, header, payload)
+            found = True
+        return state.to_levels(tick, lot, depth) if found else None
+
+    def keyframe_offset(self, path, at_ms):
+        """ ✅ at_ms 이전 마지막 키프레임 위치 """
+        index_path = path[:-5] + ".idx"
+        if at_ms is None or not os.path.exists(index_path):
+            return None
+        index = np.fromfile(index_path, dtype=INDEX_DTYPE)
+        i = int(np.searchsorted(index["event_time"], at_ms, side="right")) - 1
+        return int(index["offset"][i]) if i >= 0 else None
+
+    @staticmethod
+    def _apply(state, header, payload):
+        n_bids, n_asks = int(header["n_bids"]), int(header["n_asks"])
+        raw = zlib.decompress(payload.tobytes())
+        bid_ticks, bid_lots = unpack_levels(raw, n_bids)
+        ask_ticks, ask_lots = unpack_levels(raw[16 * n_bids:], n_asks)
+        if header["kind"] == KEYFRAME:
+            state.bid_ticks, state.bid_lots, state.ask_ticks, state.ask_lots = bid_ticks, bid_lots, ask_ticks, ask_lots
+        else:
+            state.bid_ticks, state.bid_lots = apply_levels(state.bid_ticks, state.bid_lots, bid_ticks, bid_lots)
+            state.ask_ticks, state.ask_lots = apply_levels(state.ask_ticks, state.ask_lots, ask_ticks, ask_lots)
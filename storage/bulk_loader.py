@@ -0,0 +1,117 @@
+import io
+import os
+import logging
+from dotenv import load_dotenv
+from storage.db_pool import shared_db_pool
+
+# ✅ 환경 변수 로드
+load_dotenv()
+USE_MYSQL = os.getenv("USE_MYSQL") == "True"
+USE_POSTGRES = os.getenv("USE_POSTGRES") == "True"
+BULK_CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", "50000"))  # COPY / INSERT 1회 처리 행 수
+MYSQL_ROWS_PER_STATEMENT = int(os.getenv("MYSQL_ROWS_PER_STATEMENT", "2000"))  # max_allowed_packet 고려
+
+
+def pg_ident(name):
+    """ ✅ PostgreSQL 식별자 (따옴표 없이 생성된 테이블 기준 소문자, interval 등 예약어 보호) """
+    return '"' + name.lower() + '"'
+
+
+def mysql_ident(name):
+    return f"`{name}`"
+
+
+def to_sql_rows(df):
+    """ ✅ DataFrame → 파이썬 기본형 튜플 목록 (NaN → None) """
+    values = df.astype(object).where(df.notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+
+def copy_to_postgres(conn, table, df, key_columns, chunk_rows=BULK_CHUNK_ROWS):
+    """ ✅ PostgreSQL COPY FROM STDIN (CSV 버퍼) → 임시 테이블 → ON CONFLICT 업서트 (key_columns UNIQUE 인덱스 필요) """
+    columns = list(df.columns)
+    column_sql = ", ".join(pg_ident(c) for c in columns)
+    update_sql = ", ".join(f"{pg_ident(c)} = EXCLUDED.{pg_ident(c)}" for c in columns if c not in key_columns)
+    conflict_sql = f"DO UPDATE SET {update_sql}" if update_sql else "DO NOTHING"
+    staging = f"_bulk_{table}"
+
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS")
+        for start in range(0, len(df), chunk_rows):
+            buffer = io.StringIO()
+            df.iloc[start:start + chunk_rows].to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S.%f")
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {staging} ({column_sql}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(
+                f"INSERT INTO {table} ({column_sql}) SELECT {column_sql} FROM {staging} "
+                f"ON CONFLICT ({', '.join(pg_ident(c) for c in key_columns)}) {conflict_sql}"
+            )
+            cursor.execute(f"TRUNCATE {staging}")
+    conn.commit()
+
+
+def insert_to_mysql(conn, table, df, key_columns, rows_per_statement=MYSQL_ROWS_PER_STATEMENT):
+    """ ✅ MySQL 다중 행 VALUES 배치 + ON DUPLICATE KEY UPDATE 업서트 (키는 테이블 UNIQUE 인덱스 기준) """
+    columns = list(df.columns)
+    column_sql = ", ".join(mysql_ident(c) for c in columns)
+    row_sql = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    update_columns = [c for c in columns if c not in key_columns] or key_columns[:1]
+    update_sql = ", ".join(f"{mysql_ident(c)} = VALUES({mysql_ident(c)})" for c in update_columns)
+    rows = to_sql_rows(df)
+
+    cursor = conn.cursor()
+    for start in range(0, len(rows), rows_per_statement):
+        chunk = rows[start:start + rows_per_statement]
+        sql = (f"INSERT INTO {table} ({column_sql}) VALUES {', '.join([row_sql] * len(chunk))} "
+               f"ON DUPLICATE KEY UPDATE {update_sql}")
+        cursor.execute(sql, [value for row in chunk for value in row])
+    conn.commit()
+    cursor.close()
+
+
+def upsert_to_mongo(collection, df, key_columns):
+    """ ✅ MongoDB 키 기준 업서트 (bulk_write, ordered=False) """
+    from pymongo import ReplaceOne
+    records = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+    operations = [ReplaceOne({key: record[key] for key in key_columns}, record, upsert=True) for record in records]
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+
+
+class BulkLoader:
+    def __init__(self, use_mysql=USE_MYSQL, use_postgres=USE_POSTGRES, mongo_collection=None):
+        """ ✅ DataFrame 대량 적재 (PostgreSQL COPY, MySQL 다중 행 VALUES, 키 기준 업서트) """
+        self.use_mysql = use_mysql
+        self.use_postgres = use_postgres
+        self.mongo_collection = mongo_collection
+
+    def load(self, table, df, key_columns, columns=None):
+        """ ✅ DataFrame 적재 (key_columns 중복 시 갱신 → 재실행해도 중복 행 없음) """
+        if df is None or df.empty:
+            return 0
+        if columns is not None:
+            df = df[list(columns)]
+        df = df.drop_duplicates(subset=key_columns, keep="last")  # 동일 키가 한 배치에 중복되면 업서트 실패
+
+        if self.use_postgres:
+            try:
+                with shared_db_pool.postgres() as conn:
+                    copy_to_postgres(conn, table, df, key_columns)
+            except Exception as e:
+                logging.error(f"🚨 [PostgreSQL] {table} 대량 적재 실패 ({len(df)}행): {e}")
+
+        if self.use_mysql:
+            try:
+                with shared_db_pool.mysql() as conn:
+                    insert_to_mysql(conn, table, df, key_columns)
+            except Exception as e:
+                logging.error(f"🚨 [MySQL] {table} 대량 적재 실패 ({len(df)}행): {e}")
+
+        if self.mongo_collection is not None:
+            try:
+                upsert_to_mongo(self.mongo_collection, df, key_columns)
+            except Exception as e:
+                logging.error(f"🚨 [MongoDB] {table} 대량 적재 실패 ({len(df)}행): {e}")
+
+        logging.info(f"✅ [대량 적재] {table} {len(df)}행")
+        return len(df)
@@ -0,0 +1,248 @@
+import os
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# ✅ 환경 변수 로드
+load_dotenv()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))  # DB별 최대 연결 수 (프로세스 공용)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # 연결 대기 최대 시간 (초)
+DB_IDLE_TIMEOUT = float(os.getenv("DB_IDLE_TIMEOUT", "300"))  # 유휴 연결 회수 기준 (초)
+DB_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_HEALTH_CHECK_INTERVAL", "30"))  # 재사용 전 상태 확인 기준 유휴 시간 (초)
+MONGO_POOL_SIZE = int(os.getenv("MONGO_POOL_SIZE", "20"))
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+
+
+def connect_mysql():
+    import mysql.connector
+    return mysql.connector.connect(
+        host=os.getenv("MYSQL_HOST"),
+        user=os.getenv("MYSQL_USER"),
+        password=os.getenv("MYSQL_PASSWORD"),
+        database=os.getenv("MYSQL_DATABASE")
+    )
+
+
+def connect_postgres():
+    import psycopg2
+    return psycopg2.connect(
+        host=os.getenv("POSTGRES_HOST"),
+        user=os.getenv("POSTGRES_USER"),
+        password=os.getenv("POSTGRES_PASSWORD"),
+        database=os.getenv("POSTGRES_DATABASE")
+    )
+
+
+def ping(conn):
+    """ ✅ 연결 상태 확인 (SELECT 1) """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    def __init__(self, name, connect, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 idle_timeout=DB_IDLE_TIMEOUT, health_check_interval=DB_HEALTH_CHECK_INTERVAL):
+        """ ✅ 크기 제한 연결 풀 (지연 연결, 재사용 전 상태 확인, 유휴 연결 회수, 오류 연결 폐기 후 재연결) """
+        self.name = name
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.idle = []  # [(반환 시각, 연결)] - 최근 반환 연결을 먼저 재사용
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+
+        # ✅ 통계
+        self.opened = 0
+        self.closed = 0
+        self.reclaimed = 0
+        self.in_use = 0
+
+    def _discard(self, conn):
+        close_quietly(conn)
+        with self.lock:
+            self.closed += 1
+
+    def reclaim_idle(self):
+        """ ✅ idle_timeout 이상 사용되지 않은 연결 종료 """
+        deadline = time.monotonic() - self.idle_timeout
+        with self.lock:
+            expired = [conn for released, conn in self.idle if released < deadline]
+            self.idle = [(released, conn) for released, conn in self.idle if released >= deadline]
+            self.reclaimed += len(expired)
+        for conn in expired:
+            self._discard(conn)
+
+    def _checkout(self):
+        self.reclaim_idle()
+        while True:
+            with self.lock:
+                if not self.idle:
+                    break
+                released, conn = self.idle.pop()
+            if time.monotonic() - released < self.health_check_interval:
+                return conn
+            try:
+                ping(conn)
+                return conn
+            except Exception as e:
+                logging.warning(f"⚠️ [{self.name}] 끊어진 연결 폐기 후 재연결: {e}")
+                self._discard(conn)
+
+        conn = self.connect()
+        with self.lock:
+            self.opened += 1
+        return conn
+
+    def _checkin(self, conn):
+        with self.lock:
+            self.idle.append((time.monotonic(), conn))
+
+    @contextmanager
+    def connection(self):
+        """ ✅ 풀에서 연결 대여 (블록 종료 시 반환, 예외 발생 시 연결 폐기) """
+        if not self.slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"{self.name} 연결 풀 대기 시간 초과 ({self.max_size}개 모두 사용 중)")
+        conn = None
+        try:
+            conn = self._checkout()
+            with self.lock:
+                self.in_use += 1
+            yield conn
+        except Exception:
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            with self.lock:
+                self.in_use = max(0, self.in_use - 1)
+            self.slots.release()
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for _, conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        return {
+            "max_size": self.max_size,
+            "in_use": self.in_use,
+            "idle": len(self.idle),
+            "opened": self.opened,
+            "closed": self.closed,
+            "reclaimed": self.reclaimed,
+        }
+
+
+class DatabaseRegistry:
+    def __init__(self, pool_size=DB_POOL_SIZE, mongo_pool_size=MONGO_POOL_SIZE, idle_timeout=DB_IDLE_TIMEOUT):
+        """ ✅ 프로세스 공용 DB 클라이언트 등록소 (MySQL/PostgreSQL 연결 풀, MongoClient·SQLAlchemy 엔진 공유) """
+        self.pool_size = pool_size
+        self.mongo_pool_size = mongo_pool_size
+        self.idle_timeout = idle_timeout
+        self.pools = {}
+        self.mongo_clients = {}
+        self.engines = {}
+        self.lock = threading.Lock()
+        self.reaper = None
+        atexit.register(self.close)
+
+    def pool(self, name, connect):
+        """ ✅ 이름별 연결 풀 (첫 사용 시 생성) """
+        pool = self.pools.get(name)
+        if pool is None:
+            with self.lock:
+                pool = self.pools.setdefault(
+                    name, ConnectionPool(name, connect, max_size=self.pool_size, idle_timeout=self.idle_timeout))
+                self._start_reaper()
+        return pool
+
+    def _start_reaper(self):
+        """ ✅ 유휴 연결 회수 스레드 (풀 최초 생성 시 1회 시작) """
+        if self.reaper is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(max(self.idle_timeout / 2, 1.0))
+                self.reclaim_idle()
+
+        self.reaper = threading.Thread(target=run, name="db-pool-reaper", daemon=True)
+        self.reaper.start()
+
+    def mysql(self):
+        """ ✅ MySQL 연결 대여 (with shared_db_pool.mysql() as conn: ...) """
+        return self.pool("MySQL", connect_mysql).connection()
+
+    def postgres(self):
+        """ ✅ PostgreSQL 연결 대여 (with shared_db_pool.postgres() as conn: ...) """
+        return self.pool("PostgreSQL", connect_postgres).connection()
+
+    def mongo(self, url=None):
+        """ ✅ URL별 공유 MongoClient (자체 연결 풀 사용, 첫 요청 시 연결) """
+        url = url or MONGO_URL
+        client = self.mongo_clients.get(url)
+        if client is None:
+            from pymongo import MongoClient
+            with self.lock:
+                client = self.mongo_clients.get(url)
+                if client is None:
+                    client = MongoClient(url, maxPoolSize=self.mongo_pool_size,
+                                         maxIdleTimeMS=int(self.idle_timeout * 1000), connect=False)
+                    self.mongo_clients[url] = client
+        return client
+
+    def sqlalchemy_engine(self, url):
+        """ ✅ URL별 공유 SQLAlchemy 엔진 (pre-ping 상태 확인, 유휴 연결 재생성) """
+        engine = self.engines.get(url)
+        if engine is None:
+            from sqlalchemy import create_engine
+            options = {} if url.startswith("sqlite") else {
+                "pool_size": self.pool_size, "pool_recycle": int(self.idle_timeout)}
+            with self.lock:
+                engine = self.engines.get(url)
+                if engine is None:
+                    engine = create_engine(url, pool_pre_ping=True, **options)
+                    self.engines[url] = engine
+        return engine
+
+    def reclaim_idle(self):
+        for pool in list(self.pools.values()):
+            pool.reclaim_idle()
+
+    def close(self):
+        """ ✅ 모든 연결 종료 """
+        for pool in list(self.pools.values()):
+            pool.close()
+        for client in list(self.mongo_clients.values()):
+            client.close()
+        for engine in list(self.engines.values()):
+            engine.dispose()
+        self.mongo_clients.clear()
+        self.engines.clear()
+
+    def stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+
+# ✅ 프로세스 공용 DB 등록소
+shared_db_pool = DatabaseRegistry()
@@ -0,0 +1,226 @@
+import os
+import glob
+import time
+import logging
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# ✅ Parquet 백엔드 (pyarrow 미설치 시 lake 비활성화)
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow import fs
+except ImportError:
+    pa = None
+
+# ✅ 환경 변수 로드
+load_dotenv()
+PARQUET_LAKE = os.getenv("PARQUET_LAKE", "True") == "True"  # Parquet 저장소 사용 여부 (pyarrow 필요)
+PARQUET_LAKE_DIR = os.getenv("PARQUET_LAKE_DIR", "data/lake")
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "65536"))  # row group 크기 (시간 구간 필터 단위)
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+
+# ✅ 데이터셋 이름
+TRADES_DATASET = "trades"
+BOOK_SNAPSHOTS_DATASET = "book_snapshots"
+
+
+def klines_dataset(interval):
+    return f"klines_{interval}"
+
+
+def partition_dir(root, dataset, symbol, day):
+    """ ✅ {root}/{dataset}/symbol={SYMBOL}/date={YYYY-MM-DD} (Hive 파티션) """
+    return os.path.join(root, dataset, f"symbol={symbol.upper()}", f"date={day}")
+
+
+def day_range(start, end):
+    """ ✅ 시간 구간에 포함되는 날짜 목록 (YYYY-MM-DD) """
+    return [day.strftime("%Y-%m-%d") for day in pd.date_range(start.floor("D"), end.floor("D"), freq="D")]
+
+
+def to_timestamp(value):
+    """ ✅ datetime / 문자열 / epoch ms → tz 없는 UTC pd.Timestamp """
+    if value is None:
+        return None
+    timestamp = pd.Timestamp(value, unit="ms") if isinstance(value, (int, np.integer)) else pd.Timestamp(value)
+    return timestamp.tz_convert(None) if timestamp.tzinfo is not None else timestamp
+
+
+def write_parquet(table, path):
+    """ ✅ row group 통계 포함 Parquet 기록 (임시 파일 → 교체) """
+    temp_path = f"{path}.tmp"
+    pq.write_table(table, temp_path, row_group_size=PARQUET_ROW_GROUP_SIZE, compression=PARQUET_COMPRESSION,
+                   write_statistics=True)
+    os.replace(temp_path, path)
+
+
+def read_parquet(path, columns=None, memory_map=True, partitioning=None):
+    """ ✅ Parquet 파일 / 디렉터리 읽기 (필요한 컬럼만, 메모리 맵, 디렉터리 이름 파티션 컬럼은 partitioning="hive" 지정 시만) """
+    return pq.read_table(path, columns=columns, memory_map=memory_map, partitioning=partitioning).to_pandas()
+
+
+class ParquetLake:
+    def __init__(self, root=PARQUET_LAKE_DIR):
+        """ ✅ 코인 / 날짜 파티션 Parquet 저장소 (체결, 캔들, 호가 스냅샷)
+
+        조회 시 날짜 파티션은 경로로, 시간 구간은 row group 통계(min/max)로 걸러 필요한 데이터만 읽습니다.
+        """
+        if pa is None:
+            raise ImportError("Parquet 저장소를 사용하려면 pyarrow 설치가 필요합니다 (pip install pyarrow)")
+        self.root = root
+
+    def write(self, dataset, df, key_columns=None, time_column="timestamp"):
+        """ ✅ DataFrame 기록 (symbol, time_column 컬럼 필요, 코인 / 날짜별 파티션 분할)
+
+        key_columns 지정 시 같은 파티션의 기존 데이터와 병합 후 중복 제거(마지막 값 유지), 미지정 시 새 part 파일 추가
+        """
+        if df is None or df.empty:
+            return 0
+        df = df.assign(**{time_column: pd.to_datetime(df[time_column]).astype("datetime64[ms]")})
+        days = df[time_column].dt.strftime("%Y-%m-%d")
+        for (symbol, day), part in df.groupby([df["symbol"].str.upper(), days], sort=False):
+            directory = partition_dir(self.root, dataset, symbol, day)
+            os.makedirs(directory, exist_ok=True)
+            if key_columns:
+                self._merge(directory, part, key_columns, time_column)
+            else:
+                part = part.sort_values(time_column, kind="stable")
+                write_parquet(pa.Table.from_pandas(part, preserve_index=False),
+                              os.path.join(directory, f"part-{time.time_ns()}.parquet"))
+        return len(df)
+
+    def _merge(self, directory, part, key_columns, time_column):
+        """ ✅ 파티션 기존 데이터와 병합 → 단일 파일로 다시 기록 """
+        existing = sorted(glob.glob(os.path.join(directory, "*.parquet")))
+        if existing:
+            part = pd.concat([read_parquet(existing)[part.columns], part], ignore_index=True)
+        part = part.drop_duplicates(subset=key_columns, keep="last").sort_values(time_column, kind="stable")
+        write_parquet(pa.Table.from_pandas(part, preserve_index=False), os.path.join(directory, "part-0.parquet"))
+        for path in existing:
+            if os.path.basename(path) != "part-0.parquet":
+                os.remove(path)
+
+    def paths(self, dataset, symbols=None, start=None, end=None):
+        """ ✅ 조회 대상 파일 (코인 / 날짜 파티션 경로로 선별) """
+        base = os.path.join(self.root, dataset)
+        symbol_dirs = ([os.path.join(base, f"symbol={symbol.upper()}") for symbol in symbols] if symbols
+                       else sorted(glob.glob(os.path.join(base, "symbol=*"))))
+        paths = []
+        for symbol_dir in symbol_dirs:
+            if start is not None and end is not None:
+                day_dirs = [os.path.join(symbol_dir, f"date={day}") for day in day_range(start, end)]
+            else:
+                day_dirs = sorted(glob.glob(os.path.join(symbol_dir, "date=*")))
+                first = f"date={start:%Y-%m-%d}" if start is not None else None
+                last = f"date={end:%Y-%m-%d}" if end is not None else None
+                day_dirs = [d for d in day_dirs if (first is None or os.path.basename(d) >= first)
+                            and (last is None or os.path.basename(d) <= last)]
+            for day_dir in day_dirs:
+                paths.extend(sorted(glob.glob(os.path.join(day_dir, "*.parquet"))))
+        return paths
+
+    def read(self, dataset, symbols=None, start=None, end=None, columns=None, memory_map=True, time_column="timestamp"):
+        """ ✅ 필요한 컬럼 / 시간 구간만 조회 ([start, end), 날짜 파티션 + row group 통계 필터) """
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        start, end = to_timestamp(start), to_timestamp(end)
+        paths = self.paths(dataset, symbols, start, end)
+        if not paths:
+            return pd.DataFrame(columns=columns)
+
+        expression = None
+        if start is not None:
+            expression = ds.field(time_column) >= pa.scalar(start.value // 1_000_000, type=pa.timestamp("ms"))
+        if end is not None:
+            upper = ds.field(time_column) < pa.scalar(end.value // 1_000_000, type=pa.timestamp("ms"))
+            expression = upper if expression is None else expression & upper
+
+        dataset_ = ds.dataset(paths, format="parquet", filesystem=fs.LocalFileSystem(use_mmap=memory_map))
+        return dataset_.to_table(columns=columns, filter=expression).to_pandas()
+
+    def write_klines(self, df):
+        """ ✅ 캔들 기록 (코인 / 간격 / 시각 기준 중복 제거) """
+        for interval, part in df.groupby("interval", sort=False):
+            self.write(klines_dataset(interval), part, key_columns=["symbol", "timestamp"])
+
+    def klines(self, symbol, interval, start=None, end=None, columns=None, memory_map=True):
+        """ ✅ 캔들 조회 (시각 오름차순) """
+        df = self.read(klines_dataset(interval), symbol, start, end, columns=columns, memory_map=memory_map)
+        return df.reset_index(drop=True)
+
+    def kline_timestamps(self, symbol, interval, start=None):
+        """ ✅ 저장된 캔들 시각 (epoch ms, 증분 수집 누락 구간 계산용) """
+        df = self.klines(symbol, interval, start=start, columns=["timestamp"])
+        if df.empty:
+            return np.empty(0, dtype=np.int64)
+        return df["timestamp"].values.astype("datetime64[ms]").astype(np.int64)
+
+    def trades(self, symbol, start=None, end=None, columns=None, memory_map=True):
+        """ ✅ 체결 조회 """
+        return self.read(TRADES_DATASET, symbol, start, end, columns=columns, memory_map=memory_map)
+
+    def book_snapshots(self, symbol, start=None, end=None, columns=None, memory_map=True):
+        """ ✅ 호가 스냅샷 조회 (long 형식: timestamp, side, level, price, qty) """
+        return self.read(BOOK_SNAPSHOTS_DATASET, symbol, start, end, columns=columns, memory_map=memory_map)
+
+    def import_capture(self, reader, symbol, day, book_interval_ms=1000, book_depth=20):
+        """ ✅ 바이너리 캡처 하루치 → 체결 / 호가 스냅샷 Parquet 변환 (YYYYMMDD 또는 YYYY-MM-DD)
+
+        호가 스냅샷은 Diff 이벤트를 재생용 호가창에 적용하며 book_interval_ms 마다 상위 book_depth 레벨을 기록합니다.
+        """
+        from data_collection.local_order_book import LocalOrderBook
+        from data_collection.market_replay import depth_payload, seed_book
+
+        start = pd.Timestamp(day)
+        start_ms, end_ms = int(start.value // 1_000_000), int((start + pd.Timedelta(days=1)).value // 1_000_000)
+        symbol = symbol.upper()
+
+        trades = reader.read("trade", symbol, start_ms, end_ms)
+        if len(trades):
+            self.write(TRADES_DATASET, pd.DataFrame({
+                "timestamp": pd.to_datetime(trades["trade_time"], unit="ms"),
+                "symbol": symbol,
+                "trade_id": trades["trade_id"],
+                "price": trades["price"],
+                "qty": trades["qty"],
+                "is_buyer_maker": trades["is_buyer_maker"].astype(bool),
+            }), key_columns=["trade_id"])
+
+        book = LocalOrderBook(symbol)
+        frames = []
+        next_snapshot = None
+        for update in reader.depth_updates(symbol, start_ms, end_ms):
+            if book.last_update_id is None:
+                seed_book(book, update)
+            book.process_depth_update(depth_payload(update))
+            if next_snapshot is not None and update.event_time < next_snapshot:
+                continue
+            next_snapshot = update.event_time - update.event_time % book_interval_ms + book_interval_ms
+            for side, book_side in (("bid", book.bids), ("ask", book.asks)):
+                levels = book_side.levels(book_depth)
+                frames.append(pd.DataFrame({
+                    "timestamp": pd.Timestamp(update.event_time, unit="ms"),
+                    "side": side,
+                    "level": np.arange(len(levels), dtype=np.int16),
+                    "price": levels[:, 0],
+                    "qty": levels[:, 1],
+                }))
+        if frames:
+            snapshots = pd.concat(frames, ignore_index=True).assign(symbol=symbol)
+            self.write(BOOK_SNAPSHOTS_DATASET, snapshots, key_columns=["timestamp", "side", "level"])
+        logging.info(f"✅ [Parquet 변환] {symbol} {day} - 체결 {len(trades)}건, 호가 스냅샷 {len(frames) // 2}개")
+        return len(trades), len(frames) // 2
+
+
+# ✅ 프로세스 공용 Parquet 저장소 (pyarrow 미설치 또는 PARQUET_LAKE=False 이면 None)
+shared_parquet_lake = ParquetLake() if PARQUET_LAKE and pa is not None else None
+
+# ✅ 사용 예시 (1분봉 한 달 조회 시간 측정)
+if __name__ == "__main__":
+    lake = ParquetLake()
+    started = time.time()
+    df = lake.klines("BTCUSDT", "1m", start=pd.Timestamp.utcnow() - pd.Timedelta(days=30), columns=["timestamp", "close"])
+    print(f"📊 [Parquet 조회] {len(df)}개 캔들 ({time.time() - started:.3f}초)")
@@ -4,13 +4,14 @@ import numpy as np
 import threading
 import logging
 import pandas as pd
+from data_collection.trade_ring_buffer import TradeHistoryStore
 
 class MarketMicrostructureAnalyzer:
     def __init__(self, symbol, selected_coins=None):
         self.symbol = symbol.lower()
         self.selected_coins = selected_coins if selected_coins else [self.symbol]
         self.order_book = {"bids": [], "asks": []}
-        self.trade_data = []
+        self.trade_data = TradeHistoryStore()  # 코인별 체결 링 버퍼 (메모리 상한 고정)
         self.lock = threading.Lock()
 
         # WebSocket 연결 설정
@@ -39,12 +40,11 @@ class MarketMicrostructureAnalyzer:
                 self.order_book["asks"] = [(float(price), float(size)) for price, size in data["asks"][:100]]
 
             elif "e" in data and data["e"] == "trade":
-                self.trade_data.append({
-                    "price": float(data["p"]),
-                    "quantity": float(data["q"]),
-                    "is_buyer_maker": data["m"],  # True: 매수 체결, False: 매도 체결
-                    "timestamp": data["T"]
-                })
+                self.trade_data.get(data["s"]).append(
+                    data["T"], float(data["p"]), float(data["q"]),
+                    -1 if data["m"] else 1,  # is_buyer_maker=True: 시장가 매도
+                    data["t"]
+                )
 
     def on_close(self, ws, close_status_code, close_msg):
         """ WebSocket 연결 종료 처리 """
@@ -61,9 +61,20 @@ class MarketMicrostructureAnalyzer:
 
         return buy_pressure, sell_pressure
 
-    def get_trade_data(self):
-        """ 수집된 체결 데이터 반환 """
-        return pd.DataFrame(self.trade_data)
+    def get_recent_trades(self, seconds, symbol=None):
+        """ 최근 N초 체결 데이터 반환 (복사 없는 NumPy view) """
+        return self.trade_data.window(symbol or self.symbol, seconds)
+
+    def get_trade_data(self, seconds=None, symbol=None):
+        """ 수집된 체결 데이터 반환 (DataFrame 변환은 호출 시에만) """
+        buffer = self.trade_data.get(symbol or self.symbol)
+        trades = buffer.last() if seconds is None else buffer.window(seconds)
+        return pd.DataFrame({
+            "price": trades["price"],
+            "quantity": trades["qty"],
+            "is_buyer_maker": trades["side"] < 0,
+            "timestamp": trades["timestamp"],
+        })
 
 # ✅ 사용 예시
 if __name__ == "__main__":
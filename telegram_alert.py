@@ -1,8 +1,8 @@
 import os
-import requests
 import logging
 from dotenv import load_dotenv
 from reporting.trading_report import TradingReport
+from notification.alert_dispatcher import shared_alert_dispatcher
 
 # 환경 변수 로드
 load_dotenv()
@@ -16,24 +16,20 @@ class TelegramNotifier:
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
         logging.basicConfig(level=logging.INFO)
 
-    def send_message(self, message: str):
-        """ 텔레그램 메시지 전송 """
-        payload = {"chat_id": self.chat_id, "text": message, "parse_mode": "Markdown"}
-        try:
-            response = requests.post(self.base_url, data=payload)
-            if response.status_code == 200:
-                logging.info("✅ 텔레그램 메시지 전송 성공")
-            else:
-                logging.error(f"❌ 텔레그램 메시지 전송 실패: {response.text}")
-        except requests.exceptions.RequestException as e:
-            logging.error(f"🚨 텔레그램 API 오류 발생: {e}")
+    def send_message(self, message: str, coalesce: bool = True):
+        """ 텔레그램 메시지 전송 (공용 알림 발송기 대기열에 적재, 발송은 백그라운드에서 수행) """
+        if shared_alert_dispatcher.send(message, chat_id=self.chat_id, bot_token=self.bot_token, parse_mode="Markdown",
+                                        coalesce=coalesce):
+            logging.info("✅ 텔레그램 메시지 전송 대기열 적재")
+        else:
+            logging.error("❌ 텔레그램 메시지 전송 실패: 설정 누락 또는 대기열 초과")
 
     def send_trading_report(self):
         """ 트레이딩 성과 리포트를 텔레그램으로 전송 """
         try:
             report = self.report_generator.generate_report()
             if report:
-                self.send_message(f"📊 **일일 트레이딩 성과 보고서**\n{report}")
+                self.send_message(f"📊 **일일 트레이딩 성과 보고서**\n{report}", coalesce=False)
             else:
                 logging.warning("⚠️ 트레이딩 성과 보고서가 비어 있습니다.")
         except Exception as e:
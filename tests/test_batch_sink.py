@@ -0,0 +1,64 @@
+import pytest
+
+import storage.batch_sink as batch_sink
+from storage.batch_sink import BatchSink
+
+
+class FailingPool:
+    """ 모든 연결 요청이 실패하는 DB 풀 """
+
+    def mysql(self):
+        raise ConnectionError("mysql down")
+
+    def postgres(self):
+        raise ConnectionError("postgres down")
+
+
+class FakeCollection:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.inserted = []
+
+    def insert_many(self, batch, ordered=False):
+        if self.fail:
+            raise ConnectionError("mongo down")
+        self.inserted.extend(batch)
+
+
+@pytest.fixture
+def failing_pool(monkeypatch):
+    monkeypatch.setattr(batch_sink, "shared_db_pool", FailingPool())
+
+
+def sink(collection=None, use_mongo=False):
+    return BatchSink("test_table", ["a", "b"], mongo_collection=collection,
+                     use_mysql=True, use_postgres=True, use_mongo=use_mongo)
+
+
+def test_batch_failing_on_two_backends_is_counted_once(failing_pool):
+    collection = FakeCollection()
+    test_sink = sink(collection, use_mongo=True)
+    test_sink.flush([{"a": i, "b": i} for i in range(10)])
+    test_sink.close()
+    stats = test_sink.stats()
+    assert stats["failed"] == 10 and stats["written"] == 0
+    assert len(collection.inserted) == 10  # Mongo 는 성공했지만 SQL 저장소 실패로 레코드는 실패 1회 집계
+
+
+def test_all_backends_failing_never_exceeds_batch(failing_pool):
+    test_sink = sink(FakeCollection(fail=True), use_mongo=True)
+    test_sink.flush([{"a": 1, "b": 2}] * 4)
+    test_sink.flush([{"a": 1, "b": 2}] * 3)
+    test_sink.close()
+    assert test_sink.stats()["failed"] == 7 and test_sink.stats()["written"] == 0
+
+
+def test_conversion_failures_and_written_cover_the_batch_once():
+    collection = FakeCollection()
+    test_sink = BatchSink("test_table", ["a", "b"], mongo_collection=collection,
+                          use_mysql=True, use_postgres=False, use_mongo=True)
+    test_sink._write_mysql = lambda rows: True
+    test_sink.flush([{"a": 1, "b": 2}, {"a": 1}, {"a": 3, "b": 4}])  # 두 번째 레코드 SQL 변환 실패
+    test_sink.close()
+    stats = test_sink.stats()
+    assert (stats["written"], stats["failed"]) == (2, 1)
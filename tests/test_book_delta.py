@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+
+from storage.book_delta import BookDeltaReader, BookDeltaStore, FRAME_HEADER_DTYPE
+from storage.raw_capture import INDEX_DTYPE
+
+DAY_MS = 86_400_000
+START = 1_700_000_000_000 - 1_700_000_000_000 % DAY_MS + 3_600_000
+TICK, LOT = 0.1, 0.001
+
+
+def random_book(rng):
+    """ 가격 오름차순 bids < asks, tick / lot 단위로 반올림된 호가 """
+    mid = 1000 + rng.integers(-20, 20)
+    bid_prices = mid - 1 - np.sort(rng.choice(200, size=rng.integers(5, 30), replace=False))
+    ask_prices = mid + 1 + np.sort(rng.choice(200, size=rng.integers(5, 30), replace=False))
+    bids = np.column_stack((bid_prices * TICK, rng.integers(1, 5000, len(bid_prices)) * LOT))
+    asks = np.column_stack((ask_prices * TICK, rng.integers(1, 5000, len(ask_prices)) * LOT))
+    return bids, asks
+
+
+def store(root, keyframe_interval_ms=500):
+    return BookDeltaStore(root=str(root), filters={"BTCUSDT": (TICK, LOT)},
+                          keyframe_interval_ms=keyframe_interval_ms, flush_interval=3600)
+
+
+def expected(book, depth):
+    bids, asks = book
+    bids = bids[np.argsort(-bids[:, 0])][:depth]
+    asks = asks[np.argsort(asks[:, 0])][:depth]
+    return bids, asks
+
+
+def write_books(book_store, rng, count, start, step=37):
+    books = []
+    for i in range(count):
+        book = random_book(rng)
+        book_store.write("BTCUSDT", start + i * step, i, *book)
+        books.append((start + i * step, book))
+    return books
+
+
+def assert_snapshot(reader, at_ms, book, depth):
+    bids, asks = reader.snapshot("BTCUSDT", at_ms, depth)
+    want_bids, want_asks = expected(book, depth)
+    np.testing.assert_allclose(bids, want_bids)
+    np.testing.assert_allclose(asks, want_asks)
+
+
+def test_snapshot_round_trip_at_time_and_depth(tmp_path):
+    rng = np.random.default_rng(7)
+    book_store = store(tmp_path)
+    books = write_books(book_store, rng, 120, START)
+    book_store.flush()
+
+    reader = BookDeltaReader(str(tmp_path))
+    for i in (0, 1, 13, 14, 60, 119):
+        event_time, book = books[i]
+        for depth in (1, 5, None):
+            assert_snapshot(reader, event_time, book, depth or 1000)
+            assert_snapshot(reader, event_time + 36, book, depth or 1000)  # 다음 프레임 직전 시점
+    assert reader.snapshot("BTCUSDT", START - 1) is None
+    assert [event_time for event_time, *_ in reader.replay("BTCUSDT", books[10][0], books[20][0])] == \
+        [event_time for event_time, _ in books[10:20]]
+    book_store.close()
+
+
+def test_torn_final_frame_is_truncated_before_appending(tmp_path):
+    rng = np.random.default_rng(11)
+    book_store = store(tmp_path)
+    books = write_books(book_store, rng, 40, START)
+    book_store.close()
+
+    path = next(os.path.join(root, name) for root, _, names in os.walk(tmp_path) for name in names if name.endswith(".book"))
+    index_path = path[:-5] + ".idx"
+    complete_size = os.path.getsize(path)
+    with open(path, "ab") as file:  # 비정상 종료: 프레임 헤더 + payload 일부만 기록
+        header = np.array([(0, START + 10_000, 999, 3, 3, 500)], dtype=FRAME_HEADER_DTYPE)
+        file.write(header.tobytes() + b"\x00" * 17)
+    with open(index_path, "ab") as file:  # 잘린 키프레임 색인 + 일부만 기록된 색인 레코드
+        file.write(np.array([(START + 10_000, complete_size)], dtype=INDEX_DTYPE).tobytes() + b"\x01\x02")
+
+    book_store = store(tmp_path)
+    more = write_books(book_store, rng, 30, START + 20_000)
+    book_store.close()
+
+    reader = BookDeltaReader(str(tmp_path))
+    assert os.path.getsize(index_path) % INDEX_DTYPE.itemsize == 0
+    offsets = np.fromfile(index_path, dtype=INDEX_DTYPE)["offset"]
+    assert (np.diff(offsets) > 0).all()  # 잘린 프레임 색인 제거, 재시작 후 첫 키프레임은 잘린 위치에서 시작
+    assert (offsets == complete_size).sum() == 1
+    for event_time, book in (books[-1], more[0], more[15], more[-1]):
+        assert_snapshot(reader, event_time, book, 10)
+    assert len(list(reader.replay("BTCUSDT"))) == len(books) + len(more)
@@ -0,0 +1,146 @@
+import threading
+
+import pytest
+
+from data_collection.local_order_book import LocalOrderBook, OrderBookManager
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """ REST 스냅샷 응답을 테스트에서 직접 풀어주는 세션 """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.release = threading.Event()
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        self.release.wait(5)
+        return FakeResponse(self.snapshot)
+
+
+SNAPSHOT = {"lastUpdateId": 100, "bids": [["100.0", "1"], ["99.0", "2"]], "asks": [["101.0", "1"], ["102.0", "3"]]}
+
+
+def diff(first, final, prev=None, bids=(), asks=()):
+    data = {"E": 1, "U": first, "u": final, "b": [list(level) for level in bids], "a": [list(level) for level in asks]}
+    if prev is not None:
+        data["pu"] = prev
+    return data
+
+
+def synced_book():
+    book = LocalOrderBook("BTCUSDT", session=FakeSession(SNAPSHOT))
+    book.load_snapshot(SNAPSHOT)
+    return book
+
+
+def wait_for_snapshot(book):
+    book.snapshot_future.result(timeout=5)
+
+
+def test_futures_first_event_must_straddle_snapshot():
+    book = synced_book()
+    assert not book.process_depth_update(diff(90, 99, prev=89))  # 스냅샷 이전 이벤트 무시
+    assert book.process_depth_update(diff(95, 105, prev=94, bids=[("100.0", "5")]))
+    assert book.synced and book.last_update_id == 105
+    assert book.bids.qty_at(100.0) == 5.0
+
+
+def test_futures_pu_chain_and_gap_resync():
+    book = synced_book()
+    assert book.process_depth_update(diff(95, 105, prev=94, asks=[("101.0", "0")]))
+    assert book.asks.best_price == 102.0
+    assert book.process_depth_update(diff(106, 110, prev=105))
+    assert not book.process_depth_update(diff(115, 120, prev=112))  # pu != 직전 u
+    assert book.resync_count == 1
+    assert book.last_update_id is None and book.bids.count == 0
+
+
+def test_spot_sequence_uses_previous_u_plus_one():
+    book = synced_book()
+    assert book.process_depth_update(diff(101, 103))
+    assert book.process_depth_update(diff(104, 106))
+    assert not book.process_depth_update(diff(108, 109))
+    assert book.resync_count == 1
+
+
+def test_first_event_after_gap_triggers_resync():
+    book = synced_book()
+    assert not book.process_depth_update(diff(120, 125, prev=119))
+    assert book.resync_count == 1
+
+
+def test_snapshot_is_fetched_off_the_stream_thread_and_buffer_replayed():
+    session = FakeSession(SNAPSHOT)
+    book = LocalOrderBook("BTCUSDT", session=session)
+
+    # 조회가 끝나지 않아도 수신 스레드는 바로 반환, 이벤트는 보관
+    assert not book.process_depth_update(diff(90, 99, prev=89))
+    assert not book.process_depth_update(diff(100, 102, prev=99, bids=[("100.0", "4")]))
+    assert book.last_update_id is None and len(book.buffer) == 2
+    assert session.calls == 1
+
+    session.release.set()
+    wait_for_snapshot(book)
+    assert book.process_depth_update(diff(103, 104, prev=102, asks=[("101.0", "7")]))
+    assert book.last_update_id == 104
+    assert book.bids.qty_at(100.0) == 4.0  # 보관 이벤트 적용
+    assert book.asks.qty_at(101.0) == 7.0
+    assert len(book.buffer) == 0
+
+
+def test_resync_discards_inflight_snapshot():
+    session = FakeSession(SNAPSHOT)
+    book = LocalOrderBook("BTCUSDT", session=session)
+    book.process_depth_update(diff(100, 102, prev=99))
+    future = book.snapshot_future
+    book.resync("test")
+    assert book.snapshot_future is None and len(book.buffer) == 0
+    session.release.set()
+    future.result(timeout=5)
+
+
+@pytest.fixture
+def manager_with_book():
+    manager = OrderBookManager()
+    book = manager.get("BTCUSDT")
+    book.load_snapshot(SNAPSHOT)
+    return manager, book
+
+
+def test_manager_notifies_resync_listeners(manager_with_book):
+    manager, book = manager_with_book
+    events = []
+    manager.add_resync_listener("BTCUSDT", lambda symbol, reason: events.append(symbol))
+    manager.on_depth_update(diff(95, 105, prev=94), "BTCUSDT")
+    manager.on_depth_update(diff(200, 210, prev=150), "BTCUSDT")
+    assert events == ["BTCUSDT"]
+
+
+def test_external_resync_runs_on_the_stream_thread(manager_with_book):
+    manager, book = manager_with_book
+    book.session = FakeSession(SNAPSHOT)
+    book.session.release.set()
+    events = []
+    manager.add_resync_listener("BTCUSDT", lambda symbol, reason: events.append(reason))
+    manager.on_depth_update(diff(95, 105, prev=94, bids=[("100.0", "5")]), "BTCUSDT")
+
+    manager.resync("BTCUSDT", "watchdog")  # 감시기 스레드: 요청만 기록
+    assert book.is_ready and book.bids.qty_at(100.0) == 5.0 and events == []
+
+    manager.on_depth_update(diff(106, 107, prev=105), "BTCUSDT")  # 수신 스레드에서 초기화 후 이벤트 전달
+    assert events == ["watchdog"] and book.resync_count == 1 and book.resync_reason is None
+    assert book.last_update_id is None and len(book.buffer) == 1
+    wait_for_snapshot(book)
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+
+from data_collection.message_decoder import DepthUpdate, TradeRecord
+from storage.raw_capture import CAPTURE_DTYPES, INDEX_DTYPE, CaptureReader, MarketCapture
+
+DAY_MS = 86_400_000
+START = 1_700_000_000_000 - 1_700_000_000_000 % DAY_MS  # UTC 자정
+
+
+def trade(i, event_time):
+    return TradeRecord("BTCUSDT", i, 100.0 + i, 0.5, bool(i % 2), event_time, event_time)
+
+
+def capture_trades(root, times, buffer_records=16, index_interval_ms=50):
+    capture = MarketCapture(root=str(root), buffer_records=buffer_records, index_interval_ms=index_interval_ms)
+    capture.start = lambda: None  # 기록 스레드 없이 flush 시점을 테스트에서 제어
+    for i, event_time in enumerate(times):
+        capture.on_trade(trade(i, event_time))
+    return capture
+
+
+def expected_ids(times, start_ms, end_ms):
+    return [i for i, t in enumerate(times)
+            if (start_ms is None or t >= start_ms) and (end_ms is None or t < end_ms)]
+
+
+def test_time_range_slicing_matches_brute_force(tmp_path):
+    times = [START + 7 * i for i in range(500)] + [START + DAY_MS + 3 * i for i in range(200)]  # 2일, 파일 2개
+    capture = capture_trades(tmp_path, times)
+    capture.close()
+    reader = CaptureReader(str(tmp_path))
+
+    ranges = [(None, None), (START, START + 1), (START + 100, START + 1000), (START + 101, START + 102),
+              (START + 3400, START + DAY_MS + 30), (START + DAY_MS + 599, None), (None, START + 350),
+              (START - 1000, START)]
+    for start_ms, end_ms in ranges:
+        rows = reader.read("trade", "BTCUSDT", start_ms, end_ms)
+        assert rows["trade_id"].tolist() == expected_ids(times, start_ms, end_ms), (start_ms, end_ms)
+
+
+def test_single_file_read_is_a_view(tmp_path):
+    times = [START + i for i in range(100)]
+    capture_trades(tmp_path, times).close()
+    rows = CaptureReader(str(tmp_path)).read("trade", "BTCUSDT", START + 10, START + 20)
+    assert isinstance(rows.base, np.memmap) or isinstance(rows, np.memmap)
+    assert rows["price"].tolist() == [100.0 + i for i in range(10, 20)]
+
+
+def test_full_buffers_are_not_written_on_the_ingest_thread(tmp_path):
+    times = [START + i for i in range(100)]
+    capture = capture_trades(tmp_path, times, buffer_records=16)
+    reader = CaptureReader(str(tmp_path))
+    assert len(reader.read("trade", "BTCUSDT")) == 0  # 버퍼가 여러 번 찼어도 flush 전에는 디스크 기록 없음
+    capture.flush()
+    assert reader.read("trade", "BTCUSDT")["trade_id"].tolist() == list(range(100))
+    capture.close()
+
+
+def test_depth_updates_round_trip(tmp_path):
+    capture = MarketCapture(root=str(tmp_path), buffer_records=8)
+    capture.start = lambda: None
+    bids = np.array([[100.0, 1.0], [99.5, 2.0]])
+    asks = np.array([[100.5, 3.0]])
+    capture.on_depth(DepthUpdate("BTCUSDT", 10, 12, 9, bids, asks, START + 5))
+    capture.on_depth(DepthUpdate("BTCUSDT", 13, 13, 12, bids[:0], bids[:0], START + 6))
+    capture.close()
+
+    first, second = CaptureReader(str(tmp_path)).depth_updates("BTCUSDT")
+    assert (first.first_update_id, first.final_update_id, first.prev_final_update_id) == (10, 12, 9)
+    assert first.bids.tolist() == bids.tolist() and first.asks.tolist() == asks.tolist()
+    assert second.final_update_id == 13 and len(second.bids) == 0 and len(second.asks) == 0
+
+
+def test_reopen_after_torn_record_and_index(tmp_path):
+    times = [START + 7 * i for i in range(300)]
+    capture_trades(tmp_path, times).close()
+
+    path = next(os.path.join(root, name) for root, _, names in os.walk(tmp_path) for name in names if name.endswith(".bin"))
+    index_path = path[:-4] + ".idx"
+    records = os.path.getsize(path) // CAPTURE_DTYPES["trade"].itemsize
+    with open(path, "ab") as file:  # 비정상 종료: 레코드 일부만 기록
+        file.write(b"\x00" * 11)
+    with open(index_path, "ab") as file:  # 잘린 레코드를 가리키는 색인 + 일부만 기록된 색인
+        file.write(np.array([(START + 9_999, records + 5)], dtype=INDEX_DTYPE).tobytes() + b"\x01" * 9)
+
+    more = [START + 5_000 + 3 * i for i in range(300)]
+    capture = MarketCapture(root=str(tmp_path), buffer_records=16, index_interval_ms=50)
+    capture.start = lambda: None
+    for i, event_time in enumerate(more):
+        capture.on_trade(trade(len(times) + i, event_time))
+    capture.close()
+
+    assert os.path.getsize(index_path) % INDEX_DTYPE.itemsize == 0
+    assert (np.fromfile(index_path, dtype=INDEX_DTYPE)["offset"] < records + len(more)).all()
+    reader = CaptureReader(str(tmp_path))
+    all_times = times + more
+    for start_ms, end_ms in ((START + 1000, START + 1500), (START + 2000, START + 5300), (START + 5600, None)):
+        rows = reader.read("trade", "BTCUSDT", start_ms, end_ms)
+        assert rows["trade_id"].tolist() == expected_ids(all_times, start_ms, end_ms), (start_ms, end_ms)
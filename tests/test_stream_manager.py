@@ -0,0 +1,43 @@
+import json
+
+from data_collection.stream_manager import CombinedStreamManager, build_combined_urls, normalize_stream
+
+
+def make_manager():
+    return CombinedStreamManager(watchdog=False)
+
+
+def frame(stream, data):
+    return json.dumps({"stream": stream, "data": data})
+
+
+def test_normalize_stream_keeps_event_name_case():
+    assert normalize_stream("BTCUSDT@aggTrade") == "btcusdt@aggTrade"
+    assert normalize_stream("btcusdt@depth@100ms") == "btcusdt@depth@100ms"
+    assert normalize_stream("!miniTicker@arr") == "!miniTicker@arr"
+    assert normalize_stream("!bookTicker") == "!bookTicker"
+
+
+def test_mixed_case_streams_reach_handlers():
+    manager = make_manager()
+    received = []
+    manager.subscribe("!miniTicker@arr", lambda data: received.append(("mini", data)))
+    manager.subscribe("BTCUSDT@aggTrade", lambda data: received.append(("agg", data)))
+
+    manager.on_message(None, frame("!miniTicker@arr", [{"s": "BTCUSDT"}]))
+    manager.on_message(None, frame("btcusdt@aggTrade", {"a": 1}))
+
+    assert received == [("mini", [{"s": "BTCUSDT"}]), ("agg", {"a": 1})]
+
+
+def test_unsubscribe_uses_same_key():
+    manager = make_manager()
+    manager.subscribe("!markPrice@arr", print)
+    manager.unsubscribe("!markPrice@arr")
+    assert manager.streams == []
+
+
+def test_combined_url_keeps_stream_names():
+    [(streams, url)] = build_combined_urls(["!miniTicker@arr", "ETHUSDT@aggTrade", "ethusdt@aggTrade"], "wss://x/stream")
+    assert streams == ["!miniTicker@arr", "ethusdt@aggTrade"]
+    assert url == "wss://x/stream?streams=!miniTicker@arr/ethusdt@aggTrade"
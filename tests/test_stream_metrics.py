@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from monitoring.stream_metrics import HISTOGRAM_SUB_BITS, LatencyHistogram
+
+PERCENTILES = (1, 10, 50, 90, 99, 99.9, 100)
+
+
+def exact(values, p):
+    return float(np.percentile(values, p, method="inverted_cdf"))  # 히스토그램과 같은 ceil 순위 정의
+
+
+@pytest.mark.parametrize("distribution", ["lognormal", "uniform", "exponential", "small"])
+def test_percentile_error_is_bounded(distribution):
+    rng = np.random.default_rng(3)
+    values = {
+        "lognormal": rng.lognormal(7, 2, 50_000),
+        "uniform": rng.uniform(0, 5_000_000, 50_000),
+        "exponential": rng.exponential(20_000, 50_000),
+        "small": rng.integers(0, 200, 50_000),
+    }[distribution].astype(np.int64)
+
+    histogram = LatencyHistogram()
+    for value in values.tolist():
+        histogram.record(value)
+
+    bound = 2.0 ** -(HISTOGRAM_SUB_BITS - 1)
+    for p, value in histogram.percentiles(PERCENTILES).items():
+        want = exact(values, p)
+        assert abs(value - want) <= bound * max(want, 1), (p, value, want)
+    assert histogram.total == len(values) and histogram.max == values.max()
+
+
+def test_values_below_sub_bucket_count_are_exact():
+    histogram = LatencyHistogram()
+    for value in range(100):
+        histogram.record(value)
+    assert histogram.percentiles((50, 99, 100)) == {50: 49, 99: 98, 100: 99}
+
+
+def test_merge_matches_single_histogram():
+    rng = np.random.default_rng(5)
+    values = rng.lognormal(8, 1.5, 20_000).astype(np.int64).tolist()
+    single, left, right = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i, value in enumerate(values):
+        single.record(value)
+        (left if i % 2 else right).record(value)
+    assert left.merge(right).percentiles(PERCENTILES) == single.percentiles(PERCENTILES)
+
+
+def test_index_round_trip_stays_in_bucket():
+    histogram = LatencyHistogram()
+    for value in [128, 129, 255, 256, 1000, 65_535, 1 << 20, 123_456_789]:
+        index = histogram.index(value)
+        assert histogram.index(histogram.value_at(index)) == index
@@ -0,0 +1,44 @@
+from data_collection.stream_watchdog import StreamWatchdog
+
+
+class FakeManager:
+    def __init__(self, streams):
+        self.streams = streams
+        self.resubscribed = []
+
+    def resubscribe(self, streams):
+        self.resubscribed.extend(streams)
+
+
+class FakeOrderBooks:
+    def __init__(self):
+        self.requests = []
+
+    def resync(self, symbol, reason):
+        self.requests.append(symbol)
+
+
+def watchdog(streams):
+    manager, books = FakeManager(streams), FakeOrderBooks()
+    return StreamWatchdog(manager, order_books=books, stale_seconds=10, depth_stale_seconds=10), manager, books
+
+
+def test_mixed_case_streams_share_one_state():
+    dog, manager, _ = watchdog(["btcusdt@aggTrade", "!miniTicker@arr"])
+    dog.observe("BTCUSDT@aggTrade", {"a": 1})
+    dog.observe("!miniTicker@arr", [])
+    assert set(dog.states) == {"btcusdt@aggTrade", "!miniTicker@arr"}
+
+    now = dog.states["btcusdt@aggTrade"].last_message
+    assert dog.check(now + 5) == [] and manager.resubscribed == []
+    assert dog.check(now + 11) == ["btcusdt@aggTrade", "!miniTicker@arr"]
+
+
+def test_sequence_gap_requests_book_resync():
+    dog, _, books = watchdog(["btcusdt@depth@100ms"])
+    events = []
+    dog.add_listener(events.append)
+    dog.observe("BTCUSDT@depth@100ms", {"U": 1, "u": 5, "pu": 0})
+    dog.observe("btcusdt@depth@100ms", {"U": 6, "u": 9, "pu": 5})
+    dog.observe("btcusdt@depth@100ms", {"U": 12, "u": 15, "pu": 11})
+    assert [event.kind for event in events] == ["gap"] and books.requests == ["btcusdt"]
@@ -12,6 +12,7 @@ from strategy.leverage_manager import LeverageManager
 from strategy.market_microstructure import MarketMicrostructureAnalyzer  
 from strategy.stop_loss_optimizer import StopLossOptimizer  
 from select_coins import CoinSelector  # ✅ 자동 코인 변경 기능 추가
+from data_collection.universe_scanner import UniverseScanner  # ✅ 전 종목 스트림 기반 실시간 코인 순위
 
 # ✅ 로깅 설정
 logger = logging.getLogger(__name__)
@@ -23,7 +24,31 @@ ai_optimizer = AIRealTimeOptimizer()
 leverage_manager = LeverageManager()  
 microstructure_analyzer = MarketMicrostructureAnalyzer("btcusdt")  # ✅ WebSocket 연동
 stop_loss_optimizer = StopLossOptimizer()
-coin_selector = CoinSelector()  # ✅ 자동 코인 변경 기능 추가
+
+# ✅ 자동 코인 변경 (AUTO_SELECT_COIN=True 이면 스트림 순위, 아니면 REST 조회 + TTL 캐시)
+# 스트림 연결은 import 시점이 아니라 실행 진입점에서 start_coin_selector() 로 시작
+coin_selector = UniverseScanner() if Config.AUTO_SELECT_COIN else CoinSelector()
+coin_selector_manager = None
+trading_pair = Config.DEFAULT_TRADING_PAIR  # 현재 매매 대상 코인 (매매 완료 후 갱신)
+
+def start_coin_selector(manager=None):
+    """ ✅ 전 종목 스트림 순위 갱신 시작 (AUTO_SELECT_COIN 활성 시, 1회만 실행) """
+    global coin_selector_manager
+    if not Config.AUTO_SELECT_COIN or coin_selector_manager is not None:
+        return coin_selector_manager
+    coin_selector.add_listener(lambda event: logger.info(f"🔄 [코인 순위 변경] 상위 코인: {event['top']}"))
+    coin_selector_manager = coin_selector.start_websocket(manager)  # 공유 관리자가 없으면 백그라운드 스레드에서 실행
+    return coin_selector_manager
+
+def get_trading_pair():
+    """ ✅ 현재 매매 대상 코인 """
+    return trading_pair
+
+def select_trading_pair(current_symbol=Config.DEFAULT_TRADING_PAIR):
+    """ ✅ 매매 완료 후 다음 매매 대상 코인 결정 (AUTO_SELECT_COIN 비활성 시 현재 코인 유지) """
+    if not Config.AUTO_SELECT_COIN:
+        return current_symbol
+    return coin_selector.should_switch_coin(current_symbol)
 
 def generate_signature(params, secret_key):
     """ ✅ Binance API 요청을 위한 HMAC SHA256 서명 생성 """
@@ -44,6 +69,7 @@ def get_balance():
 
 def trade(symbol, order_type, win_rate, risk_reward_ratio, stop_loss_percent, volatility, volume):
     """ ✅ 변동성 & 거래량 기반으로 최적화된 주문 실행 """
+    global trading_pair
     logger.info(f"📌 [주문 요청] {order_type.upper()} {symbol} 주문 실행 중...")  
 
     # ✅ 현재 계좌 잔고 가져오기
@@ -86,6 +112,9 @@ def trade(symbol, order_type, win_rate, risk_reward_ratio, stop_loss_percent, vo
         response.raise_for_status()
         order_result = response.json()
         logger.info(f"✅ [주문 성공] {order_result}")
+
+        # ✅ 매매 완료 후 다음 매매 대상 코인 결정 (상위권 이탈 시 1위 코인으로 교체)
+        trading_pair = select_trading_pair(symbol)
         return order_result
     except requests.RequestException as e:
         logger.error(f"🚨 [주문 실패] {e}")
@@ -0,0 +1,136 @@
+# 📌 수집 스레드와 분리된 고정 FPS 차트 렌더링 서비스
+# 화면 없이(Agg) 분석기 상태를 주기적으로 읽어 PNG / JSON 파일로 출력 (OBS 이미지 / 브라우저 소스 연동)
+# 분석기는 mark_dirty()로 갱신 표시만 하고, 그리기는 렌더링 스레드에서만 수행
+
+import os
+import json
+import time
+import logging
+import threading
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from dotenv import load_dotenv
+
+# ✅ 환경 변수 로드
+load_dotenv()
+CHART_FPS = float(os.getenv("CHART_FPS", "2"))  # 초당 최대 렌더링 횟수
+CHART_OUTPUT_DIR = os.getenv("CHART_OUTPUT_DIR", "visualization/charts")
+CHART_FORMATS = [fmt.strip() for fmt in os.getenv("CHART_FORMATS", "png,json").split(",") if fmt.strip()]
+
+
+def write_atomic(path, write):
+    """ ✅ 임시 파일에 기록 후 교체 (OBS가 쓰는 중인 파일을 읽지 않도록) """
+    temp_path = f"{path}.tmp"
+    write(temp_path)
+    os.replace(temp_path, path)
+
+
+def write_json(path, payload):
+    with open(path, "w") as f:
+        json.dump(payload, f, default=float)
+
+
+class Chart:
+    def __init__(self, name, snapshot, title="", xlabel="", ylabel="", kind="line", figsize=(10, 5)):
+        """ ✅ 차트 1개 (Figure / Line2D를 한 번만 만들고 set_data로 갱신)
+
+        snapshot() → {label: (x, y)} (x가 None이면 0..N-1)
+        """
+        self.name = name
+        self.snapshot = snapshot
+        self.kind = kind
+        self.figure = Figure(figsize=figsize)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        self.ax.set_title(title)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        self.lines = {}  # label → Line2D
+        self.dirty = False
+        self.frames = 0
+
+    def mark_dirty(self):
+        """ ✅ 다음 렌더링 주기에 다시 그리도록 표시 (수집 경로에서 호출, O(1)) """
+        self.dirty = True
+
+    def set_title(self, title):
+        self.ax.set_title(title)
+
+    def _line(self, label):
+        line = self.lines.get(label)
+        if line is None:
+            style = {"linestyle": "", "marker": "o"} if self.kind == "scatter" else {"marker": "o", "markersize": 3}
+            line, = self.ax.plot([], [], label=label, **style)
+            self.lines[label] = line
+            self.ax.legend(loc="upper left")
+        return line
+
+    def render(self, output_dir, formats):
+        """ ✅ 상태 스냅샷 → 기존 Line2D 데이터 교체 → PNG / JSON 출력 """
+        self.dirty = False
+        series = {}
+        for label, (x, y) in self.snapshot().items():
+            y = list(y)
+            x = list(range(len(y))) if x is None else list(x)
+            self._line(label).set_data(x, y)
+            series[label] = {"x": x, "y": y}
+        for label, line in self.lines.items():
+            if label not in series:
+                line.set_data([], [])
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.frames += 1
+
+        if "png" in formats:
+            self.canvas.draw()
+            write_atomic(os.path.join(output_dir, f"{self.name}.png"),
+                         lambda path: self.figure.savefig(path, format="png"))
+        if "json" in formats:
+            payload = {"name": self.name, "title": self.ax.get_title(), "timestamp": time.time(), "series": series}
+            write_atomic(os.path.join(output_dir, f"{self.name}.json"), lambda path: write_json(path, payload))
+
+
+class ChartRenderer:
+    def __init__(self, fps=CHART_FPS, output_dir=CHART_OUTPUT_DIR, formats=CHART_FORMATS):
+        """ ✅ 헤드리스 차트 렌더링 서비스 (등록된 차트 중 갱신된 것만 fps 주기로 렌더링) """
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.output_dir = output_dir
+        self.formats = formats
+        self.charts = {}
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def register(self, name, snapshot, **options):
+        """ ✅ 차트 등록 (렌더링 스레드는 첫 등록 시 시작) """
+        chart = Chart(name, snapshot, **options)
+        with self.lock:
+            self.charts[name] = chart
+            if self.thread is None and self.interval > 0:
+                os.makedirs(self.output_dir, exist_ok=True)
+                self.thread = threading.Thread(target=self._run, name="chart-renderer", daemon=True)
+                self.thread.start()
+        return chart
+
+    def render_once(self):
+        """ ✅ 갱신 표시된 차트 렌더링 """
+        for chart in list(self.charts.values()):
+            if not chart.dirty:
+                continue
+            try:
+                chart.render(self.output_dir, self.formats)
+            except Exception as e:
+                logging.error(f"🚨 [차트] {chart.name} 렌더링 실패: {e}")
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            self.render_once()
+            time.sleep(max(self.interval - (time.monotonic() - started), 0.0))
+
+    def stats(self):
+        return {name: chart.frames for name, chart in self.charts.items()}
+
+
+# ✅ 프로세스 공용 차트 렌더러
+shared_chart_renderer = ChartRenderer()